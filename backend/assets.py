@@ -0,0 +1,169 @@
+"""Content-addressed asset store for tenant logos, stamps and QR codes
+
+Image bytes are stored once in the `assets` GridFS bucket under the SHA-256 of
+their content; the tenant document only keeps the asset URL
+(`/api/assets/<sha256>`). Tenant reads (login, settings, subdomain lookup) no
+longer carry megabytes of base64, and identical uploads share one copy.
+
+Because the key is the content hash, an asset URL never changes meaning:
+responses are served with `Cache-Control: immutable` and the key as ETag.
+Uploading a new logo produces a new URL. Blobs are not reference counted -
+replaced or shared images stay in the bucket.
+
+Only raster images (IMAGE_TYPES) are stored, so nothing served from the app's
+origin can be interpreted as HTML or script; anything else stored before that
+rule is served as an attachment.
+
+Tenants written before the store hold inline `data:` URLs; they are moved into
+the bucket at startup (`migrate_inline_assets`).
+"""
+import base64
+import binascii
+import hashlib
+import logging
+import re
+from typing import AsyncIterator, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+
+from database import db
+from tenant_directory import bump_tenant
+
+logger = logging.getLogger(__name__)
+
+ASSET_BUCKET = "assets"
+ASSET_URL_PREFIX = "/api/assets/"
+ASSET_FIELDS = ("logo_url", "stamp_url", "whatsapp_qr_url")
+ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+ASSET_READ_SIZE = 256 * 1024
+IMAGE_TYPES = {"image/png", "image/jpeg", "image/gif", "image/webp"}
+
+KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+DATA_URL = re.compile(r"^data:(?P<type>[\w.+-]+/[\w.+-]+)?(?:;[^,;]+)*;base64,(?P<data>.*)$", re.S)
+
+bucket = AsyncIOMotorGridFSBucket(db, bucket_name=ASSET_BUCKET)
+
+
+def asset_url(key: str) -> str:
+    return f"{ASSET_URL_PREFIX}{key}"
+
+
+def asset_key(url: Optional[str]) -> Optional[str]:
+    """The content hash behind an asset URL - None for any other URL"""
+    if not url or not url.startswith(ASSET_URL_PREFIX):
+        return None
+    key = url[len(ASSET_URL_PREFIX):]
+    return key if KEY_PATTERN.match(key) else None
+
+
+def is_data_url(value) -> bool:
+    return isinstance(value, str) and value.startswith("data:")
+
+
+async def put_asset(data: bytes, content_type: str, key: Optional[str] = None) -> str:
+    """Store bytes under their SHA-256 (once) - returns the asset URL
+
+    `key` is the SHA-256 when the caller already has it (hashed while streaming).
+    Raises ValueError for content types outside IMAGE_TYPES.
+    """
+    if content_type not in IMAGE_TYPES:
+        raise ValueError(f"unsupported asset type: {content_type}")
+    key = key or hashlib.sha256(data).hexdigest()
+    exists = await db[f"{ASSET_BUCKET}.files"].find_one({"filename": key}, {"_id": 1})
+    if not exists:
+        # A concurrent upload of the same bytes adds a second file with the same
+        # name - harmless, both hold the same content
+        await bucket.upload_from_stream(key, data, metadata={"content_type": content_type})
+    return asset_url(key)
+
+
+async def externalize(value: Optional[str]) -> Optional[str]:
+    """Move an inline data: URL into the store - any other value is returned as is
+
+    Raises ValueError for data: URLs that are not a base64 image of IMAGE_TYPES.
+    """
+    if not is_data_url(value):
+        return value
+    match = DATA_URL.match(value)
+    if not match:
+        raise ValueError("malformed data URL")
+    try:
+        data = base64.b64decode(match["data"], validate=False)
+    except binascii.Error as e:
+        raise ValueError(f"invalid base64: {e}")
+    return await put_asset(data, (match["type"] or "").lower())
+
+
+async def open_asset(key: str):
+    """GridOut for an asset key, or None if it is unknown"""
+    if not KEY_PATTERN.match(key):
+        return None
+    files = db[f"{ASSET_BUCKET}.files"]
+    doc = await files.find_one({"filename": key}, {"_id": 1})
+    if not doc:
+        return None
+    return await bucket.open_download_stream(doc["_id"])
+
+
+async def read_asset(key: str) -> Optional[bytes]:
+    grid_out = await open_asset(key)
+    return await grid_out.read() if grid_out else None
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """(first, last) byte positions of a single `bytes=` range; None sends the whole asset
+
+    Raises ValueError when the range cannot be satisfied.
+    """
+    # Anything else (multiple ranges, other units) is ignored - a full response is always valid
+    match = RANGE.match(header.strip()) if header else None
+    if not match or not any(match.groups()):
+        return None
+    start, end = match.groups()
+    if not start:
+        # Suffix range: the last N bytes
+        if int(end) == 0:
+            raise ValueError("empty suffix range")
+        first, last = max(size - int(end), 0), size - 1
+    else:
+        first = int(start)
+        last = min(int(end), size - 1) if end else size - 1
+    if first >= size or last < first:
+        raise ValueError("range not satisfiable")
+    return first, last
+
+
+async def read_range(grid_out, start: int, length: int) -> AsyncIterator[bytes]:
+    grid_out.seek(start)
+    remaining = length
+    while remaining > 0:
+        data = await grid_out.read(min(ASSET_READ_SIZE, remaining))
+        if not data:
+            break
+        remaining -= len(data)
+        yield data
+
+
+async def migrate_inline_assets() -> int:
+    """One-off migration: move inline data: URLs on tenants into the store"""
+    query = {"$or": [{field: {"$regex": "^data:"}} for field in ASSET_FIELDS]}
+    cursor = db.tenants.find(query, {"_id": 0, "id": 1, **{field: 1 for field in ASSET_FIELDS}})
+    migrated = 0
+    async for tenant in cursor:
+        update = {}
+        for field in ASSET_FIELDS:
+            if not is_data_url(tenant.get(field)):
+                continue
+            try:
+                update[field] = await externalize(tenant[field])
+            except ValueError as e:
+                logger.warning(f"Tenant {tenant['id']} {field} left inline: {e}")
+        if not update:
+            continue
+        await db.tenants.update_one({"id": tenant["id"]}, {"$set": update})
+        await bump_tenant(tenant["id"])
+        migrated += 1
+    if migrated:
+        logger.info(f"Moved inline images of {migrated} tenants into the asset store")
+    return migrated
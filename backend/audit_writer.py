@@ -0,0 +1,195 @@
+"""Buffered audit-log writer
+
+`log_audit` only enqueues the record; a background task started from the
+server lifespan writes the queue to `audit_logs` with `insert_many`, flushing
+every AUDIT_FLUSH_MS or AUDIT_BATCH_SIZE records, whichever comes first.
+
+- the queue is bounded (AUDIT_QUEUE_SIZE): when it is full, callers wait for
+  room instead of growing memory without limit
+- batches MongoDB rejects are appended to AUDIT_FALLBACK_PATH (NDJSON) and
+  re-inserted on the next startup. Every worker shares the file: appends hold
+  an exclusive lock, and a replay first claims the file by renaming it under
+  that lock, so only one worker replays a record and none is appended to a
+  file that is being replayed
+- shutdown drains the queue before the Mongo client goes away
+- without a running writer (scripts, CLI tools) records are inserted directly
+
+Records become visible in /api/audit-logs up to AUDIT_FLUSH_MS after the
+request that produced them.
+"""
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import time
+from typing import List, Optional
+
+from pymongo.errors import BulkWriteError
+
+from database import db, ROOT_DIR
+
+logger = logging.getLogger(__name__)
+
+AUDIT_QUEUE_SIZE = int(os.environ.get("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.environ.get("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_MS = int(os.environ.get("AUDIT_FLUSH_MS", "200"))
+AUDIT_DRAIN_TIMEOUT = 10
+AUDIT_FALLBACK_PATH = os.environ.get("AUDIT_FALLBACK_PATH", str(ROOT_DIR / "audit_fallback.ndjson"))
+
+
+class AuditWriter:
+    """Bounded queue of audit documents flushed in batches by one background task"""
+
+    def __init__(self, maxsize: int = AUDIT_QUEUE_SIZE, batch_size: int = AUDIT_BATCH_SIZE,
+                 flush_ms: int = AUDIT_FLUSH_MS, fallback_path: str = AUDIT_FALLBACK_PATH):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_seconds = flush_ms / 1000
+        self.fallback_path = fallback_path
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"enqueued": 0, "written": 0, "batches": 0, "fallback": 0, "blocked": 0, "direct": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        await self.replay_fallback()
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._task = asyncio.create_task(self._run(), name="audit-writer")
+
+    async def stop(self):
+        """Flush everything still queued, then stop the background task"""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), AUDIT_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.error(f"Audit queue not drained in {AUDIT_DRAIN_TIMEOUT}s, {self._queue.qsize()} records lost")
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def enqueue(self, doc: dict):
+        if not self.running:
+            self.stats["direct"] += 1
+            await db.audit_logs.insert_one(doc)
+            return
+        self.stats["enqueued"] += 1
+        if self._queue.full():
+            # Backpressure: the caller waits until the writer catches up
+            self.stats["blocked"] += 1
+        await self._queue.put(doc)
+
+    async def _next_batch(self) -> List[dict]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write(self, batch: List[dict]):
+        try:
+            # insert_many adds `_id` to the dicts - copy so callers' dicts stay clean
+            await db.audit_logs.insert_many([dict(doc) for doc in batch], ordered=False)
+            self.stats["written"] += len(batch)
+            self.stats["batches"] += 1
+        except BulkWriteError as e:
+            # Keep only the records that were not written
+            failed = {error["index"] for error in e.details.get("writeErrors", [])}
+            self.stats["written"] += len(batch) - len(failed)
+            await self._fallback([doc for i, doc in enumerate(batch) if i in failed], e)
+        except Exception as e:
+            await self._fallback(batch, e)
+
+    async def _fallback(self, batch: List[dict], error: Exception):
+        if not batch:
+            return
+        logger.error(f"Audit batch of {len(batch)} failed, writing to {self.fallback_path}: {error}")
+        try:
+            await asyncio.to_thread(self._append_fallback, batch)
+            self.stats["fallback"] += len(batch)
+        except OSError as file_error:
+            logger.error(f"Audit fallback write failed, {len(batch)} records lost: {file_error}")
+
+    def _open_locked(self, mode: str):
+        """The fallback file opened and exclusively locked - None if there is none to read"""
+        while True:
+            try:
+                f = open(self.fallback_path, mode, encoding="utf-8")
+            except FileNotFoundError:
+                return None
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                if os.stat(self.fallback_path).st_ino == os.fstat(f.fileno()).st_ino:
+                    return f
+            except FileNotFoundError:
+                pass
+            # Claimed by a replay while we waited for the lock - start over on the current file
+            f.close()
+
+    def _append_fallback(self, batch: List[dict]):
+        with self._open_locked("a") as f:
+            for doc in batch:
+                f.write(json.dumps(doc, default=str) + "\n")
+
+    def _claim_fallback(self) -> Optional[str]:
+        """Move the fallback file aside for this process to replay - None if there is none"""
+        f = self._open_locked("r")
+        if f is None:
+            return None
+        with f:
+            claimed = f"{self.fallback_path}.{os.getpid()}.replay"
+            os.rename(self.fallback_path, claimed)
+        return claimed
+
+    async def replay_fallback(self):
+        """Insert records a previous run could not write; failures go back to the fallback file"""
+        claimed = await asyncio.to_thread(self._claim_fallback)
+        if claimed is None:
+            return
+        with open(claimed, encoding="utf-8") as f:
+            docs = [json.loads(line) for line in f if line.strip()]
+        failed = []
+        try:
+            if docs:
+                await db.audit_logs.insert_many(docs, ordered=False)
+            logger.info(f"Replayed {len(docs)} audit records from {self.fallback_path}")
+        except BulkWriteError as e:
+            indexes = {error["index"] for error in e.details.get("writeErrors", [])}
+            failed = [doc for i, doc in enumerate(docs) if i in indexes]
+            logger.error(f"Audit fallback replay left {len(failed)} records in {self.fallback_path}: {e}")
+        except Exception as e:
+            failed = docs
+            logger.error(f"Audit fallback replay failed, keeping records in {self.fallback_path}: {e}")
+        for doc in failed:
+            doc.pop("_id", None)
+        if failed:
+            await asyncio.to_thread(self._append_fallback, failed)
+        os.remove(claimed)
+
+    def metrics(self) -> dict:
+        return {**self.stats, "queued": self._queue.qsize() if self._queue else 0, "running": self.running}
+
+
+audit_writer = AuditWriter()
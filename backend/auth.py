@@ -3,37 +3,133 @@ from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from datetime import datetime, timezone, timedelta
 from typing import List
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hashlib
+import hmac
+import time
 import jwt
 import os
 import bcrypt
 
 from database import db
 from models import UserRole, AuditLog
+from cache import TTLCache
+from audit_writer import audit_writer
 
 # JWT Config
 JWT_SECRET = os.environ.get('JWT_SECRET', 't3next_pos_secret_key')
 JWT_ALGORITHM = os.environ.get('JWT_ALGORITHM', 'HS256')
 JWT_EXPIRATION_HOURS = int(os.environ.get('JWT_EXPIRATION_HOURS', 24))
 
+# Principal cache - saves the users lookup on every authenticated request.
+# Writes drop the entry only in the worker that made them, so another worker can
+# serve a deleted, demoted or suspended user for up to USER_CACHE_TTL seconds.
+USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', 5))
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 10000))
+# Opt-in: read-only endpoints trust signed token claims instead of loading the user
+TRUST_TOKEN_CLAIMS = os.environ.get('TRUST_TOKEN_CLAIMS', 'false').lower() in ('1', 'true', 'yes')
+
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+# PIN digests - keyed HMAC so PINs are looked up by digest, never compared in plaintext
+PIN_DIGEST_KEY = os.environ.get('PIN_DIGEST_KEY', JWT_SECRET).encode('utf-8')
+
+# Password hashing - bcrypt runs in a bounded pool so it never blocks the event loop
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+
+password_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+password_pool_stats = {"in_flight": 0, "max_in_flight": 0, "completed": 0, "total_ms": 0.0}
+
 # Security
 security = HTTPBearer()
 
 
 def hash_password(password: str) -> str:
-    """Hash a password using bcrypt directly"""
-    salt = bcrypt.gensalt()
+    """Hash a password using bcrypt directly (blocking - use hash_password_async in handlers)"""
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against a hash"""
+    """Verify a password against a hash (blocking - use verify_password_async in handlers)"""
     try:
         return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
     except Exception:
         return False
 
 
-def create_token(user_id: str, username: str, role: str, tenant_id: str = None) -> str:
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True when a bcrypt hash was made with a cost other than BCRYPT_ROUNDS"""
+    try:
+        return int(hashed_password.split('$')[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError, AttributeError):
+        return False
+
+
+def pin_digest(tenant_id: str, pin: str) -> str:
+    """Keyed digest of a PIN, scoped to its tenant so equal PINs in different tenants never collide"""
+    message = f"{tenant_id or ''}:{pin}".encode('utf-8')
+    return hmac.new(PIN_DIGEST_KEY, message, hashlib.sha256).hexdigest()
+
+
+def pin_matches(user: dict, pin: str) -> bool:
+    """Constant-time check of a PIN against a user's stored digest"""
+    stored = user.get("pin_digest")
+    if not stored or not pin:
+        return False
+    return hmac.compare_digest(stored, pin_digest(user.get("tenant_id"), pin))
+
+
+async def backfill_pin_digests():
+    """One-off migration: replace plaintext pins with pin_digest"""
+    cursor = db.users.find({"pin": {"$exists": True}}, {"_id": 0, "id": 1, "pin": 1, "pin_digest": 1, "tenant_id": 1})
+    async for user in cursor:
+        update = {"$unset": {"pin": ""}}
+        if user["pin"] and not user.get("pin_digest"):
+            update["$set"] = {"pin_digest": pin_digest(user.get("tenant_id"), user["pin"])}
+        await db.users.update_one({"id": user["id"]}, update)
+
+
+async def _run_in_password_pool(fn, *args):
+    """Run a bcrypt call in the password pool, tracking queue depth"""
+    password_pool_stats["in_flight"] += 1
+    password_pool_stats["max_in_flight"] = max(password_pool_stats["max_in_flight"], password_pool_stats["in_flight"])
+    started = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(password_pool, fn, *args)
+    finally:
+        password_pool_stats["in_flight"] -= 1
+        password_pool_stats["completed"] += 1
+        password_pool_stats["total_ms"] += (time.perf_counter() - started) * 1000
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password without blocking the event loop"""
+    return await _run_in_password_pool(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password without blocking the event loop"""
+    return await _run_in_password_pool(verify_password, plain_password, hashed_password)
+
+
+def password_pool_metrics() -> dict:
+    """Queue depth and timing of the password pool"""
+    completed = password_pool_stats["completed"]
+    return {
+        "workers": PASSWORD_HASH_WORKERS,
+        "bcrypt_rounds": BCRYPT_ROUNDS,
+        "in_flight": password_pool_stats["in_flight"],
+        "queued": max(0, password_pool_stats["in_flight"] - PASSWORD_HASH_WORKERS),
+        "max_in_flight": password_pool_stats["max_in_flight"],
+        "completed": completed,
+        "avg_ms": round(password_pool_stats["total_ms"] / completed, 2) if completed else 0
+    }
+
+
+def create_token(user_id: str, username: str, role: str, tenant_id: str = None, branch_id: str = None) -> str:
     """Create a JWT token for a user"""
     payload = {
         "sub": user_id,
@@ -43,24 +139,71 @@ def create_token(user_id: str, username: str, role: str, tenant_id: str = None)
     }
     if tenant_id:
         payload["tenant_id"] = tenant_id
+    if branch_id:
+        payload["branch_id"] = branch_id
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
-    """Get the current authenticated user from JWT token"""
-    token = credentials.credentials
+def decode_token(token: str) -> dict:
+    """Decode and verify a JWT token"""
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user = await db.users.find_one({"id": payload["sub"]}, {"_id": 0, "password_hash": 0})
-        if not user:
-            raise HTTPException(status_code=401, detail="Përdoruesi nuk u gjet")
-        return user
+        return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token-i ka skaduar")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Token i pavlefshëm")
 
 
+async def load_principal(user_id: str) -> dict:
+    """Load a user through the principal cache
+
+    Users of a suspended tenant are refused with 403 when the entry is loaded
+    (once per USER_CACHE_TTL), not only at login.
+    """
+    user = user_cache.get(user_id)
+    if user is None:
+        user = await db.users.find_one({"id": user_id}, {"_id": 0, "password_hash": 0})
+        if not user:
+            raise HTTPException(status_code=401, detail="Përdoruesi nuk u gjet")
+        tenant_id = user.get("tenant_id")
+        if tenant_id and user.get("role") != UserRole.SUPER_ADMIN:
+            tenant = await db.tenants.find_one({"id": tenant_id}, {"_id": 0, "status": 1})
+            if tenant and tenant.get("status") == "suspended":
+                raise HTTPException(status_code=403, detail="Firma juaj është pezulluar. Kontaktoni administratorin.")
+        user_cache.set(user_id, user)
+    return dict(user)
+
+
+def invalidate_user(user_id: str):
+    """Drop a cached principal after the user was changed or deleted"""
+    user_cache.invalidate(user_id)
+
+
+def invalidate_tenant_users(tenant_id: str):
+    """Drop every cached principal of a tenant (suspension, deletion)"""
+    user_cache.invalidate_where(lambda _, user: user.get("tenant_id") == tenant_id)
+
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    """Get the current authenticated user from JWT token"""
+    payload = decode_token(credentials.credentials)
+    return await load_principal(payload["sub"])
+
+
+async def get_token_principal(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    """Principal for read-only endpoints - built from signed claims when TRUST_TOKEN_CLAIMS is on"""
+    payload = decode_token(credentials.credentials)
+    if not TRUST_TOKEN_CLAIMS or "role" not in payload:
+        return await load_principal(payload["sub"])
+    return {
+        "id": payload["sub"],
+        "username": payload.get("username"),
+        "role": payload["role"],
+        "tenant_id": payload.get("tenant_id"),
+        "branch_id": payload.get("branch_id")
+    }
+
+
 def require_role(allowed_roles: List[UserRole]):
     """Dependency to require specific roles for an endpoint"""
     async def role_checker(current_user: dict = Depends(get_current_user)):
@@ -89,8 +232,8 @@ def add_tenant_id(data: dict, current_user: dict) -> dict:
 
 
 async def log_audit(user_id: str, action: str, entity_type: str, entity_id: str, details: dict = None):
-    """Log an audit event"""
+    """Log an audit event - queued for the buffered writer, not written on the request path"""
     audit = AuditLog(user_id=user_id, action=action, entity_type=entity_type, entity_id=entity_id, details=details)
     doc = audit.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
-    await db.audit_logs.insert_one(doc)
+    await audit_writer.enqueue(doc)
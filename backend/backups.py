@@ -0,0 +1,248 @@
+"""Chunked reset backups
+
+A reset moves the affected documents into `backup_chunks` instead of copying
+them into one `reset_backups` document (which hit the 16MB limit and held the
+whole tenant in memory). Documents are read with a cursor and written
+BACKUP_CHUNK_SIZE at a time as gzip-compressed NDJSON; each chunk is deleted
+from its source collection only after the chunk is stored. Memory stays at
+one chunk whatever the tenant size.
+
+The `reset_backups` document is the manifest: reset type, status and the
+document/chunk count per collection. Backups written before chunking keep
+their documents in arrays on the manifest; `iter_chunks` reads both formats.
+
+Restores run as background jobs (`restore_jobs`): each chunk goes back with
+one unordered `insert_many`, and duplicate-key errors on the unique `id`
+indexes count as "already present". Restored sales are added to the daily
+rollups with the same `$inc` as new sales. Progress is written to the job
+document after every chunk. At most one job per backup runs at a time (unique
+partial index on `restore_jobs(backup_id)` where `status` is "running").
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from bson import Binary
+from pymongo.errors import BulkWriteError
+
+from database import db
+from auth import log_audit
+from rollups import record_sales
+from tenant_stats import adjust_counts
+
+logger = logging.getLogger(__name__)
+
+BACKUP_CHUNK_SIZE = int(os.environ.get("BACKUP_CHUNK_SIZE", "1000"))
+BACKUP_COLLECTIONS = ["sales", "cash_drawers", "drawer_transactions", "stock_movements"]
+BACKUP_FORMAT = "chunked"
+# Projection that keeps legacy backup arrays out of manifest reads
+MANIFEST_PROJECTION = {"_id": 0, "sales": 0, "cash_drawers": 0, "stock_movements": 0}
+
+
+def pack(docs: List[dict]) -> bytes:
+    return gzip.compress("".join(json.dumps(doc, default=str) + "\n" for doc in docs).encode())
+
+
+def unpack(data: bytes) -> List[dict]:
+    return [json.loads(line) for line in gzip.decompress(data).decode().splitlines() if line]
+
+
+class BackupWriter:
+    """Moves documents from their collections into the chunks of one backup"""
+
+    def __init__(self, backup_id: str, tenant_id: Optional[str], chunk_size: int = BACKUP_CHUNK_SIZE):
+        self.backup_id = backup_id
+        self.tenant_id = tenant_id
+        self.chunk_size = chunk_size
+        self.documents: Dict[str, int] = {name: 0 for name in BACKUP_COLLECTIONS}
+        self.chunks: Dict[str, int] = {name: 0 for name in BACKUP_COLLECTIONS}
+
+    async def move(
+        self,
+        collection: str,
+        query: dict,
+        on_chunk: Optional[Callable[[List[str]], Awaitable]] = None
+    ) -> int:
+        """Back up and delete every document matching `query` - returns the number moved"""
+        moved = 0
+        chunk = []
+        cursor = db[collection].find(query, {"_id": 0}).batch_size(self.chunk_size)
+        async for doc in cursor:
+            chunk.append(doc)
+            if len(chunk) >= self.chunk_size:
+                moved += await self._flush(collection, query, chunk, on_chunk)
+                chunk = []
+        if chunk:
+            moved += await self._flush(collection, query, chunk, on_chunk)
+        return moved
+
+    async def _flush(self, collection: str, query: dict, docs: List[dict], on_chunk) -> int:
+        await db.backup_chunks.insert_one({
+            "backup_id": self.backup_id,
+            "tenant_id": self.tenant_id,
+            "collection": collection,
+            "seq": self.chunks[collection],
+            "count": len(docs),
+            "data": Binary(pack(docs))
+        })
+        self.chunks[collection] += 1
+        self.documents[collection] += len(docs)
+
+        ids = [doc["id"] for doc in docs]
+        # Delete only what is now safely in the chunk
+        result = await db[collection].delete_many({**query, "id": {"$in": ids}})
+        if on_chunk:
+            await on_chunk(ids)
+        return result.deleted_count
+
+    def manifest(self) -> dict:
+        return {
+            name: {"documents": self.documents[name], "chunks": self.chunks[name]}
+            for name in BACKUP_COLLECTIONS
+        }
+
+
+async def iter_chunks(backup: dict, collection: str) -> AsyncIterator[List[dict]]:
+    """Documents of one collection in a backup, one chunk at a time"""
+    if backup.get("format") != BACKUP_FORMAT:
+        legacy = await db.reset_backups.find_one({"id": backup["id"]}, {"_id": 0, collection: 1})
+        docs = (legacy or {}).get(collection) or []
+        for start in range(0, len(docs), BACKUP_CHUNK_SIZE):
+            yield docs[start:start + BACKUP_CHUNK_SIZE]
+        return
+    cursor = db.backup_chunks.find(
+        {"backup_id": backup["id"], "collection": collection}, {"_id": 0, "data": 1}
+    ).sort("seq", 1).batch_size(1)
+    async for chunk in cursor:
+        yield unpack(chunk["data"])
+
+
+async def stream_ndjson(backup: dict, collection: str) -> AsyncIterator[bytes]:
+    async for docs in iter_chunks(backup, collection):
+        yield "".join(json.dumps(doc, default=str) + "\n" for doc in docs).encode()
+
+
+async def delete_chunks(backup_id: str):
+    await db.backup_chunks.delete_many({"backup_id": backup_id})
+
+
+# ============ RESTORE ============
+DUPLICATE_KEY = 11000
+# A running job that has not reported progress for this long died with its worker
+RESTORE_STALE_SECONDS = 300
+
+# Strong references to running restore tasks (the event loop only keeps weak ones)
+_restore_tasks = set()
+
+
+async def insert_missing(collection: str, docs: List[dict]) -> Tuple[List[dict], int]:
+    """Insert a chunk in one round trip - returns (documents inserted, number already present)"""
+    if not docs:
+        return [], 0
+    try:
+        await db[collection].insert_many(docs, ordered=False)
+        return docs, 0
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(error["code"] != DUPLICATE_KEY for error in errors):
+            raise
+        # Unordered: everything except the reported indexes went in
+        failed = {error["index"] for error in errors}
+        return [doc for i, doc in enumerate(docs) if i not in failed], len(errors)
+
+
+async def _record_restored_sales(sales: List[dict]):
+    """Add restored sales to their daily rollups, as create_sale does for new ones"""
+    if not sales:
+        return
+    product_ids = list({item.get("product_id") for sale in sales for item in sale.get("items", [])})
+    products = db.products.find({"id": {"$in": product_ids}}, {"_id": 0, "id": 1, "purchase_price": 1})
+    await record_sales(sales, {p["id"]: p async for p in products})
+
+
+async def start_restore(backup: dict, current_user: dict) -> dict:
+    """Create a restore job for a backup and run it in the background
+
+    Raises DuplicateKeyError while another restore of the backup is running -
+    the unique partial index on running jobs makes the claim atomic.
+    """
+    # A job that stopped reporting progress must not hold the backup forever
+    await fail_interrupted_restores(backup["id"])
+    collections = backup.get("collections") or {}
+    job = {
+        "id": str(uuid.uuid4()),
+        "backup_id": backup["id"],
+        "tenant_id": current_user.get("tenant_id"),
+        "created_by": current_user["id"],
+        "status": "running",
+        "progress": {
+            name: {"total": collections.get(name, {}).get("documents"), "restored": 0, "existing": 0}
+            for name in BACKUP_COLLECTIONS
+        },
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+        "finished_at": None,
+        "error": None
+    }
+    await db.restore_jobs.insert_one(dict(job))
+    task = asyncio.create_task(_run_restore(job, backup))
+    _restore_tasks.add(task)
+    task.add_done_callback(_restore_tasks.discard)
+    return job
+
+
+async def _run_restore(job: dict, backup: dict):
+    progress = job["progress"]
+    try:
+        for collection in BACKUP_COLLECTIONS:
+            async for docs in iter_chunks(backup, collection):
+                inserted, existing = await insert_missing(collection, docs)
+                if collection == "sales":
+                    # Only the sales this job put back - the rollups are never rebuilt under live writes
+                    await _record_restored_sales(inserted)
+                progress[collection]["restored"] += len(inserted)
+                progress[collection]["existing"] += existing
+                await db.restore_jobs.update_one({"id": job["id"]}, {"$set": {
+                    "progress": progress, "updated_at": datetime.now(timezone.utc).isoformat()
+                }})
+
+        if progress["sales"]["restored"]:
+            await adjust_counts(job["tenant_id"], sales=progress["sales"]["restored"])
+        await db.reset_backups.update_one(
+            {"id": backup["id"]},
+            {"$set": {"restored_at": datetime.now(timezone.utc).isoformat(), "restored_by": job["created_by"]}}
+        )
+        await db.restore_jobs.update_one({"id": job["id"]}, {"$set": {
+            "status": "complete", "finished_at": datetime.now(timezone.utc).isoformat()
+        }})
+        await log_audit(job["created_by"], "restore_backup", "system", backup["id"], {
+            "job_id": job["id"],
+            "restored_sales": progress["sales"]["restored"],
+            "restored_drawers": progress["cash_drawers"]["restored"],
+            "restored_movements": progress["stock_movements"]["restored"]
+        })
+    except Exception as e:
+        logger.exception(f"Restore job {job['id']} failed")
+        await db.restore_jobs.update_one({"id": job["id"]}, {"$set": {
+            "status": "failed", "error": str(e), "finished_at": datetime.now(timezone.utc).isoformat()
+        }})
+
+
+def _stale_before() -> str:
+    return (datetime.now(timezone.utc) - timedelta(seconds=RESTORE_STALE_SECONDS)).isoformat()
+
+
+async def fail_interrupted_restores(backup_id: Optional[str] = None):
+    """Mark running jobs that stopped reporting progress as failed (run at startup and before a restore)"""
+    query = {"status": "running", "updated_at": {"$lt": _stale_before()}}
+    if backup_id:
+        query["backup_id"] = backup_id
+    await db.restore_jobs.update_many(
+        query,
+        {"$set": {"status": "failed", "error": "interrupted", "finished_at": datetime.now(timezone.utc).isoformat()}}
+    )
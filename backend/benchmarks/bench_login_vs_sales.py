@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Login burst vs. checkout latency benchmark
+Measures sale latency on its own, then again while a burst of concurrent
+logins (bcrypt verification) runs - the shift-change scenario. With bcrypt in
+the password pool the sale p99 should barely move.
+
+Usage:
+    REACT_APP_BACKEND_URL=http://localhost:8001 python benchmarks/bench_login_vs_sales.py [logins] [sales]
+"""
+import sys
+import threading
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_sales import BASE_URL, USERNAME, PASSWORD, percentile, login, create_products, delete_products
+
+LOGIN_WORKERS = 16
+
+
+def measure_sales(session, product_id, count):
+    sale = {
+        "items": [{"product_id": product_id, "quantity": 1, "unit_price": 2.0}],
+        "payment_method": "bank",
+        "bank_amount": 2.0
+    }
+    latencies = []
+    for _ in range(count):
+        started = time.perf_counter()
+        response = session.post(f"{BASE_URL}/api/sales", json=sale)
+        latencies.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+    return latencies
+
+
+def login_burst(total, stop):
+    """Fire `total` logins from LOGIN_WORKERS threads, returning their latencies"""
+    def one(_):
+        if stop.is_set():
+            return None
+        started = time.perf_counter()
+        requests.post(f"{BASE_URL}/api/auth/login", json={"username": USERNAME, "password": PASSWORD})
+        return (time.perf_counter() - started) * 1000
+
+    with ThreadPoolExecutor(max_workers=LOGIN_WORKERS) as pool:
+        return [t for t in pool.map(one, range(total)) if t is not None]
+
+
+def report(label, samples):
+    print(f"{label:<28} n={len(samples):<5} p50={percentile(samples, 50):>8.1f}ms p99={percentile(samples, 99):>8.1f}ms")
+
+
+def main():
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    sales = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    session = requests.Session()
+    session.headers.update({"Content-Type": "application/json"})
+    login(session)
+    product_ids = create_products(session, 1)
+    try:
+        report("sales (idle)", measure_sales(session, product_ids[0], sales))
+
+        stop = threading.Event()
+        login_latencies = []
+        burst = threading.Thread(target=lambda: login_latencies.extend(login_burst(logins, stop)))
+        burst.start()
+        report("sales (during login burst)", measure_sales(session, product_ids[0], sales))
+        stop.set()
+        burst.join()
+        report("logins", login_latencies)
+
+        metrics = session.get(f"{BASE_URL}/api/metrics").json().get("password_pool", {})
+        print(f"password pool: {metrics}")
+    finally:
+        delete_products(session, product_ids)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
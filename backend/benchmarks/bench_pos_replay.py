@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+POS terminal replay benchmark - conditional GETs
+Replays the reference-data requests a POS terminal makes on startup and while
+polling, first as plain GETs and then revalidating with If-None-Match. Reports
+bytes received, latency and server CPU (from /api/metrics) for both runs.
+
+Usage:
+    REACT_APP_BACKEND_URL=http://localhost:8001 python benchmarks/bench_pos_replay.py [rounds]
+"""
+import sys
+import time
+import requests
+
+from bench_sales import BASE_URL, percentile, login
+
+TERMINAL_REQUESTS = [
+    "/api/settings/company",
+    "/api/settings/pos",
+    "/api/branches",
+    "/api/warehouses",
+    "/api/vat-rates",
+    "/api/comment-templates",
+    "/api/categories",
+    "/api/products?limit=1000",
+]
+
+
+def server_cpu(session):
+    return session.get(f"{BASE_URL}/api/metrics").json()["process"]["cpu_seconds"]
+
+
+def replay(session, rounds, conditional):
+    etags = {}
+    received, latencies, not_modified = 0, [], 0
+    cpu_before = server_cpu(session)
+    for _ in range(rounds):
+        for path in TERMINAL_REQUESTS:
+            headers = {"If-None-Match": etags[path]} if conditional and path in etags else {}
+            started = time.perf_counter()
+            response = session.get(f"{BASE_URL}{path}", headers=headers)
+            latencies.append((time.perf_counter() - started) * 1000)
+            received += len(response.content)
+            if response.status_code == 304:
+                not_modified += 1
+            else:
+                response.raise_for_status()
+                if response.headers.get("ETag"):
+                    etags[path] = response.headers["ETag"]
+    return {
+        "bytes": received,
+        "requests": len(latencies),
+        "not_modified": not_modified,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "cpu": server_cpu(session) - cpu_before,
+    }
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    session = requests.Session()
+    session.headers.update({"Content-Type": "application/json"})
+    login(session)
+
+    plain = replay(session, rounds, conditional=False)
+    revalidated = replay(session, rounds, conditional=True)
+
+    print(f"{rounds} rounds x {len(TERMINAL_REQUESTS)} requests\n")
+    print(f"{'':<14} {'bytes':>12} {'304s':>6} {'p50 ms':>8} {'p99 ms':>8} {'server cpu s':>13}")
+    for label, run in (("plain GET", plain), ("If-None-Match", revalidated)):
+        print(f"{label:<14} {run['bytes']:>12} {run['not_modified']:>6} {run['p50']:>8.1f} {run['p99']:>8.1f} {run['cpu']:>13.3f}")
+    if plain["bytes"]:
+        print(f"\nbandwidth saved: {100 * (1 - revalidated['bytes'] / plain['bytes']):.1f}%")
+    if plain["cpu"] > 0:
+        print(f"server cpu saved: {100 * (1 - revalidated['cpu'] / plain['cpu']):.1f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Query plan benchmark
+Seeds a scratch database, explains the hot router queries, applies the index
+registry and explains them again - showing each plan switch from COLLSCAN to
+IXSCAN together with documents examined and execution time.
+
+Usage (from backend/):
+    MONGO_URL=mongodb://localhost:27017 DB_NAME=pos python benchmarks/bench_query_plans.py [docs]
+"""
+import asyncio
+import os
+import sys
+import uuid
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from auth import pin_digest  # noqa: E402
+from database import client  # noqa: E402
+from indexes import ensure_indexes  # noqa: E402
+
+SCRATCH_DB = f"{os.environ['DB_NAME']}_bench_plans"
+TENANTS = 20
+
+
+def plan_stages(plan: dict) -> list:
+    """Flatten the stages of a winning plan (classic and SBE explain layouts)"""
+    plan = plan.get("queryPlan", plan)
+    stages = [plan.get("stage")]
+    for child in [plan.get("inputStage")] + plan.get("inputStages", []):
+        if child:
+            stages += plan_stages(child)
+    return [s for s in stages if s]
+
+
+async def explain(collection, query, sort=None):
+    cursor = collection.find(query)
+    if sort:
+        cursor = cursor.sort(sort)
+    result = await cursor.limit(100).explain()
+    stats = result.get("executionStats", {})
+    stages = plan_stages(result["queryPlanner"]["winningPlan"])
+    access = "IXSCAN" if "IXSCAN" in stages else ("COLLSCAN" if "COLLSCAN" in stages else stages[-1])
+    return access, stats.get("totalDocsExamined", "?"), stats.get("executionTimeMillis", "?")
+
+
+async def seed(database, docs: int):
+    tenant_ids = [str(uuid.uuid4()) for _ in range(TENANTS)]
+    start = datetime.now(timezone.utc) - timedelta(days=365)
+    users, products, sales = [], [], []
+    for i in range(docs):
+        tenant_id = tenant_ids[i % TENANTS]
+        created_at = (start + timedelta(minutes=i)).isoformat()
+        users.append({"id": str(uuid.uuid4()), "tenant_id": tenant_id, "username": f"user{i}", "pin_digest": pin_digest(tenant_id, f"{i:06d}")})
+        products.append({"id": str(uuid.uuid4()), "tenant_id": tenant_id, "barcode": f"{i:013d}", "current_stock": i % 50})
+        sales.append({"id": str(uuid.uuid4()), "tenant_id": tenant_id, "user_id": users[-1]["id"], "created_at": created_at})
+    await database.users.insert_many(users)
+    await database.products.insert_many(products)
+    await database.sales.insert_many(sales)
+    return tenant_ids[0], users[docs // 2], products[docs // 2], sales[docs // 2]
+
+
+async def main():
+    docs = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    await client.drop_database(SCRATCH_DB)
+    database = client[SCRATCH_DB]
+    try:
+        tenant_id, user, product, sale = await seed(database, docs)
+        day = sale["created_at"][:10]
+        cases = [
+            ("products by id+tenant", database.products, {"id": product["id"], "tenant_id": product["tenant_id"]}, None),
+            ("products by barcode", database.products, {"barcode": product["barcode"], "tenant_id": product["tenant_id"]}, None),
+            ("users by pin_digest", database.users, {"tenant_id": user["tenant_id"], "pin_digest": user["pin_digest"]}, None),
+            ("users by username", database.users, {"username": user["username"]}, None),
+            ("sales created_at range", database.sales,
+             {"tenant_id": tenant_id, "created_at": {"$gte": day, "$lte": day + "T23:59:59"}}, [("created_at", -1)]),
+            ("sales by user", database.sales, {"tenant_id": sale["tenant_id"], "user_id": sale["user_id"]}, None),
+        ]
+
+        before = [await explain(coll, query, sort) for _, coll, query, sort in cases]
+        await ensure_indexes(database)
+        after = [await explain(coll, query, sort) for _, coll, query, sort in cases]
+
+        print(f"{docs} docs per collection\n")
+        print(f"{'query':<26} {'before':<24} {'after':<24}")
+        for (name, *_), b, a in zip(cases, before, after):
+            print(f"{name:<26} {f'{b[0]} {b[1]} docs {b[2]}ms':<24} {f'{a[0]} {a[1]} docs {a[2]}ms':<24}")
+    finally:
+        await client.drop_database(SCRATCH_DB)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
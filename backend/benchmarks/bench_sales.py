@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Checkout latency benchmark
+Posts sales with 1, 10 and 100 line baskets and prints p50/p99 latency per basket size.
+
+Usage:
+    REACT_APP_BACKEND_URL=http://localhost:8001 python benchmarks/bench_sales.py [runs]
+"""
+import os
+import sys
+import time
+import uuid
+import requests
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'http://localhost:8001').rstrip('/')
+USERNAME = os.environ.get('BENCH_USERNAME', 'admin')
+PASSWORD = os.environ.get('BENCH_PASSWORD', 'admin123')
+BASKET_SIZES = [1, 10, 100]
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def login(session):
+    response = session.post(f"{BASE_URL}/api/auth/login", json={"username": USERNAME, "password": PASSWORD})
+    response.raise_for_status()
+    session.headers.update({"Authorization": f"Bearer {response.json()['access_token']}"})
+
+
+def create_products(session, count):
+    """Create benchmark products with enough stock for every run"""
+    tag = str(uuid.uuid4())[:8]
+    ids = []
+    for i in range(count):
+        response = session.post(f"{BASE_URL}/api/products", json={
+            "name": f"BENCH_{tag}_{i}",
+            "barcode": f"BENCH{tag}{i:04d}",
+            "purchase_price": 1.0,
+            "sale_price": 2.0,
+            "initial_stock": 1000000
+        })
+        response.raise_for_status()
+        ids.append(response.json()["id"])
+    return ids
+
+
+def delete_products(session, ids):
+    for product_id in ids:
+        session.delete(f"{BASE_URL}/api/products/{product_id}")
+
+
+def run_basket(session, product_ids, lines, runs):
+    """Post `runs` sales of `lines` lines each and return latencies in ms"""
+    sale = {
+        "items": [
+            {"product_id": product_ids[i % len(product_ids)], "quantity": 1, "unit_price": 2.0, "vat_percent": 18}
+            for i in range(lines)
+        ],
+        "payment_method": "bank",
+        "bank_amount": 2.36 * lines
+    }
+    latencies = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        response = session.post(f"{BASE_URL}/api/sales", json=sale)
+        latencies.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+    return latencies
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    session = requests.Session()
+    session.headers.update({"Content-Type": "application/json"})
+    login(session)
+
+    product_ids = create_products(session, max(BASKET_SIZES))
+    try:
+        print(f"{'lines':>6} {'runs':>6} {'p50 ms':>10} {'p99 ms':>10}")
+        for lines in BASKET_SIZES:
+            latencies = run_basket(session, product_ids, lines, runs)
+            print(f"{lines:>6} {runs:>6} {percentile(latencies, 50):>10.1f} {percentile(latencies, 99):>10.1f}")
+    finally:
+        delete_products(session, product_ids)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
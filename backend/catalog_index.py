@@ -0,0 +1,215 @@
+"""In-process product catalog index for barcode scans and type-ahead search
+
+One `CatalogIndex` per tenant holds the tenant's products with:
+    - an exact barcode -> product map
+    - a prefix trie over name words and barcodes
+    - a trigram -> product ids index over names and barcodes (substring search)
+
+Indexes are built lazily on first use and cached per worker for CATALOG_TTL
+seconds. Product create/update/delete (`catalog_edited`) drop the tenant's
+index and bump its `catalog_edits` version; sales and stock movements on this
+worker adjust `current_stock` in place, so a scan after a sale stays in memory.
+
+Other workers' writes reach the index through the change feed (catalog_sync):
+a lookup applies the delta since the index's sync token when the edit version
+moved (cached for ETAG_VERSION_TTL), and otherwise at most every
+CATALOG_STOCK_REFRESH seconds for stock sold elsewhere - a full rebuild only
+when the delta is too long or the token expired. Barcode misses still fall
+through to MongoDB.
+"""
+import asyncio
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+from cache import TTLCache
+from catalog_sync import changes_since, current_token
+from database import db
+from etag import bump, current_version
+
+CATALOG_TTL = float(os.environ.get("CATALOG_TTL", "300"))
+CATALOG_CACHE_SIZE = int(os.environ.get("CATALOG_CACHE_SIZE", "256"))
+CATALOG_STOCK_REFRESH = float(os.environ.get("CATALOG_STOCK_REFRESH", "30"))
+# Bumped by product create/update/delete only - sales do not move it
+CATALOG_EDITS = "catalog_edits"
+
+catalogs = TTLCache(maxsize=CATALOG_CACHE_SIZE, ttl=CATALOG_TTL)
+_build_locks: Dict[str, asyncio.Lock] = {}
+_generations: Dict[str, int] = {}
+
+
+def _normalize(text: Optional[str]) -> str:
+    return (text or "").strip().lower()
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class _TrieNode:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.ids: Set[str] = set()
+
+
+class CatalogIndex:
+    """Search structures over one tenant's products"""
+
+    def __init__(self, products: Iterable[dict], token: str = "", version: int = 0):
+        # Change feed position: sync token for the next delta, edit version seen, time of the last delta
+        self.token = token
+        self.version = version
+        self.refreshed_at = time.monotonic()
+        self.products: Dict[str, dict] = {}
+        self.by_barcode: Dict[str, str] = {}
+        self.trie = _TrieNode()
+        self.grams: Dict[str, Set[str]] = {}
+        for product in products:
+            self._add(product)
+
+    def _terms(self, product: dict) -> List[str]:
+        name = _normalize(product.get("name"))
+        return [t for t in [name, *name.split(), _normalize(product.get("barcode"))] if t]
+
+    def _add(self, product: dict):
+        product_id = product["id"]
+        self.products[product_id] = product
+        if product.get("barcode"):
+            self.by_barcode[product["barcode"]] = product_id
+        for term in self._terms(product):
+            node = self.trie
+            for char in term:
+                node = node.children.setdefault(char, _TrieNode())
+                node.ids.add(product_id)
+            for gram in _trigrams(term):
+                self.grams.setdefault(gram, set()).add(product_id)
+
+    def _remove(self, product_id: str):
+        product = self.products.pop(product_id, None)
+        if product is None:
+            return
+        if self.by_barcode.get(product.get("barcode")) == product_id:
+            del self.by_barcode[product["barcode"]]
+        for term in self._terms(product):
+            node = self.trie
+            for char in term:
+                node = node.children.get(char)
+                if node is None:
+                    break
+                node.ids.discard(product_id)
+            for gram in _trigrams(term):
+                self.grams.get(gram, set()).discard(product_id)
+
+    def apply_changes(self, changed: Iterable[dict], deleted: Iterable[str]):
+        """Upsert changed products and drop deleted ids"""
+        for product in changed:
+            self._remove(product["id"])
+            self._add(product)
+        for product_id in deleted:
+            self._remove(product_id)
+
+    def barcode(self, barcode: str) -> Optional[dict]:
+        product_id = self.by_barcode.get(barcode)
+        return self.products.get(product_id) if product_id else None
+
+    def search(self, text: str) -> List[dict]:
+        """Products whose name or barcode contains `text` (case-insensitive)"""
+        text = _normalize(text)
+        if not text:
+            return list(self.products.values())
+
+        if len(text) < 3:
+            # Too short for trigrams - prefix match on words and barcodes
+            node = self.trie
+            for char in text:
+                node = node.children.get(char)
+                if node is None:
+                    return []
+            return [self.products[i] for i in node.ids]
+
+        candidates = None
+        for gram in _trigrams(text):
+            ids = self.grams.get(gram)
+            if not ids:
+                return []
+            candidates = set(ids) if candidates is None else candidates & ids
+        # Trigrams can match out of order - confirm the substring
+        return [
+            p for p in (self.products[i] for i in candidates)
+            if text in _normalize(p.get("name")) or text in _normalize(p.get("barcode"))
+        ]
+
+    def adjust_stock(self, deltas: Dict[str, float]):
+        for product_id, delta in deltas.items():
+            product = self.products.get(product_id)
+            if product is not None:
+                product["current_stock"] = product.get("current_stock", 0) + delta
+
+
+async def _build(tenant_id: str, version: int) -> CatalogIndex:
+    # Token first: writes landing during the load are re-sent by the next delta
+    token = await current_token(tenant_id)
+    products = await db.products.find({"tenant_id": tenant_id}, {"_id": 0}).to_list(None)
+    return CatalogIndex(products, token, version)
+
+
+async def _refresh(tenant_id: str, catalog: CatalogIndex, version: int) -> Optional[CatalogIndex]:
+    """Bring a cached index up to `version` in place - None when it must be rebuilt"""
+    delta = await changes_since(tenant_id, catalog.token)
+    if delta["reset"] or delta["has_more"]:
+        return None
+    catalog.apply_changes(delta["changes"], delta["deleted"])
+    catalog.token = delta["since"]
+    catalog.version = version
+    catalog.refreshed_at = time.monotonic()
+    return catalog
+
+
+def _is_current(catalog: Optional[CatalogIndex], version: int) -> bool:
+    return (
+        catalog is not None and catalog.version >= version
+        and time.monotonic() - catalog.refreshed_at < CATALOG_STOCK_REFRESH
+    )
+
+
+async def get_catalog(tenant_id: str) -> CatalogIndex:
+    """The tenant's catalog index - built on a miss, refreshed after edits or CATALOG_STOCK_REFRESH"""
+    version = await current_version(CATALOG_EDITS, tenant_id)
+    catalog = catalogs.get(tenant_id)
+    if _is_current(catalog, version):
+        return catalog
+    lock = _build_locks.setdefault(tenant_id, asyncio.Lock())
+    async with lock:
+        catalog = catalogs.get(tenant_id)
+        if _is_current(catalog, version):
+            return catalog
+        generation = _generations.get(tenant_id, 0)
+        if catalog is not None and await _refresh(tenant_id, catalog, version):
+            # Updated in place - keeps its expiry, so CATALOG_TTL still bounds its age
+            return catalog
+        catalog = await _build(tenant_id, version)
+        # A write during the load makes this snapshot stale - serve it once, don't cache it
+        if _generations.get(tenant_id, 0) == generation:
+            catalogs.set(tenant_id, catalog)
+    return catalog
+
+
+def invalidate_catalog(tenant_id: Optional[str]):
+    """Drop this worker's index of a tenant"""
+    _generations[tenant_id] = _generations.get(tenant_id, 0) + 1
+    catalogs.invalidate(tenant_id)
+
+
+async def catalog_edited(tenant_id: Optional[str]):
+    """After product create/update/delete - drop the local index, other workers refresh theirs"""
+    invalidate_catalog(tenant_id)
+    await bump(CATALOG_EDITS, tenant_id)
+
+
+def adjust_catalog_stock(tenant_id: Optional[str], deltas: Dict[str, float]):
+    """Mirror a stock $inc into a warm index (no-op if the tenant is not cached)"""
+    catalog = catalogs.peek(tenant_id)
+    if catalog is not None:
+        catalog.adjust_stock(deltas)
@@ -0,0 +1,116 @@
+"""Per-tenant product change feed for POS catalog delta sync
+
+Every product write stamps the product with `change_seq` (from the
+`catalog:<tenant>` counter) and `changed_at`. Deletes leave a tombstone in
+`product_tombstones`, kept for TOMBSTONE_RETENTION_DAYS.
+
+A sync token is an opaque encoding of (last change_seq, server time of the
+sync). Sequence values are allocated before the write lands, so a slow write
+can become visible after a later one was already synced; each sync therefore
+also re-sends rows changed within SETTLE_SECONDS of the previous token.
+Re-sent rows are harmless - clients upsert by id.
+"""
+import base64
+import json
+import os
+from datetime import datetime, timezone, timedelta
+from typing import List, Optional
+
+from fastapi import HTTPException
+
+from database import db
+from sequences import allocate
+from etag import remember_version
+
+SETTLE_SECONDS = 30
+TOMBSTONE_RETENTION_DAYS = int(os.environ.get("TOMBSTONE_RETENTION_DAYS", "30"))
+MAX_CHANGES = 1000
+
+
+def _counter_key(tenant_id: Optional[str]) -> str:
+    return f"catalog:{tenant_id}"
+
+
+async def next_changes(tenant_id: Optional[str], count: int = 1) -> List[dict]:
+    """Reserve `count` change stamps ({change_seq, changed_at}) in one round trip"""
+    last = await allocate(_counter_key(tenant_id), count)
+    # The change counter doubles as the catalog ETag version
+    remember_version("catalog", tenant_id, last)
+    changed_at = datetime.now(timezone.utc).isoformat()
+    return [{"change_seq": seq, "changed_at": changed_at} for seq in range(last - count + 1, last + 1)]
+
+
+async def next_change(tenant_id: Optional[str]) -> dict:
+    return (await next_changes(tenant_id))[0]
+
+
+async def record_tombstone(tenant_id: Optional[str], product_id: str):
+    """Remember a deleted product so synced terminals drop it"""
+    change = await next_change(tenant_id)
+    await db.product_tombstones.insert_one({
+        "tenant_id": tenant_id,
+        "product_id": product_id,
+        **change,
+        "deleted_at": datetime.now(timezone.utc)
+    })
+
+
+def encode_token(change_seq: int, synced_at: Optional[str]) -> str:
+    raw = json.dumps([change_seq, synced_at], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_token(token: str) -> tuple:
+    try:
+        change_seq, synced_at = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        return int(change_seq), synced_at
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Tokeni i sinkronizimit është i pavlefshëm")
+
+
+def _since_filter(change_seq: int, synced_at: Optional[str]) -> dict:
+    if not synced_at:
+        return {"change_seq": {"$gt": change_seq}}
+    settle_from = (datetime.fromisoformat(synced_at) - timedelta(seconds=SETTLE_SECONDS)).isoformat()
+    return {"$or": [{"change_seq": {"$gt": change_seq}}, {"changed_at": {"$gte": settle_from}}]}
+
+
+async def current_token(tenant_id: Optional[str]) -> str:
+    counter = await db.counters.find_one({"_id": _counter_key(tenant_id)})
+    return encode_token(counter["value"] if counter else 0, datetime.now(timezone.utc).isoformat())
+
+
+async def changes_since(tenant_id: Optional[str], token: str, limit: int = MAX_CHANGES) -> dict:
+    """Products changed and ids deleted after `token`, oldest change first"""
+    change_seq, synced_at = decode_token(token)
+    if synced_at:
+        retention_start = datetime.now(timezone.utc) - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+        if datetime.fromisoformat(synced_at) < retention_start:
+            # Tombstones older than the token may be gone - the terminal must reload
+            return {"changes": [], "deleted": [], "since": await current_token(tenant_id), "has_more": False, "reset": True}
+
+    query = {"tenant_id": tenant_id, **_since_filter(change_seq, synced_at)}
+    products = await db.products.find(query, {"_id": 0}).sort("change_seq", 1).to_list(limit + 1)
+    tombstones = await db.product_tombstones.find(
+        query, {"_id": 0, "product_id": 1, "change_seq": 1}
+    ).sort("change_seq", 1).to_list(limit + 1)
+
+    # Merge both feeds by sequence and cut at `limit`
+    rows = sorted(
+        [("product", p["change_seq"], p) for p in products] +
+        [("tombstone", t["change_seq"], t) for t in tombstones],
+        key=lambda row: row[1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    last_seq = max([change_seq] + [seq for _, seq, _ in rows])
+    # Continuation pages skip the settle window so they always make progress
+    synced_now = None if has_more else datetime.now(timezone.utc).isoformat()
+    return {
+        "changes": [doc for kind, _, doc in rows if kind == "product"],
+        "deleted": [doc["product_id"] for kind, _, doc in rows if kind == "tombstone"],
+        "since": encode_token(last_seq, synced_now),
+        "has_more": has_more,
+        "reset": False
+    }
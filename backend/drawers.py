@@ -0,0 +1,98 @@
+"""Cash drawer lookups and the drawer transaction ledger
+
+Drawer cash-in/cash-out entries live in `drawer_transactions`, one document
+per entry. The drawer itself only keeps running totals (`current_balance`,
+`transaction_count`, `total_in`, `total_out`) updated with `$inc`, so drawer
+documents stay the same size however busy the shift is.
+"""
+from typing import Optional
+from pymongo import ReturnDocument
+
+from database import db
+from models import CashDrawerStatus, DrawerTransactionEntry
+from auth import add_tenant_id
+
+# Drawers written before the ledger still carry an embedded `transactions` array
+DRAWER_PROJECTION = {"_id": 0, "transactions": 0}
+
+
+async def find_open_drawer(current_user: dict, tenant_filter: dict) -> Optional[dict]:
+    return await db.cash_drawers.find_one({
+        "user_id": current_user["id"],
+        "status": CashDrawerStatus.OPEN.value,
+        **tenant_filter
+    }, DRAWER_PROJECTION)
+
+
+async def record_drawer_transaction(
+    current_user: dict,
+    tenant_filter: dict,
+    amount: float,
+    transaction_type: str,
+    description: Optional[str] = None
+) -> Optional[dict]:
+    """Apply a cash in/out to the open drawer and append it to the ledger - None if no drawer is open"""
+    delta = amount if transaction_type == "in" else -amount
+    drawer = await db.cash_drawers.find_one_and_update(
+        {"user_id": current_user["id"], "status": CashDrawerStatus.OPEN.value, **tenant_filter},
+        {"$inc": {
+            "current_balance": delta,
+            "transaction_count": 1,
+            "total_in" if transaction_type == "in" else "total_out": amount
+        }},
+        projection=DRAWER_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
+    if not drawer:
+        return None
+
+    entry = DrawerTransactionEntry(
+        drawer_id=drawer["id"],
+        user_id=current_user["id"],
+        amount=amount,
+        type=transaction_type,
+        description=description,
+        balance_after=drawer["current_balance"]
+    )
+    doc = entry.model_dump()
+    doc['created_at'] = doc['created_at'].isoformat()
+    await db.drawer_transactions.insert_one(add_tenant_id(doc, current_user))
+    return drawer
+
+
+async def migrate_embedded_transactions():
+    """One-off migration: move embedded drawer `transactions` arrays into the ledger"""
+    cursor = db.cash_drawers.find(
+        {"transactions": {"$exists": True}},
+        {"_id": 0, "id": 1, "user_id": 1, "tenant_id": 1, "transactions": 1}
+    )
+    async for drawer in cursor:
+        entries = drawer.get("transactions") or []
+        docs = []
+        for i, record in enumerate(entries):
+            doc = DrawerTransactionEntry(
+                # Stable ids make a re-run after a crash harmless
+                id=f"{drawer['id']}:{i}",
+                drawer_id=drawer["id"],
+                user_id=drawer["user_id"],
+                amount=record.get("amount", 0),
+                type=record.get("type", "in"),
+                description=record.get("description")
+            ).model_dump()
+            doc["created_at"] = record.get("timestamp") or doc["created_at"].isoformat()
+            doc["tenant_id"] = drawer.get("tenant_id")
+            docs.append(doc)
+        if docs:
+            await db.drawer_transactions.delete_many({"id": {"$in": [d["id"] for d in docs]}})
+            await db.drawer_transactions.insert_many(docs)
+        await db.cash_drawers.update_one(
+            {"id": drawer["id"]},
+            {
+                "$unset": {"transactions": ""},
+                "$set": {
+                    "transaction_count": len(entries),
+                    "total_in": sum(e.get("amount", 0) for e in entries if e.get("type") == "in"),
+                    "total_out": sum(e.get("amount", 0) for e in entries if e.get("type") != "in")
+                }
+            }
+        )
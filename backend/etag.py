@@ -0,0 +1,121 @@
+"""Conditional GET support (ETag / If-None-Match) for read-mostly resources
+
+Each (resource, tenant) pair has a version counter in `counters`, bumped after
+every write to the resource. The ETag of a response is derived from that
+version and the request path/query, so `If-None-Match` can be answered with
+304 straight from the dependency - before the endpoint reads MongoDB or
+serializes anything.
+
+Versions are cached per worker for ETAG_VERSION_TTL seconds. The worker that
+performs a write sees the new version immediately; other workers may answer
+304 for an old version until their cached copy expires.
+
+Public tenant branding is versioned per tenant name (`public_scope`), so a
+write to one tenant does not revalidate every other tenant's subdomain.
+
+Usage:
+    @router.get("", dependencies=[Depends(conditional("branches"))])
+    ...
+    await bump("branches", tenant_id)   # after the write
+"""
+import hashlib
+import os
+from typing import Callable, Optional
+from fastapi import Depends, HTTPException, Request, Response
+
+from auth import get_token_principal, get_tenant_filter
+from cache import TTLCache
+from database import db
+from sequences import allocate
+
+ETAG_VERSION_TTL = float(os.environ.get("ETAG_VERSION_TTL", "2"))
+
+versions = TTLCache(maxsize=50000, ttl=ETAG_VERSION_TTL)
+etag_stats = {"not_modified": 0, "full": 0}
+
+
+def _key(resource: str, tenant_id: Optional[str]) -> str:
+    return f"{resource}:{tenant_id}"
+
+
+def public_scope(name: str) -> str:
+    """Version scope of a tenant's public branding - `name` as stored (normalized)"""
+    return f"@{name}"
+
+
+async def current_version(resource: str, tenant_id: Optional[str]) -> int:
+    key = _key(resource, tenant_id)
+    version = versions.get(key)
+    if version is None:
+        counter = await db.counters.find_one({"_id": key}, {"value": 1})
+        version = counter["value"] if counter else 0
+        versions.set(key, version)
+    return version
+
+
+def known_version(resource: str, tenant_id: Optional[str]) -> Optional[int]:
+    """The version this worker has cached, without reading MongoDB - None if it has none"""
+    return versions.peek(_key(resource, tenant_id))
+
+
+def remember_version(resource: str, tenant_id: Optional[str], version: int):
+    """Record a version this worker just allocated (never moves backwards)"""
+    key = _key(resource, tenant_id)
+    cached = versions.peek(key)
+    if cached is None or version > cached:
+        versions.set(key, version)
+
+
+async def bump(resource: str, tenant_id: Optional[str]):
+    """Invalidate every ETag of a resource for one tenant - call after the write"""
+    remember_version(resource, tenant_id, await allocate(_key(resource, tenant_id)))
+
+
+def make_etag(resource: str, tenant_id: Optional[str], version: int, request: Request) -> str:
+    variant = f"{tenant_id}|{request.url.path}|{sorted(request.query_params.multi_items())}"
+    return f'"{resource}.{version}.{hashlib.sha1(variant.encode()).hexdigest()[:16]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # If-None-Match uses weak comparison
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+async def _check(resource: str, scope: Optional[str], request: Request, response: Response, cache_control: str):
+    etag = make_etag(resource, scope, await current_version(resource, scope), request)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        etag_stats["not_modified"] += 1
+        raise HTTPException(status_code=304, headers=headers)
+    etag_stats["full"] += 1
+    response.headers.update(headers)
+
+
+def conditional(resource: str, principal=get_token_principal):
+    """Route dependency: tenant-scoped ETag, 304 on If-None-Match"""
+    async def dependency(request: Request, response: Response, current_user: dict = Depends(principal)):
+        scope = get_tenant_filter(current_user).get("tenant_id")
+        if scope is None:
+            # Unscoped (super admin) reads span every tenant's versions - always serve in full
+            return
+        await _check(resource, scope, request, response, "private, no-cache")
+    return dependency
+
+
+def conditional_public(resource: str, scope: Callable[[Request], str], cache_control: str = "public, no-cache"):
+    """Route dependency for unauthenticated resources, versioned by `scope(request)`"""
+    async def dependency(request: Request, response: Response):
+        await _check(resource, scope(request), request, response, cache_control)
+    return dependency
+
+
+def etag_metrics() -> dict:
+    answered = etag_stats["not_modified"] + etag_stats["full"]
+    return {
+        **etag_stats,
+        "not_modified_rate": round(etag_stats["not_modified"] / answered, 4) if answered else 0,
+        "versions": versions.stats()
+    }
@@ -0,0 +1,160 @@
+"""Idempotency-Key support for write endpoints
+
+A client that may retry a POST sends an `Idempotency-Key` header. The first
+request with a key claims it in `idempotency_keys` and runs normally; its
+response is stored under the key. A retry with the same key and body gets the
+stored response back (with `Idempotent-Replayed: true`) without re-executing.
+
+- a retry while the first request is still running gets 409
+- reusing a key with a different body gets 422
+- a request that fails releases its key, so the retry runs again
+- keys expire after IDEMPOTENCY_TTL_HOURS (TTL index on `created_at`)
+
+Completed responses are also kept in a per-worker front cache so hot retries
+do not read MongoDB.
+
+Usage:
+    @router.post("", response_model=SaleResponse)
+    async def create_sale(..., idempotency: IdempotentRequest = Depends(idempotent)):
+        ...
+        return await idempotency.save(SaleResponse(**doc))
+"""
+import hashlib
+import os
+from datetime import datetime, timezone, timedelta
+from typing import Any, Optional
+
+from fastapi import Depends, Header, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pymongo.errors import DuplicateKeyError
+
+from auth import get_current_user
+from cache import TTLCache
+from database import db
+
+IDEMPOTENCY_TTL_HOURS = int(os.environ.get("IDEMPOTENCY_TTL_HOURS", "24"))
+# A pending key older than this belongs to a request that died - it may be taken over
+PENDING_TIMEOUT_SECONDS = 60
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+responses = TTLCache(maxsize=10000, ttl=600)
+idempotency_stats = {"executed": 0, "replayed": 0, "conflicts": 0}
+
+
+class IdempotentReplay(Exception):
+    """Raised from the dependency to answer with a stored response"""
+
+    def __init__(self, status_code: int, body: Any):
+        self.status_code = status_code
+        self.body = body
+
+
+async def replay_handler(request: Request, exc: IdempotentReplay) -> JSONResponse:
+    return JSONResponse(status_code=exc.status_code, content=exc.body, headers={REPLAYED_HEADER: "true"})
+
+
+class IdempotentRequest:
+    """Handle for the running request - `save` stores its response under the key"""
+
+    def __init__(self, record_id: Optional[str] = None, request_hash: Optional[str] = None):
+        self.record_id = record_id
+        self.request_hash = request_hash
+        self.saved = False
+
+    async def save(self, result: Any, status_code: int = 200) -> Any:
+        if self.record_id:
+            body = jsonable_encoder(result)
+            await db.idempotency_keys.update_one(
+                {"_id": self.record_id},
+                {"$set": {"status": "done", "status_code": status_code, "body": body}}
+            )
+            responses.set(self.record_id, (self.request_hash, status_code, body))
+            self.saved = True
+        return result
+
+
+def _replay(record_id: str, request_hash: str, stored: tuple):
+    stored_hash, status_code, body = stored
+    if stored_hash != request_hash:
+        idempotency_stats["conflicts"] += 1
+        raise HTTPException(status_code=422, detail="Idempotency-Key është përdorur për një kërkesë tjetër")
+    idempotency_stats["replayed"] += 1
+    raise IdempotentReplay(status_code, body)
+
+
+async def _claim(record_id: str, request_hash: str) -> bool:
+    """Claim the key for this request; False if another request holds it"""
+    now = datetime.now(timezone.utc)
+    try:
+        await db.idempotency_keys.insert_one({
+            "_id": record_id,
+            "request_hash": request_hash,
+            "status": "pending",
+            "created_at": now
+        })
+        return True
+    except DuplicateKeyError:
+        pass
+    # Take over a key left pending by a request that never finished
+    stale = await db.idempotency_keys.find_one_and_update(
+        {
+            "_id": record_id,
+            "status": "pending",
+            "request_hash": request_hash,
+            "created_at": {"$lt": now - timedelta(seconds=PENDING_TIMEOUT_SECONDS)}
+        },
+        {"$set": {"created_at": now}}
+    )
+    return stale is not None
+
+
+async def idempotent(
+    request: Request,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Route dependency: replay the stored response of a repeated Idempotency-Key"""
+    if not idempotency_key:
+        yield IdempotentRequest()
+        return
+    if len(idempotency_key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail="Idempotency-Key është shumë i gjatë")
+
+    # Keys are private to the user and the endpoint
+    record_id = f"{current_user.get('tenant_id')}:{current_user['id']}:{request.method}:{request.url.path}:{idempotency_key}"
+    request_hash = hashlib.sha256(await request.body()).hexdigest()
+
+    stored = responses.get(record_id)
+    if stored is not None:
+        _replay(record_id, request_hash, stored)
+
+    if not await _claim(record_id, request_hash):
+        record = await db.idempotency_keys.find_one({"_id": record_id})
+        if record and record["status"] == "done":
+            stored = (record["request_hash"], record["status_code"], record["body"])
+            responses.set(record_id, stored)
+            _replay(record_id, request_hash, stored)
+        if record and record["request_hash"] != request_hash:
+            idempotency_stats["conflicts"] += 1
+            raise HTTPException(status_code=422, detail="Idempotency-Key është përdorur për një kërkesë tjetër")
+        idempotency_stats["conflicts"] += 1
+        raise HTTPException(
+            status_code=409,
+            detail="Kërkesa me këtë Idempotency-Key është ende në përpunim",
+            headers={"Retry-After": "1"}
+        )
+
+    idempotency_stats["executed"] += 1
+    handle = IdempotentRequest(record_id, request_hash)
+    try:
+        yield handle
+    finally:
+        if not handle.saved:
+            # Failed (or unsaved) requests release the key so a retry runs again
+            await db.idempotency_keys.delete_one({"_id": record_id, "status": "pending"})
+
+
+def idempotency_metrics() -> dict:
+    return {**idempotency_stats, "responses": responses.stats()}
@@ -0,0 +1,77 @@
+"""Pillow rendering of logo/stamp variants (runs in the image process pool)
+
+Kept free of database and app imports so pool workers start light.
+"""
+import io
+from typing import Dict, Tuple
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Refuse images whose header announces more pixels than this (decompression bombs)
+IMAGE_MAX_PIXELS = 40_000_000
+
+VARIANTS = {
+    # 58mm thermal heads print 384 dots per line at 203dpi - 1-bit, dithered
+    "thermal": {"size": (384, 160), "format": "PNG", "content_type": "image/png"},
+    # A4 invoices print the logo/stamp a few cm wide
+    "invoice": {"size": (800, 400), "format": "WEBP", "content_type": "image/webp", "quality": 85},
+    # Lists, headers and settings previews
+    "thumb": {"size": (160, 160), "format": "WEBP", "content_type": "image/webp", "quality": 80},
+}
+
+
+def init_worker() -> None:
+    """Pool initializer - Pillow's own bomb guard uses our limit, not its 89MP default"""
+    Image.MAX_IMAGE_PIXELS = IMAGE_MAX_PIXELS
+
+
+def _decode(data: bytes) -> Image.Image:
+    try:
+        img = Image.open(io.BytesIO(data))
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise ValueError(f"not an image: {e}")
+    if img.width * img.height > IMAGE_MAX_PIXELS:
+        raise ValueError(f"image too large: {img.width}x{img.height}")
+    # JPEGs can decode straight at a reduced scale - nothing is rendered above 800px
+    img.draft("RGB", (1600, 1600))
+    img.load()
+    img = ImageOps.exif_transpose(img)
+    has_alpha = img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info
+    img = img.convert("RGBA" if has_alpha else "RGB")
+    # Drop EXIF, ICC and text chunks - nothing of the upload's metadata is re-encoded
+    img.info = {}
+    return img
+
+
+def _on_white(img: Image.Image) -> Image.Image:
+    if img.mode != "RGBA":
+        return img
+    background = Image.new("RGB", img.size, "white")
+    background.paste(img, mask=img.getchannel("A"))
+    return background
+
+
+def _encode(img: Image.Image, spec: dict) -> bytes:
+    buffer = io.BytesIO()
+    if spec["format"] == "PNG":
+        img.save(buffer, format="PNG", optimize=True)
+    else:
+        img.save(buffer, format=spec["format"], quality=spec["quality"], method=4)
+    return buffer.getvalue()
+
+
+def render_variants(data: bytes) -> Dict[str, Tuple[bytes, str]]:
+    """Decode once and render every variant - {name: (bytes, content type)}
+
+    Raises ValueError for data Pillow cannot read.
+    """
+    source = _decode(data)
+    rendered = {}
+    for name, spec in VARIANTS.items():
+        img = source.copy()
+        img.thumbnail(spec["size"], Image.LANCZOS)
+        if name == "thermal":
+            # Floyd-Steinberg dithering to pure black/white, as the printer will
+            img = _on_white(img).convert("L").convert("1")
+        rendered[name] = (_encode(img, spec), spec["content_type"])
+    return rendered
@@ -0,0 +1,156 @@
+"""Logo and stamp variants
+
+Uploaded images are decoded once with Pillow in a process pool
+(`image_render`) and rendered into size-bounded variants without metadata:
+`thermal` (1-bit PNG for 58mm receipts), `invoice` (WebP for A4 invoices) and
+`thumb` (WebP for lists and previews). Variants go to the asset store, and the
+mapping source hash -> variant URLs is cached in `image_variants`, so the same
+bytes are never rendered twice.
+
+Tenants keep `logo_variants` / `stamp_variants` ({variant: asset URL}) next to
+`logo_url` / `stamp_url`. Clients fall back to the original URL when there is
+no variant (external URLs). Tenant images stored before the pipeline get their
+variants from a background backfill started at startup.
+"""
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from database import db
+from assets import put_asset, externalize, asset_key, read_asset, ASSET_URL_PREFIX
+from tenant_directory import bump_tenant
+from image_render import init_worker, render_variants
+
+logger = logging.getLogger(__name__)
+
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", "2"))
+IMAGE_FIELDS = ("logo", "stamp")
+IMAGE_FORMAT_ERROR = "Formati i imazhit nuk lejohet. Përdorni: PNG, JPG, GIF, WEBP"
+
+# spawn: workers must not inherit the Motor client's threads and sockets
+image_pool = ProcessPoolExecutor(
+    max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn"), initializer=init_worker
+)
+image_stats = {"rendered": 0, "cached": 0, "in_flight": 0, "total_ms": 0.0}
+
+# Strong reference to the startup backfill task
+_backfill_tasks = set()
+
+
+async def _render(data: bytes) -> Dict[str, Tuple[bytes, str]]:
+    image_stats["in_flight"] += 1
+    started = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(image_pool, render_variants, data)
+    finally:
+        image_stats["in_flight"] -= 1
+        image_stats["total_ms"] += (time.perf_counter() - started) * 1000
+
+
+async def _cached_variants(key: str) -> Optional[Dict[str, str]]:
+    doc = await db.image_variants.find_one({"_id": key}, {"variants": 1})
+    if doc:
+        image_stats["cached"] += 1
+        return doc["variants"]
+    return None
+
+
+async def _render_and_store(key: str, data: bytes) -> Dict[str, str]:
+    rendered = await _render(data)
+    variants = {name: await put_asset(body, content_type) for name, (body, content_type) in rendered.items()}
+    await db.image_variants.update_one(
+        {"_id": key},
+        {"$set": {"variants": variants, "created_at": datetime.now(timezone.utc).isoformat()}},
+        upsert=True
+    )
+    image_stats["rendered"] += 1
+    return variants
+
+
+async def store_image(data: bytes, content_type: str, key: Optional[str] = None) -> Tuple[str, Dict[str, str]]:
+    """Store an uploaded image and its variants - (asset URL, {variant: asset URL})
+
+    Raises ValueError if Pillow cannot read the data; nothing is stored then.
+    """
+    key = key or hashlib.sha256(data).hexdigest()
+    variants = await _cached_variants(key) or await _render_and_store(key, data)
+    return await put_asset(data, content_type, key), variants
+
+
+async def variants_for_url(url: Optional[str]) -> Optional[Dict[str, str]]:
+    """Variants of an image already in the asset store - None for other URLs or unreadable images"""
+    key = asset_key(url)
+    if not key:
+        return None
+    variants = await _cached_variants(key)
+    if variants is None:
+        data = await read_asset(key)
+        if data is None:
+            return None
+        try:
+            variants = await _render_and_store(key, data)
+        except ValueError as e:
+            logger.warning(f"No variants for asset {key}: {e}")
+            return None
+    return variants
+
+
+async def image_fields(field: str, url: Optional[str]) -> dict:
+    """Tenant fields for a logo/stamp URL set through a form - the URL and its variants
+
+    Raises ValueError for an inline data: URL that is not a supported image.
+    """
+    url = await externalize(url)
+    return {f"{field}_url": url, f"{field}_variants": await variants_for_url(url)}
+
+
+async def backfill_variants() -> int:
+    """Render variants for tenant images stored before the pipeline existed"""
+    query = {"$or": [
+        {f"{field}_url": {"$regex": f"^{ASSET_URL_PREFIX}"}, f"{field}_variants": {"$exists": False}}
+        for field in IMAGE_FIELDS
+    ]}
+    projection = {"_id": 0, "id": 1, **{f"{field}_url": 1 for field in IMAGE_FIELDS}}
+    updated = 0
+    async for tenant in db.tenants.find(query, projection):
+        update = {
+            f"{field}_variants": await variants_for_url(tenant.get(f"{field}_url"))
+            for field in IMAGE_FIELDS
+        }
+        await db.tenants.update_one({"id": tenant["id"]}, {"$set": update})
+        await bump_tenant(tenant["id"])
+        updated += 1
+    return updated
+
+
+async def _run_backfill():
+    try:
+        updated = await backfill_variants()
+        if updated:
+            logger.info(f"Rendered image variants for {updated} tenants")
+    except Exception:
+        logger.exception("Image variant backfill failed")
+
+
+def start_backfill():
+    """Run the variant backfill in the background - startup does not wait for Pillow"""
+    task = asyncio.create_task(_run_backfill())
+    _backfill_tasks.add(task)
+    task.add_done_callback(_backfill_tasks.discard)
+
+
+def image_metrics() -> dict:
+    rendered = image_stats["rendered"]
+    return {
+        "workers": IMAGE_WORKERS,
+        "in_flight": image_stats["in_flight"],
+        "rendered": rendered,
+        "cached": image_stats["cached"],
+        "avg_render_ms": round(image_stats["total_ms"] / rendered, 2) if rendered else 0
+    }
@@ -0,0 +1,221 @@
+"""Declarative index registry
+
+Every index the routers rely on is declared here once. `ensure_indexes` applies
+the registry idempotently (run from the server lifespan), `index_report`
+compares the live indexes with the declared set. Indexes superseded by a
+declared one are listed in DROPPED_INDEXES and removed by `ensure_indexes`.
+
+CLI:
+    python indexes.py apply     # create missing indexes
+    python indexes.py report    # show missing / undeclared indexes
+"""
+import asyncio
+import logging
+import sys
+from typing import Dict, List
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from database import db
+from catalog_sync import TOMBSTONE_RETENTION_DAYS
+from idempotency import IDEMPOTENCY_TTL_HOURS
+
+logger = logging.getLogger(__name__)
+
+
+def _index(keys, name: str, **options) -> IndexModel:
+    return IndexModel(keys, name=name, **options)
+
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        _index([("id", ASCENDING)], "id_unique", unique=True),
+        _index([("username", ASCENDING)], "username"),
+        _index([("tenant_id", ASCENDING), ("username", ASCENDING)], "tenant_username"),
+        _index(
+            [("tenant_id", ASCENDING), ("pin_digest", ASCENDING)], "tenant_pin_digest_unique",
+            unique=True, partialFilterExpression={"pin_digest": {"$type": "string"}}
+        ),
+        _index([("tenant_id", ASCENDING), ("role", ASCENDING)], "tenant_role"),
+        _index([("tenant_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], "tenant_created_at_id"),
+    ],
+    "tenants": [
+        _index([("id", ASCENDING)], "id_unique", unique=True),
+        _index([("name", ASCENDING)], "name_unique", unique=True),
+        _index([("email", ASCENDING)], "email"),
+        _index([("created_at", DESCENDING), ("id", DESCENDING)], "created_at_id"),
+    ],
+    "products": [
+        _index([("id", ASCENDING)], "id_unique", unique=True),
+        _index([("tenant_id", ASCENDING), ("barcode", ASCENDING)], "tenant_barcode"),
+        _index([("tenant_id", ASCENDING), ("category", ASCENDING)], "tenant_category"),
+        _index([("tenant_id", ASCENDING), ("current_stock", ASCENDING)], "tenant_current_stock"),
+        _index([("tenant_id", ASCENDING), ("name", ASCENDING)], "tenant_name"),
+        _index([("tenant_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], "tenant_created_at_id"),
+        _index([("tenant_id", ASCENDING), ("change_seq", ASCENDING)], "tenant_change_seq"),
+        _index([("tenant_id", ASCENDING), ("changed_at", ASCENDING)], "tenant_changed_at"),
+    ],
+    "product_tombstones": [
+        _index([("tenant_id", ASCENDING), ("change_seq", ASCENDING)], "tenant_change_seq"),
+        _index([("tenant_id", ASCENDING), ("changed_at", ASCENDING)], "tenant_changed_at"),
+        _index([("deleted_at", ASCENDING)], "deleted_at_ttl", expireAfterSeconds=TOMBSTONE_RETENTION_DAYS * 86400),
+    ],
+    "sales": [
+        _index([("id", ASCENDING)], "id_unique", unique=True),
+        _index([("tenant_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], "tenant_created_at_id"),
+        _index([("tenant_id", ASCENDING), ("branch_id", ASCENDING), ("created_at", DESCENDING)], "tenant_branch_created_at"),
+        _index([("tenant_id", ASCENDING), ("user_id", ASCENDING), ("grand_total", ASCENDING)], "tenant_user_grand_total"),
+        _index([("tenant_id", ASCENDING), ("receipt_number", ASCENDING)], "tenant_receipt_number"),
+        _index(
+            [("tenant_id", ASCENDING), ("idempotency_key", ASCENDING)], "tenant_idempotency_key_unique",
+            unique=True, partialFilterExpression={"idempotency_key": {"$type": "string"}}
+        ),
+    ],
+    "sales_daily_rollups": [
+        _index(
+            [("tenant_id", ASCENDING), ("date", ASCENDING), ("branch_id", ASCENDING), ("user_id", ASCENDING)],
+            "rollup_key_unique", unique=True
+        ),
+    ],
+    "stock_movements": [
+        _index([("id", ASCENDING)], "id_unique", unique=True),
+        _index([("tenant_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], "tenant_created_at_id"),
+        _index([("tenant_id", ASCENDING), ("product_id", ASCENDING), ("created_at", DESCENDING)], "tenant_product_created_at"),
+    ],
+    "cash_drawers": [
+        _index([("id", ASCENDING)], "id_unique", unique=True),
+        _index([("tenant_id", ASCENDING), ("user_id", ASCENDING), ("status", ASCENDING)], "tenant_user_status"),
+        _index([("tenant_id", ASCENDING), ("opened_at", DESCENDING)], "tenant_opened_at"),
+    ],
+    "drawer_transactions": [
+        _index([("id", ASCENDING)], "id_unique", unique=True),
+        _index(
+            [("tenant_id", ASCENDING), ("drawer_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            "tenant_drawer_created_at_id"
+        ),
+    ],
+    "branches": [
+        _index([("id", ASCENDING)], "id_unique", unique=True),
+        _index([("tenant_id", ASCENDING)], "tenant"),
+    ],
+    "warehouses": [
+        _index([("id", ASCENDING)], "id_unique", unique=True),
+        _index([("tenant_id", ASCENDING)], "tenant"),
+    ],
+    "vat_rates": [
+        _index([("id", ASCENDING)], "id_unique", unique=True),
+        _index([("tenant_id", ASCENDING)], "tenant"),
+    ],
+    "comment_templates": [
+        _index([("id", ASCENDING)], "id_unique", unique=True),
+        _index([("tenant_id", ASCENDING), ("created_at", DESCENDING)], "tenant_created_at"),
+    ],
+    "settings": [
+        _index([("tenant_id", ASCENDING), ("type", ASCENDING)], "tenant_type"),
+    ],
+    "audit_logs": [
+        _index([("created_at", DESCENDING), ("id", DESCENDING)], "created_at_id"),
+        _index([("entity_type", ASCENDING), ("created_at", DESCENDING)], "entity_type_created_at"),
+    ],
+    "idempotency_keys": [
+        _index([("created_at", ASCENDING)], "created_at_ttl", expireAfterSeconds=IDEMPOTENCY_TTL_HOURS * 3600),
+    ],
+    "reset_backups": [
+        _index([("id", ASCENDING)], "id_unique", unique=True),
+        _index([("tenant_id", ASCENDING), ("created_at", DESCENDING)], "tenant_created_at"),
+    ],
+    "restore_jobs": [
+        _index([("id", ASCENDING)], "id_unique", unique=True),
+        # One running restore per backup - the insert of the job is the claim
+        _index(
+            [("backup_id", ASCENDING)], "backup_running_unique",
+            unique=True, partialFilterExpression={"status": "running"}
+        ),
+    ],
+    "backup_chunks": [
+        _index([("backup_id", ASCENDING), ("collection", ASCENDING), ("seq", ASCENDING)], "backup_collection_seq_unique", unique=True),
+    ],
+}
+
+
+# Replaced or no longer queried - dropped where they still exist
+DROPPED_INDEXES: Dict[str, List[str]] = {
+    "users": ["pin"],
+    "sales": ["tenant_user"],
+    "restore_jobs": ["backup_status"],
+}
+
+
+def _key_of(keys) -> tuple:
+    return tuple((field, int(direction)) for field, direction in keys)
+
+
+async def ensure_indexes(database=None) -> Dict[str, List[str]]:
+    """Create every declared index - idempotent, failures are logged per index"""
+    database = db if database is None else database
+    created = {}
+    for collection, models in INDEXES.items():
+        created[collection] = []
+        for model in models:
+            try:
+                created[collection] += await database[collection].create_indexes([model])
+            except OperationFailure as e:
+                # One bad index (e.g. duplicates under a unique key) must not block the others
+                logger.error(f"Index {collection}.{model.document['name']} failed: {e}")
+    for collection, names in DROPPED_INDEXES.items():
+        live = await database[collection].index_information()
+        for name in names:
+            if name in live:
+                await database[collection].drop_index(name)
+                logger.info(f"Dropped superseded index {collection}.{name}")
+    return created
+
+
+async def index_report(database=None) -> Dict[str, dict]:
+    """Compare live indexes with the registry - returns missing/extra/mismatched names per collection"""
+    database = db if database is None else database
+    report = {}
+    for collection, models in INDEXES.items():
+        live = await database[collection].index_information()
+        live_by_name = {name: _key_of(info["key"]) for name, info in live.items() if name != "_id_"}
+        declared = {m.document["name"]: _key_of(m.document["key"].items()) for m in models}
+
+        report[collection] = {
+            "missing": sorted(name for name in declared if name not in live_by_name),
+            "extra": sorted(name for name in live_by_name if name not in declared),
+            "mismatched": sorted(
+                name for name, key in declared.items()
+                if name in live_by_name and live_by_name[name] != key
+            ),
+        }
+    return report
+
+
+def print_report(report: Dict[str, dict]):
+    in_sync = True
+    for collection, diff in report.items():
+        if any(diff.values()):
+            in_sync = False
+        status = "OK" if not any(diff.values()) else "DRIFT"
+        print(f"{collection:<20} {status}")
+        for kind in ("missing", "extra", "mismatched"):
+            for name in diff[kind]:
+                print(f"    {kind:<10} {name}")
+    print("\nAll declared indexes present." if in_sync else "\nIndexes differ from the registry.")
+    return in_sync
+
+
+async def _main(command: str) -> int:
+    if command == "apply":
+        created = await ensure_indexes()
+        for collection, names in created.items():
+            print(f"{collection:<20} {', '.join(names) or '-'}")
+        return 0
+    if command == "report":
+        return 0 if print_report(await index_report()) else 1
+    print(__doc__)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else "")))
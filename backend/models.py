@@ -79,7 +79,9 @@ class TenantResponse(BaseModel):
     address: Optional[str] = None
     city: Optional[str] = None
     logo_url: Optional[str] = None
+    logo_variants: Optional[Dict[str, str]] = None  # thermal / invoice / thumb
     stamp_url: Optional[str] = None  # Vula digjitale
+    stamp_variants: Optional[Dict[str, str]] = None
     whatsapp_qr_url: Optional[str] = None  # QR code për WhatsApp
     primary_color: str
     secondary_color: str
@@ -97,7 +99,9 @@ class TenantPublicInfo(BaseModel):
     name: str
     company_name: str
     logo_url: Optional[str] = None
+    logo_variants: Optional[Dict[str, str]] = None  # thermal / invoice / thumb
     stamp_url: Optional[str] = None  # Vula digjitale
+    stamp_variants: Optional[Dict[str, str]] = None
     whatsapp_qr_url: Optional[str] = None  # QR code për WhatsApp
     primary_color: str
     secondary_color: str
@@ -136,12 +140,13 @@ class UserResponse(BaseModel):
     branch_id: Optional[str] = None
     is_active: bool
     created_at: str
-    pin: Optional[str] = None
     tenant_id: Optional[str] = None
 
 class LoginRequest(BaseModel):
     username: str
     password: str
+    subdomain: Optional[str] = None
+    tenant_id: Optional[str] = None  # Tenant remembered by the client - PIN logins without a subdomain
 
 class TokenResponse(BaseModel):
     access_token: str
@@ -227,6 +232,13 @@ class ProductResponse(BaseModel):
     created_at: str
     updated_at: str
 
+class ProductChanges(BaseModel):
+    changes: List[ProductResponse]
+    deleted: List[str]
+    since: str
+    has_more: bool = False
+    reset: bool = False
+
 # ============ STOCK MOVEMENT MODELS ============
 class StockMovementCreate(BaseModel):
     product_id: str
@@ -278,7 +290,9 @@ class CashDrawer(BaseModel):
     current_balance: float
     expected_balance: float = 0
     status: CashDrawerStatus = CashDrawerStatus.OPEN
-    transactions: List[Dict] = []
+    transaction_count: int = 0
+    total_in: float = 0
+    total_out: float = 0
     opened_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     closed_at: Optional[datetime] = None
 
@@ -290,10 +304,25 @@ class CashDrawerResponse(BaseModel):
     current_balance: float
     expected_balance: float
     status: CashDrawerStatus
-    transactions: List[Dict]
+    transaction_count: int = 0
+    total_in: float = 0
+    total_out: float = 0
+    # Newest ledger entries first - one page, more via X-Next-Cursor
+    transactions: List[Dict] = []
     opened_at: str
     closed_at: Optional[str] = None
 
+class DrawerTransactionEntry(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    drawer_id: str
+    user_id: str
+    amount: float
+    type: str
+    description: Optional[str] = None
+    balance_after: Optional[float] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
 class CloseDrawerRequest(BaseModel):
     actual_balance: float
 
@@ -342,6 +371,7 @@ class Sale(BaseModel):
     user_id: str
     branch_id: Optional[str] = None
     cash_drawer_id: Optional[str] = None
+    idempotency_key: Optional[str] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class SaleResponse(BaseModel):
@@ -362,6 +392,25 @@ class SaleResponse(BaseModel):
     branch_id: Optional[str] = None
     created_at: str
 
+class OfflineSaleCreate(SaleCreate):
+    idempotency_key: str = Field(..., min_length=1, max_length=128)  # generated by the till
+    created_at: Optional[datetime] = None  # when the till recorded the sale
+
+class SaleBatchCreate(BaseModel):
+    sales: List[OfflineSaleCreate] = Field(..., min_length=1, max_length=1000)
+
+class SaleBatchItemResult(BaseModel):
+    idempotency_key: str
+    status: str  # created, duplicate, error
+    sale: Optional[SaleResponse] = None
+    detail: Optional[str] = None
+
+class SaleBatchResponse(BaseModel):
+    created: int
+    duplicates: int
+    errors: int
+    results: List[SaleBatchItemResult]
+
 # ============ AUDIT LOG ============
 class AuditLog(BaseModel):
     model_config = ConfigDict(extra="ignore")
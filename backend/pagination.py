@@ -0,0 +1,117 @@
+"""Keyset (cursor) pagination for list endpoints
+
+Pages are ordered by (created_at desc, id desc). The continuation token is an
+opaque base64 encoding of the last row's sort key; the next page starts strictly
+after it, so memory per request is bounded by `limit` regardless of collection
+size and rows inserted meanwhile never shift pages.
+
+Response bodies stay plain lists. Paging metadata travels in headers:
+    X-Next-Cursor   token for the next page (absent on the last page)
+    X-Total-Count   only with include_total=true - capped count of matching rows
+"""
+import base64
+import json
+from typing import List, Optional
+from fastapi import HTTPException, Query, Response
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+TOTAL_COUNT_CAP = 100000
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+class PageParams:
+    """Query parameters shared by paginated endpoints"""
+
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="Opaque token from X-Next-Cursor"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        include_total: bool = False
+    ):
+        self.cursor = cursor
+        self.limit = limit
+        self.include_total = include_total
+
+
+def encode_cursor(doc: dict, sort_field: str = "created_at") -> str:
+    raw = json.dumps([doc.get(sort_field), doc.get("id")], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> tuple:
+    try:
+        value, last_id = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Kursori i faqes është i pavlefshëm")
+    return value, last_id
+
+
+def after_cursor(token: str, sort_field: str = "created_at") -> dict:
+    """Filter for rows strictly after the cursor in (sort_field desc, id desc) order"""
+    value, last_id = decode_cursor(token)
+    if value is None:
+        # Rows without the sort field come last; only smaller ids remain
+        return {sort_field: None, "id": {"$lt": last_id}}
+    return {"$or": [
+        {sort_field: {"$lt": value}},
+        {sort_field: value, "id": {"$lt": last_id}},
+        {sort_field: None}
+    ]}
+
+
+async def total_count(collection, query: dict) -> int:
+    """Unfiltered counts use collection metadata; filtered counts stop at TOTAL_COUNT_CAP"""
+    if not query:
+        return await collection.estimated_document_count()
+    return await collection.count_documents(query, limit=TOTAL_COUNT_CAP)
+
+
+def _row_key(doc: dict, sort_field: str) -> tuple:
+    value = doc.get(sort_field)
+    return (value is not None, value or "", doc.get("id") or "")
+
+
+def paginate_rows(rows: List[dict], page: PageParams, response: Response, sort_field: str = "created_at") -> List[dict]:
+    """Same paging contract as `paginate` over rows already in memory (e.g. the catalog index)"""
+    rows = sorted(rows, key=lambda doc: _row_key(doc, sort_field), reverse=True)
+    total = len(rows)
+    if page.cursor:
+        value, last_id = decode_cursor(page.cursor)
+        after = (value is not None, value or "", last_id or "")
+        rows = [doc for doc in rows if _row_key(doc, sort_field) < after]
+
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1], sort_field)
+    if page.include_total:
+        response.headers[TOTAL_COUNT_HEADER] = str(total)
+    return rows
+
+
+async def paginate(
+    collection,
+    query: dict,
+    page: PageParams,
+    response: Response,
+    projection: dict = None,
+    sort_field: str = "created_at"
+) -> List[dict]:
+    """Fetch one page of `query` and set the paging headers on `response`"""
+    page_query = query
+    if page.cursor:
+        page_query = {"$and": [query, after_cursor(page.cursor, sort_field)]} if query else after_cursor(page.cursor, sort_field)
+
+    docs = await collection.find(page_query, projection or {"_id": 0}) \
+        .sort([(sort_field, -1), ("id", -1)]) \
+        .limit(page.limit + 1) \
+        .to_list(page.limit + 1)
+
+    if len(docs) > page.limit:
+        docs = docs[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(docs[-1], sort_field)
+    if page.include_total:
+        response.headers[TOTAL_COUNT_HEADER] = str(await total_count(collection, query))
+    return docs
@@ -0,0 +1,193 @@
+"""Pre-aggregated daily sales rollups
+
+One `sales_daily_rollups` document per (tenant_id, branch_id, user_id, date)
+holds the running totals of that day's sales. `record_sale` bumps it with a
+single upsert/$inc from create_sale, so reports read a handful of small docs
+instead of every sale in the period.
+
+Cost is frozen at sale time from the product's purchase_price; `rebuild`
+recomputes history from the sales collection using current purchase prices.
+Rollups have day granularity (UTC dates, as in sale created_at). Tenants whose
+sales predate the rollups are backfilled at startup (`backfill_rollups`).
+
+CLI:
+    python rollups.py rebuild [tenant_id]
+"""
+import asyncio
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from pymongo import UpdateOne
+
+from database import db
+
+ROLLUP_FIELDS = ["revenue", "subtotal", "discount", "vat", "cost", "transactions", "items", "cash", "bank"]
+
+
+def _rollup_key(sale: dict) -> dict:
+    return {
+        "tenant_id": sale.get("tenant_id"),
+        "branch_id": sale.get("branch_id"),
+        "user_id": sale.get("user_id"),
+        "date": sale["created_at"][:10]
+    }
+
+
+def _sale_totals(sale: dict, purchase_prices: Dict[str, float]) -> dict:
+    items = sale.get("items", [])
+    grand_total = sale.get("grand_total", 0)
+    payment_method = sale.get("payment_method")
+    if hasattr(payment_method, "value"):
+        payment_method = payment_method.value
+    return {
+        "revenue": grand_total,
+        "subtotal": sale.get("subtotal", 0),
+        "discount": sale.get("total_discount", 0),
+        "vat": sale.get("total_vat", 0),
+        "cost": sum((purchase_prices.get(i.get("product_id")) or 0) * i.get("quantity", 0) for i in items),
+        "transactions": 1,
+        "items": sum(i.get("quantity", 0) for i in items),
+        "cash": grand_total if payment_method == "cash" else 0,
+        "bank": grand_total if payment_method in ("bank", "card") else 0,
+    }
+
+
+def rollup_update(sale: dict, purchase_prices: Dict[str, float]) -> UpdateOne:
+    """Upsert operation adding one sale to its daily rollup"""
+    return UpdateOne(_rollup_key(sale), {"$inc": _sale_totals(sale, purchase_prices)}, upsert=True)
+
+
+async def record_sales(sales: List[dict], product_map: Dict[str, dict]):
+    """Add freshly created sales to their daily rollups (one bulk_write)"""
+    if not sales:
+        return
+    purchase_prices = {pid: p.get("purchase_price") for pid, p in product_map.items()}
+    await db.sales_daily_rollups.bulk_write([rollup_update(s, purchase_prices) for s in sales], ordered=False)
+
+
+async def record_sale(sale: dict, product_map: Dict[str, dict]):
+    """Add a freshly created sale to its daily rollup"""
+    await record_sales([sale], product_map)
+
+
+def rollup_match(tenant_filter: dict, start_date: str = None, end_date: str = None,
+                 branch_id: str = None, user_id: str = None) -> dict:
+    """Rollup query equivalent to a sales created_at range filter"""
+    match = {**tenant_filter}
+    if start_date or end_date:
+        match["date"] = {}
+        if start_date:
+            match["date"]["$gte"] = start_date[:10]
+        if end_date:
+            match["date"]["$lte"] = end_date[:10]
+    if branch_id:
+        match["branch_id"] = branch_id
+    if user_id:
+        match["user_id"] = user_id
+    return match
+
+
+async def sum_rollups(match: dict, group_by: Optional[str] = None) -> List[dict]:
+    """Sum rollup fields server-side, optionally grouped by `date` or `user_id`"""
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": f"${group_by}" if group_by else None,
+            **{field: {"$sum": f"${field}"} for field in ROLLUP_FIELDS}
+        }},
+        {"$sort": {"_id": 1}}
+    ]
+    return await db.sales_daily_rollups.aggregate(pipeline).to_list(None)
+
+
+async def delete_rollups(match: dict):
+    """Drop rollups whose sales were removed (reset_data)"""
+    await db.sales_daily_rollups.delete_many(match)
+
+
+def _rebuild_pipeline(scope: dict) -> List[dict]:
+    """One aggregation computing every daily rollup of `scope` from the sales"""
+    purchase_price = {"$ifNull": [{"$arrayElemAt": [{"$map": {
+        "input": {"$filter": {"input": "$_products", "as": "p", "cond": {"$eq": ["$$p.id", "$$i.product_id"]}}},
+        "as": "p",
+        "in": "$$p.purchase_price"
+    }}, 0]}, 0]}
+    grand_total = {"$ifNull": ["$grand_total", 0]}
+    return [
+        {"$match": scope},
+        {"$lookup": {"from": "products", "localField": "items.product_id", "foreignField": "id", "as": "_products"}},
+        {"$group": {
+            "_id": {
+                "tenant_id": "$tenant_id",
+                "branch_id": "$branch_id",
+                "user_id": "$user_id",
+                "date": {"$substrBytes": ["$created_at", 0, 10]}
+            },
+            "revenue": {"$sum": grand_total},
+            "subtotal": {"$sum": "$subtotal"},
+            "discount": {"$sum": "$total_discount"},
+            "vat": {"$sum": "$total_vat"},
+            "cost": {"$sum": {"$sum": {"$map": {
+                "input": {"$ifNull": ["$items", []]},
+                "as": "i",
+                "in": {"$multiply": [{"$ifNull": ["$$i.quantity", 0]}, purchase_price]}
+            }}}},
+            "transactions": {"$sum": 1},
+            "items": {"$sum": {"$sum": "$items.quantity"}},
+            "cash": {"$sum": {"$cond": [{"$eq": ["$payment_method", "cash"]}, grand_total, 0]}},
+            "bank": {"$sum": {"$cond": [{"$in": ["$payment_method", ["bank", "card"]]}, grand_total, 0]}}
+        }}
+    ]
+
+
+async def rebuild(tenant_id: str = None, live_from: str = None, batch_size: int = 1000) -> int:
+    """Recompute rollups from the sales collection - returns the number of rollups written
+
+    Each rollup is overwritten with a per-key `$set` upsert; nothing is deleted,
+    so sales recorded meanwhile keep their rollup. Days from `live_from` (a date)
+    on are only inserted when missing - their rollups may already be taking live
+    `$inc` updates that a `$set` would overwrite.
+    """
+    scope = {"tenant_id": tenant_id} if tenant_id else {}
+    written = 0
+    batch = []
+    async for row in db.sales.aggregate(_rebuild_pipeline(scope), allowDiskUse=True):
+        # Missing key fields are null in the rollups written by record_sale
+        key = {"tenant_id": None, "branch_id": None, "user_id": None, **row.pop("_id")}
+        operator = "$setOnInsert" if live_from and key["date"] >= live_from else "$set"
+        batch.append(UpdateOne(key, {operator: row}, upsert=True))
+        if len(batch) >= batch_size:
+            await db.sales_daily_rollups.bulk_write(batch, ordered=False)
+            written += len(batch)
+            batch = []
+    if batch:
+        await db.sales_daily_rollups.bulk_write(batch, ordered=False)
+        written += len(batch)
+    return written
+
+
+async def backfill_rollups() -> int:
+    """Build rollups for tenants whose sales predate them (run at startup)
+
+    Idempotent: tenants are flagged `rollups_built` once done, and a repeated
+    rebuild writes the same values.
+    """
+    tenant_ids = await db.tenants.distinct("id", {"rollups_built": {"$exists": False}})
+    today = datetime.now(timezone.utc).date().isoformat()
+    for tenant_id in tenant_ids:
+        await rebuild(tenant_id, live_from=today)
+        await db.tenants.update_one({"id": tenant_id}, {"$set": {"rollups_built": True}})
+    return len(tenant_ids)
+
+
+async def _main(args: List[str]) -> int:
+    if args and args[0] == "rebuild":
+        written = await rebuild(args[1] if len(args) > 1 else None)
+        print(f"Rebuilt {written} daily rollups")
+        return 0
+    print(__doc__)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
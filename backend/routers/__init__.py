@@ -1,2 +1,2 @@
 """Routers package for the POS system"""
-from . import auth, tenants, users, branches, products, stock, cashier, sales, reports, upload
+from . import auth, tenants, users, branches, products, stock, cashier, sales, reports, upload, assets
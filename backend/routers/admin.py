@@ -1,15 +1,25 @@
 """Admin routes (Reset Data, Backups, Audit Logs, Categories, Super Admin Init)"""
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from datetime import datetime, timezone
 import uuid
+from pymongo.errors import DuplicateKeyError
 
 from database import db
 from models import UserRole, ResetDataRequest
 from auth import (
-    hash_password, verify_password, get_current_user, require_role,
+    hash_password_async, verify_password_async, get_current_user, get_token_principal, require_role,
     get_tenant_filter, add_tenant_id, log_audit
 )
+from rollups import delete_rollups
+from pagination import PageParams, paginate
+from tenant_stats import adjust_counts
+from etag import conditional
+from backups import (
+    BACKUP_COLLECTIONS, BACKUP_FORMAT, MANIFEST_PROJECTION,
+    BackupWriter, stream_ndjson, delete_chunks, start_restore
+)
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 audit_router = APIRouter(prefix="/audit-logs", tags=["Audit"])
@@ -31,34 +41,52 @@ async def verify_admin_password(
     if not admin:
         raise HTTPException(status_code=404, detail="Përdoruesi nuk u gjet")
     
-    if not verify_password(password, admin.get("password_hash", "")):
+    if not await verify_password_async(password, admin.get("password_hash", "")):
         raise HTTPException(status_code=401, detail="Fjalëkalimi i gabuar")
     
     return {"verified": True, "message": "Fjalëkalimi u verifikua"}
 
 
+def users_for_reset_pipeline(tenant_filter: dict) -> list:
+    """Users with their sales count and total - runs on sales, grouped once per user
+
+    The users are unioned in afterwards so users without sales are listed with zeros.
+    """
+    return [
+        {"$match": tenant_filter},
+        {"$group": {"_id": "$user_id", "sales_count": {"$sum": 1}, "total_sales": {"$sum": "$grand_total"}}},
+        {"$unionWith": {"coll": "users", "pipeline": [
+            {"$match": tenant_filter},
+            {"$project": {"_id": "$id", "username": 1, "full_name": 1, "role": 1}}
+        ]}},
+        {"$group": {
+            "_id": "$_id",
+            "username": {"$max": "$username"},
+            "full_name": {"$max": "$full_name"},
+            "role": {"$max": "$role"},
+            "sales_count": {"$sum": "$sales_count"},
+            "total_sales": {"$sum": "$total_sales"}
+        }},
+        # Sales of deleted users have no user row
+        {"$match": {"username": {"$ne": None}}},
+        {"$sort": {"username": 1}},
+        {"$project": {
+            "_id": 0,
+            "id": "$_id",
+            "username": 1,
+            "full_name": {"$ifNull": ["$full_name", ""]},
+            "role": 1,
+            "sales_count": 1,
+            "total_sales": {"$round": ["$total_sales", 2]}
+        }}
+    ]
+
+
 @router.get("/users-for-reset")
 async def get_users_for_reset(current_user: dict = Depends(require_role([UserRole.ADMIN]))):
-    """Get list of users with sales statistics for reset selection"""
+    """Get list of users with sales statistics for reset selection - one aggregation round trip"""
     tenant_filter = get_tenant_filter(current_user)
-    users = await db.users.find(tenant_filter, {"_id": 0, "password_hash": 0, "pin": 0}).to_list(1000)
-    
-    user_stats = []
-    for user in users:
-        sales_count = await db.sales.count_documents({"user_id": user["id"], **tenant_filter})
-        sales = await db.sales.find({"user_id": user["id"], **tenant_filter}, {"grand_total": 1, "_id": 0}).to_list(10000)
-        total_sales = sum(s.get("grand_total", 0) for s in sales)
-        
-        user_stats.append({
-            "id": user["id"],
-            "username": user["username"],
-            "full_name": user.get("full_name", ""),
-            "role": user["role"],
-            "sales_count": sales_count,
-            "total_sales": round(total_sales, 2)
-        })
-    
-    return user_stats
+    return await db.sales.aggregate(users_for_reset_pipeline(tenant_filter)).to_list(None)
 
 
 @router.post("/reset-data")
@@ -67,21 +95,29 @@ async def reset_data(request: ResetDataRequest, current_user: dict = Depends(req
     tenant_filter = get_tenant_filter(current_user)
     
     admin = await db.users.find_one({"id": current_user["id"], **tenant_filter})
-    if not admin or not verify_password(request.admin_password, admin.get("password_hash", "")):
+    if not admin or not await verify_password_async(request.admin_password, admin.get("password_hash", "")):
         raise HTTPException(status_code=401, detail="Fjalëkalimi i gabuar")
     
     backup_id = str(uuid.uuid4())
-    backup_data = {
+    manifest = add_tenant_id({
         "id": backup_id,
+        "format": BACKUP_FORMAT,
+        "status": "running",
         "reset_type": request.reset_type,
         "user_ids": request.user_ids,
         "created_by": current_user["id"],
-        "created_at": datetime.now(timezone.utc).isoformat(),
-        "sales": [],
-        "cash_drawers": [],
-        "stock_movements": []
-    }
-    backup_data = add_tenant_id(backup_data, current_user)
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }, current_user)
+    # The manifest goes in first so a reset interrupted half way still lists its chunks
+    await db.reset_backups.insert_one(manifest)
+    
+    writer = BackupWriter(backup_id, current_user.get("tenant_id"))
+    
+    async def move_drawers(query: dict) -> int:
+        """Drawers take their ledger entries with them"""
+        async def move_ledger(drawer_ids):
+            await writer.move("drawer_transactions", {"drawer_id": {"$in": drawer_ids}, **tenant_filter})
+        return await writer.move("cash_drawers", query, on_chunk=move_ledger)
     
     deleted_sales = 0
     deleted_drawers = 0
@@ -89,58 +125,32 @@ async def reset_data(request: ResetDataRequest, current_user: dict = Depends(req
     
     if request.reset_type == "daily":
         today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
-        
-        sales_to_backup = await db.sales.find({"created_at": {"$gte": today}, **tenant_filter}, {"_id": 0}).to_list(10000)
-        backup_data["sales"] = sales_to_backup
-        
-        drawers_to_backup = await db.cash_drawers.find({"opened_at": {"$gte": today}, **tenant_filter}, {"_id": 0}).to_list(1000)
-        backup_data["cash_drawers"] = drawers_to_backup
-        
-        result = await db.sales.delete_many({"created_at": {"$gte": today}, **tenant_filter})
-        deleted_sales = result.deleted_count
-        
-        result = await db.cash_drawers.delete_many({"opened_at": {"$gte": today}, **tenant_filter})
-        deleted_drawers = result.deleted_count
+        deleted_sales = await writer.move("sales", {"created_at": {"$gte": today}, **tenant_filter})
+        await delete_rollups({"date": {"$gte": today[:10]}, **tenant_filter})
+        deleted_drawers = await move_drawers({"opened_at": {"$gte": today}, **tenant_filter})
         
     elif request.reset_type == "user_specific" and request.user_ids:
-        for user_id in request.user_ids:
-            user_sales = await db.sales.find({"user_id": user_id, **tenant_filter}, {"_id": 0}).to_list(10000)
-            backup_data["sales"].extend(user_sales)
-            
-            user_drawers = await db.cash_drawers.find({"user_id": user_id, **tenant_filter}, {"_id": 0}).to_list(1000)
-            backup_data["cash_drawers"].extend(user_drawers)
-            
-            result = await db.sales.delete_many({"user_id": user_id, **tenant_filter})
-            deleted_sales += result.deleted_count
-            
-            result = await db.cash_drawers.delete_many({"user_id": user_id, **tenant_filter})
-            deleted_drawers += result.deleted_count
+        user_query = {"user_id": {"$in": request.user_ids}, **tenant_filter}
+        deleted_sales = await writer.move("sales", user_query)
+        await delete_rollups(user_query)
+        deleted_drawers = await move_drawers(user_query)
             
     elif request.reset_type == "all":
-        all_sales = await db.sales.find(tenant_filter, {"_id": 0}).to_list(100000)
-        backup_data["sales"] = all_sales
-        
-        all_drawers = await db.cash_drawers.find(tenant_filter, {"_id": 0}).to_list(10000)
-        backup_data["cash_drawers"] = all_drawers
-        
-        all_movements = await db.stock_movements.find(tenant_filter, {"_id": 0}).to_list(100000)
-        backup_data["stock_movements"] = all_movements
-        
-        result = await db.sales.delete_many(tenant_filter)
-        deleted_sales = result.deleted_count
-        
-        result = await db.cash_drawers.delete_many(tenant_filter)
-        deleted_drawers = result.deleted_count
-        
-        result = await db.stock_movements.delete_many(tenant_filter)
-        deleted_movements = result.deleted_count
-    
-    backup_data["deleted_counts"] = {
-        "sales": deleted_sales,
-        "cash_drawers": deleted_drawers,
-        "stock_movements": deleted_movements
-    }
-    await db.reset_backups.insert_one(backup_data)
+        deleted_sales = await writer.move("sales", tenant_filter)
+        await delete_rollups(tenant_filter)
+        deleted_drawers = await move_drawers(tenant_filter)
+        deleted_movements = await writer.move("stock_movements", tenant_filter)
+    
+    await adjust_counts(current_user.get("tenant_id"), sales=-deleted_sales)
+    await db.reset_backups.update_one({"id": backup_id}, {"$set": {
+        "status": "complete",
+        "collections": writer.manifest(),
+        "deleted_counts": {
+            "sales": deleted_sales,
+            "cash_drawers": deleted_drawers,
+            "stock_movements": deleted_movements
+        }
+    }})
     
     await log_audit(current_user["id"], "reset_data", "system", request.reset_type, {
         "backup_id": backup_id,
@@ -166,7 +176,7 @@ async def reset_data(request: ResetDataRequest, current_user: dict = Depends(req
 async def get_backups(current_user: dict = Depends(require_role([UserRole.ADMIN]))):
     """Get list of all reset backups"""
     tenant_filter = get_tenant_filter(current_user)
-    backups = await db.reset_backups.find(tenant_filter, {"_id": 0, "sales": 0, "cash_drawers": 0, "stock_movements": 0}).sort("created_at", -1).to_list(100)
+    backups = await db.reset_backups.find(tenant_filter, MANIFEST_PROJECTION).sort("created_at", -1).to_list(100)
     
     for backup in backups:
         user = await db.users.find_one({"id": backup.get("created_by"), **tenant_filter}, {"_id": 0, "username": 1, "full_name": 1})
@@ -177,75 +187,66 @@ async def get_backups(current_user: dict = Depends(require_role([UserRole.ADMIN]
 
 @router.get("/backups/{backup_id}")
 async def get_backup_detail(backup_id: str, current_user: dict = Depends(require_role([UserRole.ADMIN]))):
-    """Get detailed backup info"""
+    """Get the backup manifest - the documents themselves are streamed from /data/{collection}"""
     tenant_filter = get_tenant_filter(current_user)
-    backup = await db.reset_backups.find_one({"id": backup_id, **tenant_filter}, {"_id": 0})
+    backup = await db.reset_backups.find_one({"id": backup_id, **tenant_filter}, MANIFEST_PROJECTION)
     if not backup:
         raise HTTPException(status_code=404, detail="Backup nuk u gjet")
     return backup
 
 
+@router.get("/backups/{backup_id}/data/{collection}")
+async def stream_backup_data(backup_id: str, collection: str, current_user: dict = Depends(require_role([UserRole.ADMIN]))):
+    """Stream one collection of a backup as NDJSON, chunk by chunk"""
+    tenant_filter = get_tenant_filter(current_user)
+    if collection not in BACKUP_COLLECTIONS:
+        raise HTTPException(status_code=400, detail="Koleksioni nuk është pjesë e backup-it")
+    backup = await db.reset_backups.find_one({"id": backup_id, **tenant_filter}, MANIFEST_PROJECTION)
+    if not backup:
+        raise HTTPException(status_code=404, detail="Backup nuk u gjet")
+    return StreamingResponse(
+        stream_ndjson(backup, collection),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{backup_id}-{collection}.ndjson"'}
+    )
+
+
 @router.post("/backups/{backup_id}/restore")
 async def restore_backup(backup_id: str, request: dict, current_user: dict = Depends(require_role([UserRole.ADMIN]))):
-    """Restore data from a backup"""
+    """Start restoring a backup in the background - poll /admin/restore-jobs/{job_id} for progress"""
     tenant_filter = get_tenant_filter(current_user)
     
     password = request.get("admin_password", "")
     admin = await db.users.find_one({"id": current_user["id"], **tenant_filter})
-    if not admin or not verify_password(password, admin.get("password_hash", "")):
+    if not admin or not await verify_password_async(password, admin.get("password_hash", "")):
         raise HTTPException(status_code=401, detail="Fjalëkalimi i gabuar")
     
-    backup = await db.reset_backups.find_one({"id": backup_id, **tenant_filter}, {"_id": 0})
+    backup = await db.reset_backups.find_one({"id": backup_id, **tenant_filter}, MANIFEST_PROJECTION)
     if not backup:
         raise HTTPException(status_code=404, detail="Backup nuk u gjet")
     
-    restored_sales = 0
-    restored_drawers = 0
-    restored_movements = 0
-    
-    if backup.get("sales"):
-        for sale in backup["sales"]:
-            existing = await db.sales.find_one({"id": sale.get("id"), **tenant_filter})
-            if not existing:
-                await db.sales.insert_one(sale)
-                restored_sales += 1
-    
-    if backup.get("cash_drawers"):
-        for drawer in backup["cash_drawers"]:
-            existing = await db.cash_drawers.find_one({"id": drawer.get("id"), **tenant_filter})
-            if not existing:
-                await db.cash_drawers.insert_one(drawer)
-                restored_drawers += 1
-    
-    if backup.get("stock_movements"):
-        for movement in backup["stock_movements"]:
-            existing = await db.stock_movements.find_one({"id": movement.get("id"), **tenant_filter})
-            if not existing:
-                await db.stock_movements.insert_one(movement)
-                restored_movements += 1
-    
-    await db.reset_backups.update_one(
-        {"id": backup_id, **tenant_filter},
-        {"$set": {"restored_at": datetime.now(timezone.utc).isoformat(), "restored_by": current_user["id"]}}
-    )
-    
-    await log_audit(current_user["id"], "restore_backup", "system", backup_id, {
-        "restored_sales": restored_sales,
-        "restored_drawers": restored_drawers,
-        "restored_movements": restored_movements
-    })
-    
+    try:
+        job = await start_restore(backup, current_user)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Ky backup është duke u rikthyer")
     return {
         "success": True,
-        "message": "Të dhënat u rikthyen me sukses",
-        "restored": {
-            "sales": restored_sales,
-            "cash_drawers": restored_drawers,
-            "stock_movements": restored_movements
-        }
+        "message": "Rikthimi i të dhënave filloi",
+        "job_id": job["id"],
+        "status": job["status"]
     }
 
 
+@router.get("/restore-jobs/{job_id}")
+async def get_restore_job(job_id: str, current_user: dict = Depends(require_role([UserRole.ADMIN]))):
+    """Status and per-collection progress of a restore job"""
+    tenant_filter = get_tenant_filter(current_user)
+    job = await db.restore_jobs.find_one({"id": job_id, **tenant_filter}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Rikthimi nuk u gjet")
+    return job
+
+
 @router.delete("/backups/{backup_id}")
 async def delete_backup(backup_id: str, current_user: dict = Depends(require_role([UserRole.ADMIN]))):
     """Delete a backup"""
@@ -253,6 +254,7 @@ async def delete_backup(backup_id: str, current_user: dict = Depends(require_rol
     result = await db.reset_backups.delete_one({"id": backup_id, **tenant_filter})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Backup nuk u gjet")
+    await delete_chunks(backup_id)
     
     await log_audit(current_user["id"], "delete_backup", "system", backup_id)
     return {"message": "Backup u fshi me sukses"}
@@ -261,14 +263,15 @@ async def delete_backup(backup_id: str, current_user: dict = Depends(require_rol
 # ============ AUDIT LOGS ============
 @audit_router.get("")
 async def get_audit_logs(
+    response: Response,
     entity_type: Optional[str] = None,
     action: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    limit: int = 100,
+    page: PageParams = Depends(),
     current_user: dict = Depends(require_role([UserRole.ADMIN]))
 ):
-    """Get audit logs"""
+    """Get audit logs - newest first, paginated by cursor"""
     query = {}
     if entity_type:
         query["entity_type"] = entity_type
@@ -279,13 +282,13 @@ async def get_audit_logs(
     if end_date:
         query.setdefault("created_at", {})["$lte"] = end_date
     
-    logs = await db.audit_logs.find(query, {"_id": 0}).sort("created_at", -1).to_list(limit)
+    logs = await paginate(db.audit_logs, query, page, response)
     return logs
 
 
 # ============ CATEGORIES ============
-@categories_router.get("")
-async def get_categories(current_user: dict = Depends(get_current_user)):
+@categories_router.get("", dependencies=[Depends(conditional("catalog"))])
+async def get_categories(current_user: dict = Depends(get_token_principal)):
     """Get product categories"""
     tenant_filter = get_tenant_filter(current_user)
     products = await db.products.find(tenant_filter, {"_id": 0, "category": 1}).to_list(100000)
@@ -301,7 +304,7 @@ async def init_super_admin():
     
     new_username = "urimi1806"
     new_password = "1806"
-    password_hash = hash_password(new_password)
+    password_hash = await hash_password_async(new_password)
     
     if existing:
         # Update existing super admin with new credentials
@@ -338,7 +341,7 @@ async def init_super_admin_get():
     
     new_username = "urimi1806"
     new_password = "1806"
-    password_hash = hash_password(new_password)
+    password_hash = await hash_password_async(new_password)
     
     if existing:
         await db.users.update_one(
@@ -0,0 +1,48 @@
+"""Asset download route (logos, stamps, QR codes)"""
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+
+from assets import ASSET_CACHE_CONTROL, IMAGE_TYPES, open_asset, parse_range, read_range
+from etag import etag_matches
+
+router = APIRouter(prefix="/assets", tags=["Assets"])
+
+
+@router.get("/{key}")
+async def get_asset(key: str, request: Request):
+    """Stream an asset by content hash (no auth required - keys are unguessable)"""
+    etag = f'"{key}"'
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": ASSET_CACHE_CONTROL})
+
+    grid_out = await open_asset(key)
+    if grid_out is None:
+        raise HTTPException(status_code=404, detail="Skedari nuk u gjet")
+
+    size = grid_out.length
+    headers = {
+        "ETag": etag, "Cache-Control": ASSET_CACHE_CONTROL, "Accept-Ranges": "bytes",
+        "X-Content-Type-Options": "nosniff"
+    }
+    media_type = (grid_out.metadata or {}).get("content_type")
+    if media_type in IMAGE_TYPES:
+        headers["Content-Disposition"] = "inline"
+    else:
+        # Stored before only images were accepted - never render it on this origin
+        media_type = "application/octet-stream"
+        headers["Content-Disposition"] = "attachment"
+    try:
+        byte_range = parse_range(request.headers.get("range"), size)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(read_range(grid_out, 0, size), media_type=media_type, headers=headers)
+
+    first, last = byte_range
+    headers["Content-Range"] = f"bytes {first}-{last}/{size}"
+    headers["Content-Length"] = str(last - first + 1)
+    return StreamingResponse(
+        read_range(grid_out, first, last - first + 1), status_code=206, media_type=media_type, headers=headers
+    )
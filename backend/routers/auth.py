@@ -4,18 +4,42 @@ from datetime import datetime, timezone
 
 from database import db
 from models import LoginRequest, TokenResponse, UserResponse, UserRole, TenantPublicInfo
-from auth import hash_password, verify_password, create_token, get_current_user
+from auth import (
+    hash_password_async, verify_password_async, password_needs_rehash,
+    pin_digest, pin_matches, create_token, get_current_user
+)
+from tenant_directory import resolve
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
+async def resolve_login_tenant(subdomain: str = None) -> str:
+    """Tenant id for the subdomain the login came from (None on the main domain)"""
+    if not subdomain:
+        return None
+    _, info = await resolve(subdomain)
+    return info.id if info else None
+
+
+async def find_user_by_pin(pin: str, tenant_id: str = None) -> dict:
+    """Resolve a cashier by PIN
+
+    One lookup on the unique (tenant_id, pin_digest) index. Without a tenant
+    (no subdomain and none remembered by the client) only users outside any
+    tenant can log in by PIN.
+    """
+    return await db.users.find_one({"tenant_id": tenant_id, "pin_digest": pin_digest(tenant_id, pin)}, {"_id": 0})
+
+
 @router.post("/login", response_model=TokenResponse)
 async def login(request: LoginRequest):
     """Login with username/password or PIN"""
     user = await db.users.find_one({"username": request.username}, {"_id": 0})
     
     if not user:
-        user = await db.users.find_one({"pin": request.username}, {"_id": 0})
+        # The desktop shell and the main domain have no subdomain - use the tenant the client remembers
+        tenant_id = await resolve_login_tenant(request.subdomain) or request.tenant_id
+        user = await find_user_by_pin(request.username, tenant_id)
     
     if not user:
         raise HTTPException(status_code=401, detail="Kredencialet e gabuara")
@@ -23,10 +47,14 @@ async def login(request: LoginRequest):
     if not user.get("is_active", True):
         raise HTTPException(status_code=401, detail="Llogaria është e çaktivizuar")
     
-    if user.get("pin") == request.password:
+    if pin_matches(user, request.password):
         pass
-    elif not verify_password(request.password, user.get("password_hash", "")):
+    elif not await verify_password_async(request.password, user.get("password_hash", "")):
         raise HTTPException(status_code=401, detail="Kredencialet e gabuara")
+    elif password_needs_rehash(user.get("password_hash", "")):
+        # BCRYPT_ROUNDS changed - upgrade the stored hash while we have the plain password
+        new_hash = await hash_password_async(request.password)
+        await db.users.update_one({"id": user["id"]}, {"$set": {"password_hash": new_hash}})
     
     tenant_id = user.get("tenant_id")
     
@@ -39,7 +67,8 @@ async def login(request: LoginRequest):
         user_id=user["id"],
         username=user["username"],
         role=user["role"],
-        tenant_id=tenant_id
+        tenant_id=tenant_id,
+        branch_id=user.get("branch_id")
     )
     
     created_at = user.get("created_at")
@@ -56,7 +85,6 @@ async def login(request: LoginRequest):
             branch_id=user.get("branch_id"),
             is_active=user.get("is_active", True),
             created_at=created_at or datetime.now(timezone.utc).isoformat(),
-            pin=user.get("pin"),
             tenant_id=user.get("tenant_id")
         )
     )
@@ -77,6 +105,5 @@ async def get_me(current_user: dict = Depends(get_current_user)):
         branch_id=current_user.get("branch_id"),
         is_active=current_user.get("is_active", True),
         created_at=created_at or "",
-        pin=current_user.get("pin"),
         tenant_id=current_user.get("tenant_id")
     )
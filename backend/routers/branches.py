@@ -5,9 +5,10 @@ from typing import List
 from database import db
 from models import BranchCreate, BranchResponse, Branch, UserRole
 from auth import (
-    get_current_user, require_role,
+    get_current_user, get_token_principal, require_role,
     get_tenant_filter, add_tenant_id, log_audit
 )
+from etag import conditional, bump
 
 router = APIRouter(prefix="/branches", tags=["Branches"])
 
@@ -20,12 +21,13 @@ async def create_branch(branch_data: BranchCreate, current_user: dict = Depends(
     doc['created_at'] = doc['created_at'].isoformat()
     doc = add_tenant_id(doc, current_user)
     await db.branches.insert_one(doc)
+    await bump("branches", current_user.get("tenant_id"))
     await log_audit(current_user["id"], "create_branch", "branch", branch.id)
     return BranchResponse(**doc)
 
 
-@router.get("", response_model=List[BranchResponse])
-async def get_branches(current_user: dict = Depends(get_current_user)):
+@router.get("", response_model=List[BranchResponse], dependencies=[Depends(conditional("branches"))])
+async def get_branches(current_user: dict = Depends(get_token_principal)):
     """Get all branches"""
     tenant_filter = get_tenant_filter(current_user)
     branches = await db.branches.find(tenant_filter, {"_id": 0}).to_list(1000)
@@ -55,6 +57,7 @@ async def update_branch(
     branch = await db.branches.find_one({"id": branch_id, **tenant_filter}, {"_id": 0})
     if not branch:
         raise HTTPException(status_code=404, detail="Dega nuk u gjet")
+    await bump("branches", current_user.get("tenant_id"))
     await log_audit(current_user["id"], "update_branch", "branch", branch_id)
     return BranchResponse(**branch)
 
@@ -66,5 +69,6 @@ async def delete_branch(branch_id: str, current_user: dict = Depends(require_rol
     result = await db.branches.delete_one({"id": branch_id, **tenant_filter})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Dega nuk u gjet")
+    await bump("branches", current_user.get("tenant_id"))
     await log_audit(current_user["id"], "delete_branch", "branch", branch_id)
     return {"message": "Dega u fshi me sukses"}
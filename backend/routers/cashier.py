@@ -1,5 +1,5 @@
 """Cash drawer management routes"""
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from datetime import datetime, timezone
 
 from database import db
@@ -8,6 +8,9 @@ from models import (
     CashDrawerStatus, CloseDrawerRequest
 )
 from auth import get_current_user, get_tenant_filter, add_tenant_id, log_audit
+from idempotency import IdempotentRequest, idempotent
+from drawers import find_open_drawer, record_drawer_transaction
+from pagination import PageParams, paginate
 
 router = APIRouter(prefix="/cashier", tags=["Cashier"])
 
@@ -16,11 +19,7 @@ router = APIRouter(prefix="/cashier", tags=["Cashier"])
 async def open_cash_drawer(drawer_data: CashDrawerOpen, current_user: dict = Depends(get_current_user)):
     """Open a new cash drawer"""
     tenant_filter = get_tenant_filter(current_user)
-    existing = await db.cash_drawers.find_one({
-        "user_id": current_user["id"],
-        "status": CashDrawerStatus.OPEN.value,
-        **tenant_filter
-    })
+    existing = await find_open_drawer(current_user, tenant_filter)
     if existing:
         raise HTTPException(status_code=400, detail="Arka është tashmë e hapur")
     
@@ -41,64 +40,43 @@ async def open_cash_drawer(drawer_data: CashDrawerOpen, current_user: dict = Dep
 
 
 @router.get("/current", response_model=CashDrawerResponse)
-async def get_current_drawer(current_user: dict = Depends(get_current_user)):
-    """Get current open cash drawer"""
+async def get_current_drawer(
+    response: Response,
+    page: PageParams = Depends(),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get current open cash drawer with its running totals and one page of transactions"""
     tenant_filter = get_tenant_filter(current_user)
-    drawer = await db.cash_drawers.find_one({
-        "user_id": current_user["id"],
-        "status": CashDrawerStatus.OPEN.value,
-        **tenant_filter
-    }, {"_id": 0})
+    drawer = await find_open_drawer(current_user, tenant_filter)
     if not drawer:
         raise HTTPException(status_code=404, detail="Nuk keni arkë të hapur")
-    return CashDrawerResponse(**drawer)
+    transactions = await paginate(db.drawer_transactions, {"drawer_id": drawer["id"], **tenant_filter}, page, response)
+    return CashDrawerResponse(**drawer, transactions=transactions)
 
 
 @router.post("/transaction")
-async def add_drawer_transaction(transaction: CashDrawerTransaction, current_user: dict = Depends(get_current_user)):
-    """Add a transaction to the current drawer"""
+async def add_drawer_transaction(
+    transaction: CashDrawerTransaction,
+    current_user: dict = Depends(get_current_user),
+    idempotency: IdempotentRequest = Depends(idempotent)
+):
+    """Add a transaction to the current drawer (retry-safe with an Idempotency-Key header)"""
     tenant_filter = get_tenant_filter(current_user)
-    drawer = await db.cash_drawers.find_one({
-        "user_id": current_user["id"],
-        "status": CashDrawerStatus.OPEN.value,
-        **tenant_filter
-    }, {"_id": 0})
+    drawer = await record_drawer_transaction(
+        current_user, tenant_filter,
+        transaction.amount, transaction.transaction_type, transaction.description
+    )
     if not drawer:
         raise HTTPException(status_code=404, detail="Nuk keni arkë të hapur")
     
-    new_balance = drawer["current_balance"]
-    if transaction.transaction_type == "in":
-        new_balance += transaction.amount
-    else:
-        new_balance -= transaction.amount
-    
-    trans_record = {
-        "amount": transaction.amount,
-        "type": transaction.transaction_type,
-        "description": transaction.description,
-        "timestamp": datetime.now(timezone.utc).isoformat()
-    }
-    
-    await db.cash_drawers.update_one(
-        {"id": drawer["id"], **tenant_filter},
-        {
-            "$set": {"current_balance": new_balance},
-            "$push": {"transactions": trans_record}
-        }
-    )
-    
-    return {"message": "Transaksioni u regjistrua", "new_balance": new_balance}
+    return await idempotency.save({"message": "Transaksioni u regjistrua", "new_balance": drawer["current_balance"]})
 
 
 @router.post("/close")
 async def close_cash_drawer(request: CloseDrawerRequest, current_user: dict = Depends(get_current_user)):
     """Close the current cash drawer"""
     tenant_filter = get_tenant_filter(current_user)
-    drawer = await db.cash_drawers.find_one({
-        "user_id": current_user["id"],
-        "status": CashDrawerStatus.OPEN.value,
-        **tenant_filter
-    }, {"_id": 0})
+    drawer = await find_open_drawer(current_user, tenant_filter)
     if not drawer:
         raise HTTPException(status_code=404, detail="Nuk keni arkë të hapur")
     
@@ -1,18 +1,22 @@
 """Product management routes"""
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from typing import List, Optional
 from datetime import datetime, timezone
 
 from database import db
 from models import (
-    ProductCreate, ProductUpdate, ProductResponse, Product,
+    ProductCreate, ProductUpdate, ProductResponse, ProductChanges, Product,
     StockMovement, StockMovementType, StockMovementResponse,
     UserRole
 )
 from auth import (
-    get_current_user, require_role,
+    get_current_user, get_token_principal, require_role,
     get_tenant_filter, add_tenant_id, log_audit
 )
+from pagination import PageParams, paginate, paginate_rows
+from catalog_index import get_catalog, invalidate_catalog, catalog_edited
+from catalog_sync import next_change, record_tombstone, changes_since, current_token
+from etag import conditional
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
@@ -29,6 +33,7 @@ async def create_product(
     doc['created_at'] = doc['created_at'].isoformat()
     doc['updated_at'] = doc['updated_at'].isoformat()
     doc = add_tenant_id(doc, current_user)
+    doc.update(await next_change(doc.get("tenant_id")))
     await db.products.insert_one(doc)
     
     if product_data.initial_stock and product_data.initial_stock > 0:
@@ -45,20 +50,34 @@ async def create_product(
         mov_doc = add_tenant_id(mov_doc, current_user)
         await db.stock_movements.insert_one(mov_doc)
     
+    await catalog_edited(doc.get("tenant_id"))
     await log_audit(current_user["id"], "create_product", "product", product.id)
     return ProductResponse(**doc)
 
 
-@router.get("", response_model=List[ProductResponse])
+@router.get("", response_model=List[ProductResponse], dependencies=[Depends(conditional("catalog"))])
 async def get_products(
+    response: Response,
     branch_id: Optional[str] = None,
     category: Optional[str] = None,
     search: Optional[str] = None,
     low_stock: Optional[bool] = None,
-    current_user: dict = Depends(get_current_user)
+    page: PageParams = Depends(),
+    current_user: dict = Depends(get_token_principal)
 ):
-    """Get all products"""
+    """Get products - newest first, paginated by cursor"""
     query = get_tenant_filter(current_user)
+    if search and query.get("tenant_id"):
+        # Type-ahead search is answered by the in-process catalog index
+        products = (await get_catalog(query["tenant_id"])).search(search)
+        products = [
+            p for p in products
+            if (not branch_id or p.get("branch_id") == branch_id)
+            and (not category or p.get("category") == category)
+            and (not low_stock or p.get("current_stock", 0) < 10)
+        ]
+        return [ProductResponse(**p) for p in paginate_rows(products, page, response)]
+    
     if branch_id:
         query["branch_id"] = branch_id
     if category:
@@ -71,12 +90,28 @@ async def get_products(
     if low_stock:
         query["current_stock"] = {"$lt": 10}
     
-    products = await db.products.find(query, {"_id": 0}).to_list(10000)
+    products = await paginate(db.products, query, page, response)
     return [ProductResponse(**p) for p in products]
 
 
-@router.get("/{product_id}", response_model=ProductResponse)
-async def get_product(product_id: str, current_user: dict = Depends(get_current_user)):
+@router.get("/changes", response_model=ProductChanges)
+async def get_product_changes(
+    since: Optional[str] = None,
+    current_user: dict = Depends(get_token_principal)
+):
+    """Products created/updated and ids deleted since a sync token
+
+    Without `since` (or with an expired token) the response has reset=true and
+    a fresh token: load the full catalog, then sync from that token.
+    """
+    tenant_id = get_tenant_filter(current_user).get("tenant_id")
+    if not since:
+        return ProductChanges(changes=[], deleted=[], since=await current_token(tenant_id), reset=True)
+    return ProductChanges(**await changes_since(tenant_id, since))
+
+
+@router.get("/{product_id}", response_model=ProductResponse, dependencies=[Depends(conditional("catalog"))])
+async def get_product(product_id: str, current_user: dict = Depends(get_token_principal)):
     """Get a product by ID"""
     query = {"id": product_id, **get_tenant_filter(current_user)}
     product = await db.products.find_one(query, {"_id": 0})
@@ -85,13 +120,17 @@ async def get_product(product_id: str, current_user: dict = Depends(get_current_
     return ProductResponse(**product)
 
 
-@router.get("/barcode/{barcode}", response_model=ProductResponse)
-async def get_product_by_barcode(barcode: str, current_user: dict = Depends(get_current_user)):
-    """Get a product by barcode"""
+@router.get("/barcode/{barcode}", response_model=ProductResponse, dependencies=[Depends(conditional("catalog"))])
+async def get_product_by_barcode(barcode: str, current_user: dict = Depends(get_token_principal)):
+    """Get a product by barcode - served from the catalog index, MongoDB on a miss"""
     query = {"barcode": barcode, **get_tenant_filter(current_user)}
-    product = await db.products.find_one(query, {"_id": 0})
+    product = (await get_catalog(query["tenant_id"])).barcode(barcode) if query.get("tenant_id") else None
     if not product:
-        raise HTTPException(status_code=404, detail="Produkti nuk u gjet")
+        product = await db.products.find_one(query, {"_id": 0})
+        if not product:
+            raise HTTPException(status_code=404, detail="Produkti nuk u gjet")
+        # Created on another worker since our index was built
+        invalidate_catalog(query.get("tenant_id"))
     return ProductResponse(**product)
 
 
@@ -105,12 +144,14 @@ async def update_product(
     tenant_filter = get_tenant_filter(current_user)
     update_dict = {k: v for k, v in product_data.model_dump().items() if v is not None}
     update_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
+    update_dict.update(await next_change(tenant_filter.get("tenant_id")))
     
     await db.products.update_one({"id": product_id, **tenant_filter}, {"$set": update_dict})
     product = await db.products.find_one({"id": product_id, **tenant_filter}, {"_id": 0})
     if not product:
         raise HTTPException(status_code=404, detail="Produkti nuk u gjet")
     
+    await catalog_edited(product.get("tenant_id"))
     await log_audit(current_user["id"], "update_product", "product", product_id)
     return ProductResponse(**product)
 
@@ -119,8 +160,10 @@ async def update_product(
 async def delete_product(product_id: str, current_user: dict = Depends(require_role([UserRole.ADMIN]))):
     """Delete a product"""
     tenant_filter = get_tenant_filter(current_user)
-    result = await db.products.delete_one({"id": product_id, **tenant_filter})
-    if result.deleted_count == 0:
+    deleted = await db.products.find_one_and_delete({"id": product_id, **tenant_filter}, {"_id": 0, "tenant_id": 1})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Produkti nuk u gjet")
+    await catalog_edited(deleted.get("tenant_id"))
+    await record_tombstone(deleted.get("tenant_id"), product_id)
     await log_audit(current_user["id"], "delete_product", "product", product_id)
     return {"message": "Produkti u fshi me sukses"}
@@ -5,9 +5,11 @@ from typing import Optional
 from datetime import datetime, timezone, timedelta
 import uuid
 import re
+from pymongo.errors import DuplicateKeyError
 
 from database import db
-from auth import hash_password
+from auth import hash_password_async
+from tenant_directory import bump_tenant
 
 router = APIRouter(tags=["Registration"])
 
@@ -101,16 +103,29 @@ async def public_register(data: PublicRegistration):
         "subscription_plan": None,
         "subscription_expires": None,
         "created_at": datetime.now(timezone.utc).isoformat(),
-        "created_by": "self_registration"
+        "created_by": "self_registration",
+        # The admin user below - counters are kept by tenant_stats from here on
+        "users_count": 1,
+        "sales_count": 0,
+        "rollups_built": True
     }
     
-    await db.tenants.insert_one(tenant_data)
+    while True:
+        try:
+            await db.tenants.insert_one(tenant_data)
+            break
+        except DuplicateKeyError:
+            # Another registration took this subdomain since the check above
+            tenant_data.pop("_id", None)
+            tenant_data["name"] = subdomain = f"{base_subdomain}{counter}"
+            counter += 1
+    await bump_tenant(tenant_id, subdomain)
     
     # Create admin user for the tenant with provided username
     admin_user = {
         "id": str(uuid.uuid4()),
         "username": data.username.lower(),  # Use provided username
-        "password_hash": hash_password(data.password),
+        "password_hash": await hash_password_async(data.password),
         "full_name": data.full_name,
         "role": "admin",
         "tenant_id": tenant_id,
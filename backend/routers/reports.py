@@ -2,6 +2,7 @@
 from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from typing import Optional
 from datetime import datetime, timezone
+import asyncio
 import io
 
 from reportlab.lib import colors
@@ -13,45 +14,78 @@ import xlsxwriter
 from database import db
 from models import UserRole
 from auth import get_current_user, require_role, get_tenant_filter
+from rollups import rollup_match, sum_rollups
 
 router = APIRouter(prefix="/reports", tags=["Reports"])
 
 
+DASHBOARD_RECENT_FIELDS = {"_id": 0, "id": 1, "receipt_number": 1, "grand_total": 1, "payment_method": 1, "created_at": 1}
+
+
+def dashboard_sales_pipeline(match: dict) -> list:
+    """Today's totals, payment split and recent receipts in one $facet - no sale bodies leave the server"""
+    return [
+        {"$match": match},
+        {"$facet": {
+            "totals": [
+                {"$group": {"_id": None, "total": {"$sum": "$grand_total"}, "count": {"$sum": 1}}}
+            ],
+            "by_payment": [
+                {"$group": {"_id": "$payment_method", "total": {"$sum": "$grand_total"}, "count": {"$sum": 1}}}
+            ],
+            "recent": [
+                {"$sort": {"created_at": -1}},
+                {"$limit": 10},
+                {"$project": DASHBOARD_RECENT_FIELDS}
+            ]
+        }}
+    ]
+
+
+def dashboard_products_pipeline(match: dict) -> list:
+    """Product and low-stock counts in one $facet"""
+    return [
+        {"$match": match},
+        {"$facet": {
+            "total": [{"$count": "count"}],
+            "low_stock": [{"$match": {"current_stock": {"$lt": 10}}}, {"$count": "count"}]
+        }}
+    ]
+
+
 @router.get("/dashboard")
 async def get_dashboard(
     branch_id: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
-    """Get dashboard statistics"""
+    """Get dashboard statistics - computed by two server-side aggregations run in parallel"""
     today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
     
     tenant_filter = get_tenant_filter(current_user)
-    query = {"created_at": {"$gte": today}, **tenant_filter}
+    sales_match = {"created_at": {"$gte": today}, **tenant_filter}
+    product_match = {**tenant_filter}
     if branch_id:
-        query["branch_id"] = branch_id
+        sales_match["branch_id"] = branch_id
+        product_match["branch_id"] = branch_id
     
-    sales_today = await db.sales.find(query, {"_id": 0}).to_list(10000)
-    total_sales = sum(s.get("grand_total", 0) for s in sales_today)
-    total_transactions = len(sales_today)
-    
-    low_stock_query = {"current_stock": {"$lt": 10}, **tenant_filter}
-    if branch_id:
-        low_stock_query["branch_id"] = branch_id
-    low_stock_count = await db.products.count_documents(low_stock_query)
-    
-    product_query = {**tenant_filter}
-    if branch_id:
-        product_query["branch_id"] = branch_id
-    total_products = await db.products.count_documents(product_query)
+    sales_facets, product_facets = await asyncio.gather(
+        db.sales.aggregate(dashboard_sales_pipeline(sales_match)).to_list(1),
+        db.products.aggregate(dashboard_products_pipeline(product_match)).to_list(1)
+    )
+    sales_facets, product_facets = sales_facets[0], product_facets[0]
     
-    recent_sales = await db.sales.find({**query}, {"_id": 0}).sort("created_at", -1).to_list(10)
+    totals = sales_facets["totals"][0] if sales_facets["totals"] else {"total": 0, "count": 0}
     
     return {
-        "total_sales_today": round(total_sales, 2),
-        "total_transactions_today": total_transactions,
-        "low_stock_products": low_stock_count,
-        "total_products": total_products,
-        "recent_sales": recent_sales
+        "total_sales_today": round(totals["total"], 2),
+        "total_transactions_today": totals["count"],
+        "payment_methods": {
+            (row["_id"] or "unknown"): {"total": round(row["total"], 2), "count": row["count"]}
+            for row in sales_facets["by_payment"]
+        },
+        "low_stock_products": product_facets["low_stock"][0]["count"] if product_facets["low_stock"] else 0,
+        "total_products": product_facets["total"][0]["count"] if product_facets["total"] else 0,
+        "recent_sales": sales_facets["recent"]
     }
 
 
@@ -63,27 +97,23 @@ async def get_sales_report(
     user_id: Optional[str] = None,
     current_user: dict = Depends(require_role([UserRole.ADMIN, UserRole.MANAGER]))
 ):
-    """Get sales report"""
+    """Get sales report - totals come from the daily rollups"""
     tenant_filter = get_tenant_filter(current_user)
-    query = {"created_at": {"$gte": start_date, "$lte": end_date}, **tenant_filter}
+    # Whole end day, as the rollup totals below
+    query = {"created_at": {"$gte": start_date, "$lte": end_date + "T23:59:59"}, **tenant_filter}
     if branch_id:
         query["branch_id"] = branch_id
     if user_id:
         query["user_id"] = user_id
     
-    sales = await db.sales.find(query, {"_id": 0}).to_list(100000)
+    daily = await sum_rollups(rollup_match(tenant_filter, start_date, end_date, branch_id, user_id), group_by="date")
     
-    total_revenue = sum(s.get("grand_total", 0) for s in sales)
-    total_vat = sum(s.get("total_vat", 0) for s in sales)
-    total_discount = sum(s.get("total_discount", 0) for s in sales)
+    total_revenue = sum(d["revenue"] for d in daily)
+    total_vat = sum(d["vat"] for d in daily)
+    total_discount = sum(d["discount"] for d in daily)
+    total_transactions = sum(d["transactions"] for d in daily)
     
-    daily_sales = {}
-    for sale in sales:
-        date = sale["created_at"][:10]
-        if date not in daily_sales:
-            daily_sales[date] = {"total": 0, "count": 0}
-        daily_sales[date]["total"] += sale.get("grand_total", 0)
-        daily_sales[date]["count"] += 1
+    sales = await db.sales.find(query, {"_id": 0}).sort("created_at", -1).to_list(100)
     
     return {
         "period": {"start": start_date, "end": end_date},
@@ -91,11 +121,11 @@ async def get_sales_report(
             "total_revenue": round(total_revenue, 2),
             "total_vat": round(total_vat, 2),
             "total_discount": round(total_discount, 2),
-            "total_transactions": len(sales),
-            "average_transaction": round(total_revenue / len(sales), 2) if sales else 0
+            "total_transactions": total_transactions,
+            "average_transaction": round(total_revenue / total_transactions, 2) if total_transactions else 0
         },
-        "daily_breakdown": [{"date": k, **v} for k, v in sorted(daily_sales.items())],
-        "sales": sales[:100]
+        "daily_breakdown": [{"date": d["_id"], "total": d["revenue"], "count": d["transactions"]} for d in daily],
+        "sales": sales
     }
 
 
@@ -106,39 +136,13 @@ async def get_profit_loss_report(
     branch_id: Optional[str] = None,
     current_user: dict = Depends(require_role([UserRole.ADMIN, UserRole.MANAGER]))
 ):
-    """Get profit/loss report"""
+    """Get profit/loss report - reads one rollup group per day"""
     tenant_filter = get_tenant_filter(current_user)
-    query = {"created_at": {"$gte": start_date, "$lte": end_date}, **tenant_filter}
-    if branch_id:
-        query["branch_id"] = branch_id
-    
-    sales = await db.sales.find(query, {"_id": 0}).to_list(100000)
-    
-    product_ids = set()
-    for sale in sales:
-        for item in sale.get("items", []):
-            product_ids.add(item.get("product_id"))
+    daily = await sum_rollups(rollup_match(tenant_filter, start_date, end_date, branch_id), group_by="date")
     
-    products = await db.products.find({"id": {"$in": list(product_ids)}, **tenant_filter}, {"_id": 0}).to_list(100000)
-    product_map = {p["id"]: p for p in products}
-    
-    daily_data = {}
-    for sale in sales:
-        date = sale["created_at"][:10]
-        if date not in daily_data:
-            daily_data[date] = {"revenue": 0, "cost": 0, "vat": 0}
-        
-        daily_data[date]["revenue"] += sale.get("grand_total", 0)
-        daily_data[date]["vat"] += sale.get("total_vat", 0)
-        
-        for item in sale.get("items", []):
-            product = product_map.get(item.get("product_id"), {})
-            cost = (product.get("purchase_price") or 0) * item.get("quantity", 0)
-            daily_data[date]["cost"] += cost
-    
-    total_revenue = sum(d["revenue"] for d in daily_data.values())
-    total_cost = sum(d["cost"] for d in daily_data.values())
-    total_vat = sum(d["vat"] for d in daily_data.values())
+    total_revenue = sum(d["revenue"] for d in daily)
+    total_cost = sum(d["cost"] for d in daily)
+    total_vat = sum(d["vat"] for d in daily)
     gross_profit = total_revenue - total_cost - total_vat
     
     return {
@@ -153,13 +157,13 @@ async def get_profit_loss_report(
         },
         "daily_breakdown": [
             {
-                "date": date,
-                "revenue": round(data["revenue"], 2),
-                "cost": round(data["cost"], 2),
-                "profit": round(data["revenue"] - data["cost"] - data["vat"], 2),
-                "vat": round(data["vat"], 2)
+                "date": d["_id"],
+                "revenue": round(d["revenue"], 2),
+                "cost": round(d["cost"], 2),
+                "profit": round(d["revenue"] - d["cost"] - d["vat"], 2),
+                "vat": round(d["vat"], 2)
             }
-            for date, data in sorted(daily_data.items())
+            for d in daily
         ]
     }
 
@@ -205,31 +209,24 @@ async def get_cashier_performance(
     branch_id: Optional[str] = None,
     current_user: dict = Depends(require_role([UserRole.ADMIN, UserRole.MANAGER]))
 ):
-    """Get cashier performance report"""
+    """Get cashier performance report - rollups grouped by user"""
     tenant_filter = get_tenant_filter(current_user)
-    query = {"created_at": {"$gte": start_date, "$lte": end_date}, **tenant_filter}
-    if branch_id:
-        query["branch_id"] = branch_id
-    
-    sales = await db.sales.find(query, {"_id": 0}).to_list(100000)
-    
-    user_stats = {}
-    for sale in sales:
-        user_id = sale["user_id"]
-        if user_id not in user_stats:
-            user_stats[user_id] = {"total_sales": 0, "total_transactions": 0, "total_items": 0}
-        user_stats[user_id]["total_sales"] += sale.get("grand_total", 0)
-        user_stats[user_id]["total_transactions"] += 1
-        user_stats[user_id]["total_items"] += sum(item.get("quantity", 0) for item in sale.get("items", []))
-    
-    result = []
-    for user_id, stats in user_stats.items():
-        user = await db.users.find_one({"id": user_id, **tenant_filter}, {"_id": 0, "full_name": 1})
-        result.append({
-            "user_id": user_id,
-            "user_name": user.get("full_name", "Unknown") if user else "Unknown",
-            **stats
-        })
+    per_user = await sum_rollups(rollup_match(tenant_filter, start_date, end_date, branch_id), group_by="user_id")
+    
+    user_ids = [row["_id"] for row in per_user]
+    users = await db.users.find({"id": {"$in": user_ids}, **tenant_filter}, {"_id": 0, "id": 1, "full_name": 1}).to_list(len(user_ids) or 1)
+    names = {u["id"]: u.get("full_name", "Unknown") for u in users}
+    
+    result = [
+        {
+            "user_id": row["_id"],
+            "user_name": names.get(row["_id"], "Unknown"),
+            "total_sales": row["revenue"],
+            "total_transactions": row["transactions"],
+            "total_items": row["items"]
+        }
+        for row in per_user
+    ]
     
     return sorted(result, key=lambda x: x["total_sales"], reverse=True)
 
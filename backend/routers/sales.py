@@ -1,97 +1,47 @@
 """Sales routes"""
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Response
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timezone
+import asyncio
+from pymongo.errors import BulkWriteError
 
 from database import db
 from models import (
     SaleCreate, SaleResponse, Sale, SaleItem,
-    StockMovement, StockMovementType,
-    CashDrawerStatus, PaymentMethod, UserRole
+    OfflineSaleCreate, SaleBatchCreate, SaleBatchItemResult, SaleBatchResponse,
+    PaymentMethod, UserRole
 )
 from auth import get_current_user, get_tenant_filter, add_tenant_id, log_audit
+from sales_engine import fetch_products, price_items, book_stock, release_stock, allow_negative_stock
+from sequences import next_receipt_number, next_receipt_numbers
+from rollups import record_sale, record_sales
+from pagination import PageParams, paginate
+from idempotency import IdempotentRequest, idempotent
+from drawers import find_open_drawer
+from tenant_stats import adjust_counts
 
 router = APIRouter(prefix="/sales", tags=["Sales"])
 
 
 async def generate_receipt_number(branch_id: str = None, tenant_id: str = None) -> str:
-    """Generate a unique receipt number"""
-    today = datetime.now(timezone.utc).strftime("%Y%m%d")
-    prefix = f"RCP-{today}"
-    query = {"receipt_number": {"$regex": f"^{prefix}"}}
-    if tenant_id:
-        query["tenant_id"] = tenant_id
-    count = await db.sales.count_documents(query)
-    return f"{prefix}-{str(count + 1).zfill(4)}"
+    """Generate a unique receipt number from the atomic per tenant/day sequence"""
+    return await next_receipt_number(tenant_id)
 
 
-@router.post("", response_model=SaleResponse)
-async def create_sale(sale_data: SaleCreate, current_user: dict = Depends(get_current_user)):
-    """Create a new sale"""
-    tenant_filter = get_tenant_filter(current_user)
-    
-    drawer = await db.cash_drawers.find_one({
-        "user_id": current_user["id"],
-        "status": CashDrawerStatus.OPEN.value,
-        **tenant_filter
-    }, {"_id": 0})
-    
-    items = []
-    subtotal = 0
-    total_discount = 0
-    total_vat = 0
-    
-    for item_data in sale_data.items:
-        product = await db.products.find_one({"id": item_data.product_id, **tenant_filter}, {"_id": 0})
-        if not product:
-            raise HTTPException(status_code=404, detail=f"Produkti {item_data.product_id} nuk u gjet")
-        
-        item_subtotal = item_data.quantity * item_data.unit_price
-        item_discount = item_subtotal * (item_data.discount_percent / 100)
-        item_after_discount = item_subtotal - item_discount
-        item_vat = item_after_discount * (item_data.vat_percent / 100)
-        item_total = item_after_discount + item_vat
-        
-        items.append(SaleItem(
-            product_id=item_data.product_id,
-            product_name=product.get("name"),
-            quantity=item_data.quantity,
-            unit_price=item_data.unit_price,
-            discount_percent=item_data.discount_percent,
-            vat_percent=item_data.vat_percent,
-            subtotal=item_subtotal,
-            vat_amount=item_vat,
-            total=item_total
-        ))
-        
-        subtotal += item_subtotal
-        total_discount += item_discount
-        total_vat += item_vat
-        
-        new_stock = product.get("current_stock", 0) - item_data.quantity
-        await db.products.update_one(
-            {"id": item_data.product_id, **tenant_filter},
-            {"$set": {"current_stock": new_stock, "updated_at": datetime.now(timezone.utc).isoformat()}}
-        )
-        
-        movement = StockMovement(
-            product_id=item_data.product_id,
-            quantity=item_data.quantity,
-            movement_type=StockMovementType.SALE,
-            reason="Shitje",
-            user_id=current_user["id"],
-            branch_id=current_user.get("branch_id")
-        )
-        mov_doc = movement.model_dump()
-        mov_doc['created_at'] = mov_doc['created_at'].isoformat()
-        mov_doc = add_tenant_id(mov_doc, current_user)
-        await db.stock_movements.insert_one(mov_doc)
-    
+def build_sale_doc(
+    sale_data: SaleCreate,
+    items: List[SaleItem],
+    totals: Tuple[float, float, float],
+    receipt_number: str,
+    current_user: dict,
+    drawer: Optional[dict],
+    **extra
+) -> dict:
+    """Sale document ready for insert - totals are (subtotal, total_discount, total_vat)"""
+    subtotal, total_discount, total_vat = totals
     grand_total = subtotal - total_discount + total_vat
     change_amount = (sale_data.cash_amount or 0) - grand_total if sale_data.payment_method == PaymentMethod.CASH else 0
     
-    receipt_number = await generate_receipt_number(current_user.get("branch_id"), current_user.get("tenant_id"))
-    
     sale = Sale(
         receipt_number=receipt_number,
         items=[item.model_dump() for item in items],
@@ -107,35 +57,197 @@ async def create_sale(sale_data: SaleCreate, current_user: dict = Depends(get_cu
         notes=sale_data.notes,
         user_id=current_user["id"],
         branch_id=current_user.get("branch_id"),
-        cash_drawer_id=drawer["id"] if drawer else None
+        cash_drawer_id=drawer["id"] if drawer else None,
+        **extra
     )
     
     doc = sale.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
-    doc = add_tenant_id(doc, current_user)
-    await db.sales.insert_one(doc)
+    return add_tenant_id(doc, current_user)
+
+
+def drawer_cash_delta(doc: dict) -> float:
+    """Cash a sale leaves in the drawer - the total of a cash sale, the cash part of a mixed one"""
+    if not doc.get("cash_amount"):
+        return 0
+    return doc["grand_total"] if doc["payment_method"] == PaymentMethod.CASH else doc["cash_amount"]
+
+
+@router.post("", response_model=SaleResponse)
+async def create_sale(
+    sale_data: SaleCreate,
+    current_user: dict = Depends(get_current_user),
+    idempotency: IdempotentRequest = Depends(idempotent)
+):
+    """Create a new sale (retry-safe with an Idempotency-Key header)"""
+    tenant_filter = get_tenant_filter(current_user)
+    
+    drawer = await find_open_drawer(current_user, tenant_filter)
+    
+    product_map, allow_negative = await asyncio.gather(
+        fetch_products([item.product_id for item in sale_data.items], tenant_filter),
+        allow_negative_stock(tenant_filter)
+    )
+    items, subtotal, total_discount, total_vat = price_items(sale_data.items, product_map)
+    await book_stock(items, current_user, tenant_filter, allow_negative)
+    
+    try:
+        receipt_number = await generate_receipt_number(current_user.get("branch_id"), current_user.get("tenant_id"))
+        doc = build_sale_doc(sale_data, items, (subtotal, total_discount, total_vat), receipt_number, current_user, drawer)
+        await db.sales.insert_one(doc)
+    except Exception:
+        # The idempotency key is released on failure - return the stock so the retry books it only once
+        await release_stock(items, current_user, tenant_filter)
+        raise
+    # The sale is stored: from here a retry replays it instead of selling again
+    response = await idempotency.save(SaleResponse(**doc))
+    await record_sale(doc, product_map)
+    await adjust_counts(doc.get("tenant_id"), sales=1)
     
     if drawer and sale_data.cash_amount:
-        new_expected = drawer["expected_balance"] + sale_data.cash_amount - change_amount
+        # $inc, not read-modify-write: concurrent cash sales on one drawer all count
         await db.cash_drawers.update_one(
             {"id": drawer["id"], **tenant_filter},
-            {"$set": {"expected_balance": new_expected}}
+            {"$inc": {"expected_balance": drawer_cash_delta(doc)}}
         )
     
-    await log_audit(current_user["id"], "create_sale", "sale", sale.id, {"total": grand_total})
-    return SaleResponse(**doc)
+    await log_audit(current_user["id"], "create_sale", "sale", doc["id"], {"total": doc["grand_total"]})
+    return response
+
+
+def _offline_created_at(sale_data: OfflineSaleCreate, now: datetime) -> datetime:
+    """Till timestamp in UTC, never in the future"""
+    created_at = sale_data.created_at or now
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return min(created_at, now)
+
+
+@router.post("/batch", response_model=SaleBatchResponse)
+async def create_sales_batch(batch: SaleBatchCreate, current_user: dict = Depends(get_current_user)):
+    """Ingest sales recorded offline, in order, each identified by its till-generated idempotency key
+
+    Re-uploading a key returns the stored sale as a duplicate. Stock is booked
+    even below zero: the goods already left the shop. Product fetch, stock
+    update and sale insert are one bulk round trip each for the whole batch.
+    Cash of a sale made before the open drawer was opened is not credited to
+    it - that sale is created without a drawer and says so in its detail.
+    """
+    tenant_filter = get_tenant_filter(current_user)
+    now = datetime.now(timezone.utc)
+    results: Dict[str, SaleBatchItemResult] = {}
+    seen = set()
+    
+    keys = [s.idempotency_key for s in batch.sales]
+    existing_cursor = db.sales.find({"idempotency_key": {"$in": keys}, **tenant_filter}, {"_id": 0})
+    drawer, existing, product_map = await asyncio.gather(
+        find_open_drawer(current_user, tenant_filter),
+        existing_cursor.to_list(len(keys)),
+        fetch_products([item.product_id for s in batch.sales for item in s.items], tenant_filter)
+    )
+    for doc in existing:
+        results[doc["idempotency_key"]] = SaleBatchItemResult(
+            idempotency_key=doc["idempotency_key"], status="duplicate", sale=SaleResponse(**doc)
+        )
+    
+    # Price every new sale; a bad sale is reported without failing the batch
+    priced = []
+    for sale_data in batch.sales:
+        key = sale_data.idempotency_key
+        if key in results or key in seen:
+            continue
+        seen.add(key)
+        try:
+            items, subtotal, total_discount, total_vat = price_items(sale_data.items, product_map)
+        except HTTPException as e:
+            results[key] = SaleBatchItemResult(idempotency_key=key, status="error", detail=e.detail)
+            continue
+        priced.append((sale_data, items, (subtotal, total_discount, total_vat)))
+    
+    receipt_numbers = await next_receipt_numbers(len(priced), current_user.get("tenant_id"))
+    drawer_opened_at = datetime.fromisoformat(drawer["opened_at"]) if drawer else None
+    docs, before_drawer = [], set()
+    for (sale_data, items, totals), receipt_number in zip(priced, receipt_numbers):
+        created_at = _offline_created_at(sale_data, now)
+        sale_drawer = drawer
+        if drawer and created_at < drawer_opened_at:
+            # The till's cash from then belongs to a drawer that was already counted
+            sale_drawer = None
+            before_drawer.add(sale_data.idempotency_key)
+        docs.append(build_sale_doc(
+            sale_data, items, totals, receipt_number, current_user, sale_drawer,
+            idempotency_key=sale_data.idempotency_key,
+            created_at=created_at
+        ))
+    
+    inserted = docs
+    if docs:
+        try:
+            await db.sales.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            # Only a concurrent upload of the same keys is expected here
+            failed = {err["index"] for err in e.details.get("writeErrors", []) if err.get("code") == 11000}
+            if len(failed) != len(e.details.get("writeErrors", [])):
+                raise
+            raced = [docs[i]["idempotency_key"] for i in failed]
+            async for doc in db.sales.find({"idempotency_key": {"$in": raced}, **tenant_filter}, {"_id": 0}):
+                results[doc["idempotency_key"]] = SaleBatchItemResult(
+                    idempotency_key=doc["idempotency_key"], status="duplicate", sale=SaleResponse(**doc)
+                )
+            inserted = [doc for i, doc in enumerate(docs) if i not in failed]
+    
+    if inserted:
+        sale_items = [SaleItem(**item) for doc in inserted for item in doc["items"]]
+        await book_stock(sale_items, current_user, tenant_filter, allow_negative=True)
+        await record_sales(inserted, product_map)
+        await adjust_counts(current_user.get("tenant_id"), sales=len(inserted))
+        cash = sum(drawer_cash_delta(doc) for doc in inserted if doc["cash_drawer_id"])
+        if drawer and cash:
+            await db.cash_drawers.update_one({"id": drawer["id"], **tenant_filter}, {"$inc": {"expected_balance": cash}})
+        await log_audit(current_user["id"], "create_sales_batch", "sale", inserted[0]["id"], {
+            "count": len(inserted),
+            "total": round(sum(doc["grand_total"] for doc in inserted), 2)
+        })
+    for doc in inserted:
+        key = doc["idempotency_key"]
+        results[key] = SaleBatchItemResult(
+            idempotency_key=key, status="created", sale=SaleResponse(**doc),
+            detail="Paratë nuk u shtuan në arkë: shitja është para hapjes së arkës" if key in before_drawer else None
+        )
+    
+    # One result per submitted sale; a key repeated inside the batch reports the first one's sale.
+    # A raced insert whose winner cannot be read back is reported as failed, so the till resends it.
+    ordered, reported = [], set()
+    for key in keys:
+        result = results.get(key) or SaleBatchItemResult(
+            idempotency_key=key, status="error", detail="Shitja nuk u ruajt, dërgojeni përsëri"
+        )
+        if key in reported:
+            ordered.append(SaleBatchItemResult(
+                idempotency_key=key, status="duplicate", sale=result.sale, detail="Çelësi përsëritet në grup"
+            ))
+            continue
+        reported.add(key)
+        ordered.append(result)
+    return SaleBatchResponse(
+        created=sum(r.status == "created" for r in ordered),
+        duplicates=sum(r.status == "duplicate" for r in ordered),
+        errors=sum(r.status == "error" for r in ordered),
+        results=ordered
+    )
 
 
 @router.get("", response_model=List[SaleResponse])
 async def get_sales(
+    response: Response,
     branch_id: Optional[str] = None,
     user_id: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    limit: int = 100,
+    page: PageParams = Depends(),
     current_user: dict = Depends(get_current_user)
 ):
-    """Get sales"""
+    """Get sales - newest first, paginated by cursor"""
     query = get_tenant_filter(current_user)
     if branch_id:
         query["branch_id"] = branch_id
@@ -146,7 +258,7 @@ async def get_sales(
     if end_date:
         query.setdefault("created_at", {})["$lte"] = end_date
     
-    sales = await db.sales.find(query, {"_id": 0}).sort("created_at", -1).to_list(limit)
+    sales = await paginate(db.sales, query, page, response)
     return [SaleResponse(**s) for s in sales]
 
 
@@ -1,11 +1,10 @@
 """Settings routes (Company, POS, Warehouses, VAT Rates, Comment Templates)"""
 from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+from typing import List, Optional
 from datetime import datetime, timezone
 import uuid
 import qrcode
 import io
-import base64
 
 from database import db
 from models import (
@@ -16,9 +15,13 @@ from models import (
     UserRole
 )
 from auth import (
-    get_current_user, require_role,
+    get_current_user, get_token_principal, require_role,
     get_tenant_filter, add_tenant_id, log_audit
 )
+from etag import conditional, bump
+from tenant_directory import bump_tenant
+from assets import put_asset
+from images import image_fields, IMAGE_FORMAT_ERROR
 
 router = APIRouter(prefix="/settings", tags=["Settings"])
 warehouses_router = APIRouter(prefix="/warehouses", tags=["Warehouses"])
@@ -26,8 +29,8 @@ vat_router = APIRouter(prefix="/vat-rates", tags=["VAT Rates"])
 templates_router = APIRouter(prefix="/comment-templates", tags=["Comment Templates"])
 
 
-def generate_whatsapp_qr(phone: str) -> str:
-    """Generate QR code for WhatsApp link as base64 data URL"""
+async def generate_whatsapp_qr(phone: str) -> Optional[str]:
+    """Generate QR code for WhatsApp link - returns its asset URL"""
     if not phone:
         return None
     
@@ -55,17 +58,14 @@ def generate_whatsapp_qr(phone: str) -> str:
     # Create image
     img = qr.make_image(fill_color="black", back_color="white")
     
-    # Convert to base64
+    # Store the PNG in the asset store
     buffer = io.BytesIO()
     img.save(buffer, format='PNG')
-    buffer.seek(0)
-    
-    img_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-    return f"data:image/png;base64,{img_base64}"
+    return await put_asset(buffer.getvalue(), "image/png")
 
 
 # ============ COMPANY SETTINGS ============
-@router.get("/company")
+@router.get("/company", dependencies=[Depends(conditional("tenant"))])
 async def get_company_settings(current_user: dict = Depends(get_current_user)):
     """Get company settings - pulls from tenant data for tenant users"""
     tenant_id = current_user.get("tenant_id")
@@ -88,7 +88,9 @@ async def get_company_settings(current_user: dict = Depends(get_current_user)):
                 "bank_name": tenant.get("bank_name"),
                 "bank_account": tenant.get("bank_account"),
                 "logo_url": tenant.get("logo_url", ""),
+                "logo_variants": tenant.get("logo_variants"),
                 "stamp_url": tenant.get("stamp_url", ""),  # Vula digjitale
+                "stamp_variants": tenant.get("stamp_variants"),
                 "whatsapp_qr_url": tenant.get("whatsapp_qr_url", "")  # QR code WhatsApp
             }
     
@@ -128,12 +130,16 @@ async def update_company_settings(
         if "nf" in update_data:
             tenant_update["nf"] = update_data["nf"]
         if "logo_url" in update_data:
-            tenant_update["logo_url"] = update_data["logo_url"]
+            try:
+                tenant_update.update(await image_fields("logo", update_data["logo_url"]))
+            except ValueError:
+                raise HTTPException(status_code=400, detail=IMAGE_FORMAT_ERROR)
         if "vat_number" in update_data:
             tenant_update["vat_number"] = update_data["vat_number"]
         
         if tenant_update:
             await db.tenants.update_one({"id": tenant_id}, {"$set": tenant_update})
+            await bump_tenant(tenant_id)
         
         await log_audit(current_user["id"], "update_settings", "company", "company")
         
@@ -154,7 +160,9 @@ async def update_company_settings(
                 "bank_name": tenant.get("bank_name"),
                 "bank_account": tenant.get("bank_account"),
                 "logo_url": tenant.get("logo_url", ""),
+                "logo_variants": tenant.get("logo_variants"),
                 "stamp_url": tenant.get("stamp_url", ""),  # Vula digjitale
+                "stamp_variants": tenant.get("stamp_variants"),
                 "whatsapp_qr_url": tenant.get("whatsapp_qr_url", "")  # QR code WhatsApp
             }
     
@@ -182,6 +190,7 @@ async def update_company_settings(
         new_settings = add_tenant_id(new_settings, current_user)
         await db.settings.insert_one(new_settings)
     
+    await bump_tenant(current_user.get("tenant_id"))
     await log_audit(current_user["id"], "update_settings", "company", "company")
     
     updated = await db.settings.find_one(settings_query, {"_id": 0})
@@ -189,8 +198,8 @@ async def update_company_settings(
 
 
 # ============ POS SETTINGS ============
-@router.get("/pos")
-async def get_pos_settings(current_user: dict = Depends(get_current_user)):
+@router.get("/pos", dependencies=[Depends(conditional("pos_settings"))])
+async def get_pos_settings(current_user: dict = Depends(get_token_principal)):
     """Get POS settings"""
     tenant_filter = get_tenant_filter(current_user)
     settings_query = {"type": "pos", **tenant_filter} if tenant_filter else {"type": "pos"}
@@ -229,6 +238,7 @@ async def update_pos_settings(
         new_settings = add_tenant_id(new_settings, current_user)
         await db.settings.insert_one(new_settings)
     
+    await bump("pos_settings", current_user.get("tenant_id"))
     await log_audit(current_user["id"], "update_settings", "pos", "pos")
     updated = await db.settings.find_one(settings_query, {"_id": 0})
     return updated.get("data", {})
@@ -243,7 +253,7 @@ async def regenerate_whatsapp_qr_for_tenant(
     if not tenant_id:
         raise HTTPException(status_code=400, detail="Tenant ID nuk u gjet")
     
-    tenant = await db.tenants.find_one({"id": tenant_id})
+    tenant = await db.tenants.find_one({"id": tenant_id}, {"_id": 0, "phone": 1})
     if not tenant:
         raise HTTPException(status_code=404, detail="Firma nuk u gjet")
     
@@ -251,8 +261,9 @@ async def regenerate_whatsapp_qr_for_tenant(
     if not phone:
         raise HTTPException(status_code=400, detail="Numri i telefonit nuk është konfiguruar. Vendosni numrin e telefonit në cilësimet e kompanisë.")
     
-    qr_url = generate_whatsapp_qr(phone)
+    qr_url = await generate_whatsapp_qr(phone)
     await db.tenants.update_one({"id": tenant_id}, {"$set": {"whatsapp_qr_url": qr_url}})
+    await bump_tenant(tenant_id)
     
     await log_audit(current_user["id"], "regenerate_qr", "tenant", tenant_id)
     
@@ -276,13 +287,14 @@ async def create_warehouse(
     doc = add_tenant_id(doc, current_user)
     await db.warehouses.insert_one(doc)
     
+    await bump("warehouses", current_user.get("tenant_id"))
     await log_audit(current_user["id"], "create", "warehouse", new_warehouse.id)
     doc.pop('_id', None)
     return WarehouseResponse(**doc)
 
 
-@warehouses_router.get("", response_model=List[WarehouseResponse])
-async def get_warehouses(current_user: dict = Depends(get_current_user)):
+@warehouses_router.get("", response_model=List[WarehouseResponse], dependencies=[Depends(conditional("warehouses"))])
+async def get_warehouses(current_user: dict = Depends(get_token_principal)):
     """Get all warehouses"""
     tenant_filter = get_tenant_filter(current_user)
     warehouses = await db.warehouses.find(tenant_filter, {"_id": 0}).to_list(1000)
@@ -317,6 +329,7 @@ async def update_warehouse(
     if not warehouse:
         raise HTTPException(status_code=404, detail="Depoja nuk u gjet")
     
+    await bump("warehouses", current_user.get("tenant_id"))
     await log_audit(current_user["id"], "update", "warehouse", warehouse_id)
     return WarehouseResponse(**warehouse)
 
@@ -332,6 +345,7 @@ async def delete_warehouse(
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Depoja nuk u gjet")
     
+    await bump("warehouses", current_user.get("tenant_id"))
     await log_audit(current_user["id"], "delete", "warehouse", warehouse_id)
     return {"message": "Depoja u fshi me sukses"}
 
@@ -353,13 +367,14 @@ async def create_vat_rate(
     doc = add_tenant_id(doc, current_user)
     await db.vat_rates.insert_one(doc)
     
+    await bump("vat_rates", current_user.get("tenant_id"))
     await log_audit(current_user["id"], "create", "vat_rate", new_vat.id)
     doc.pop('_id', None)
     return VATRateResponse(**doc)
 
 
-@vat_router.get("", response_model=List[VATRateResponse])
-async def get_vat_rates(current_user: dict = Depends(get_current_user)):
+@vat_router.get("", response_model=List[VATRateResponse], dependencies=[Depends(conditional("vat_rates"))])
+async def get_vat_rates(current_user: dict = Depends(get_token_principal)):
     """Get all VAT rates"""
     tenant_filter = get_tenant_filter(current_user)
     vat_rates = await db.vat_rates.find(tenant_filter, {"_id": 0}).to_list(1000)
@@ -404,6 +419,7 @@ async def update_vat_rate(
     if not vat_rate:
         raise HTTPException(status_code=404, detail="Norma e TVSH nuk u gjet")
     
+    await bump("vat_rates", current_user.get("tenant_id"))
     await log_audit(current_user["id"], "update", "vat_rate", vat_id)
     return VATRateResponse(**vat_rate)
 
@@ -419,13 +435,14 @@ async def delete_vat_rate(
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Norma e TVSH nuk u gjet")
     
+    await bump("vat_rates", current_user.get("tenant_id"))
     await log_audit(current_user["id"], "delete", "vat_rate", vat_id)
     return {"message": "Norma e TVSH u fshi me sukses"}
 
 
 # ============ COMMENT TEMPLATES ============
-@templates_router.get("", response_model=List[CommentTemplateResponse])
-async def get_comment_templates(current_user: dict = Depends(get_current_user)):
+@templates_router.get("", response_model=List[CommentTemplateResponse], dependencies=[Depends(conditional("comment_templates"))])
+async def get_comment_templates(current_user: dict = Depends(get_token_principal)):
     """Get all comment templates"""
     tenant_filter = get_tenant_filter(current_user)
     templates = await db.comment_templates.find(tenant_filter, {"_id": 0}).sort("created_at", -1).to_list(100)
@@ -449,6 +466,7 @@ async def create_comment_template(
         await db.comment_templates.update_many(tenant_filter, {"$set": {"is_default": False}})
     
     await db.comment_templates.insert_one(template_data)
+    await bump("comment_templates", current_user.get("tenant_id"))
     await log_audit(current_user["id"], "create", "comment_template", template_data["id"])
     
     return CommentTemplateResponse(**template_data)
@@ -474,6 +492,7 @@ async def update_comment_template(
     await db.comment_templates.update_one({"id": template_id, **tenant_filter}, {"$set": update_data})
     
     updated = await db.comment_templates.find_one({"id": template_id, **tenant_filter}, {"_id": 0})
+    await bump("comment_templates", current_user.get("tenant_id"))
     await log_audit(current_user["id"], "update", "comment_template", template_id)
     
     return CommentTemplateResponse(**updated)
@@ -490,5 +509,6 @@ async def delete_comment_template(
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Template nuk u gjet")
     
+    await bump("comment_templates", current_user.get("tenant_id"))
     await log_audit(current_user["id"], "delete", "comment_template", template_id)
     return {"message": "Template u fshi me sukses"}
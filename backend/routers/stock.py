@@ -1,5 +1,5 @@
 """Stock management routes"""
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from typing import List, Optional
 from datetime import datetime, timezone
 
@@ -12,6 +12,10 @@ from auth import (
     get_current_user, require_role,
     get_tenant_filter, add_tenant_id, log_audit
 )
+from pagination import PageParams, paginate
+from catalog_index import adjust_catalog_stock
+from catalog_sync import next_change
+from idempotency import IdempotentRequest, idempotent
 
 router = APIRouter(prefix="/stock", tags=["Stock"])
 
@@ -19,21 +23,31 @@ router = APIRouter(prefix="/stock", tags=["Stock"])
 @router.post("/movements", response_model=StockMovementResponse)
 async def create_stock_movement(
     movement_data: StockMovementCreate,
-    current_user: dict = Depends(require_role([UserRole.ADMIN, UserRole.MANAGER]))
+    current_user: dict = Depends(require_role([UserRole.ADMIN, UserRole.MANAGER])),
+    idempotency: IdempotentRequest = Depends(idempotent)
 ):
-    """Create a stock movement"""
+    """Create a stock movement (retry-safe with an Idempotency-Key header)"""
     tenant_filter = get_tenant_filter(current_user)
-    product = await db.products.find_one({"id": movement_data.product_id, **tenant_filter}, {"_id": 0})
-    if not product:
-        raise HTTPException(status_code=404, detail="Produkti nuk u gjet")
     
-    current_stock = product.get("current_stock", 0)
+    # Atomic $inc - outgoing movements are guarded so stock can never go negative
+    product_query = {"id": movement_data.product_id, **tenant_filter}
     if movement_data.movement_type in [StockMovementType.IN]:
-        new_stock = current_stock + movement_data.quantity
+        delta = movement_data.quantity
     else:
-        new_stock = current_stock - movement_data.quantity
-        if new_stock < 0:
-            raise HTTPException(status_code=400, detail="Stoku nuk mund të jetë negativ")
+        delta = -movement_data.quantity
+        product_query["current_stock"] = {"$gte": movement_data.quantity}
+    
+    change = await next_change(tenant_filter.get("tenant_id"))
+    result = await db.products.update_one(
+        product_query,
+        {"$inc": {"current_stock": delta}, "$set": {"updated_at": datetime.now(timezone.utc).isoformat(), **change}}
+    )
+    if result.matched_count == 0:
+        exists = await db.products.find_one({"id": movement_data.product_id, **tenant_filter}, {"_id": 1})
+        if not exists:
+            raise HTTPException(status_code=404, detail="Produkti nuk u gjet")
+        raise HTTPException(status_code=400, detail="Stoku nuk mund të jetë negativ")
+    adjust_catalog_stock(current_user.get("tenant_id"), {movement_data.product_id: delta})
     
     movement = StockMovement(**movement_data.model_dump(), user_id=current_user["id"])
     mov_doc = movement.model_dump()
@@ -41,26 +55,23 @@ async def create_stock_movement(
     mov_doc = add_tenant_id(mov_doc, current_user)
     await db.stock_movements.insert_one(mov_doc)
     
-    await db.products.update_one(
-        {"id": movement_data.product_id, **tenant_filter},
-        {"$set": {"current_stock": new_stock, "updated_at": datetime.now(timezone.utc).isoformat()}}
-    )
-    
     await log_audit(current_user["id"], "stock_movement", "stock", movement.id, 
                     {"type": movement_data.movement_type, "qty": movement_data.quantity})
-    return StockMovementResponse(**mov_doc)
+    return await idempotency.save(StockMovementResponse(**mov_doc))
 
 
 @router.get("/movements", response_model=List[StockMovementResponse])
 async def get_stock_movements(
+    response: Response,
     product_id: Optional[str] = None,
     branch_id: Optional[str] = None,
     movement_type: Optional[StockMovementType] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    page: PageParams = Depends(),
     current_user: dict = Depends(get_current_user)
 ):
-    """Get stock movements"""
+    """Get stock movements - newest first, paginated by cursor"""
     query = get_tenant_filter(current_user)
     if product_id:
         query["product_id"] = product_id
@@ -73,5 +84,5 @@ async def get_stock_movements(
     if end_date:
         query.setdefault("created_at", {})["$lte"] = end_date
     
-    movements = await db.stock_movements.find(query, {"_id": 0}).sort("created_at", -1).to_list(10000)
+    movements = await paginate(db.stock_movements, query, page, response)
     return [StockMovementResponse(**m) for m in movements]
@@ -1,25 +1,36 @@
 """Tenant management routes (Super Admin only)"""
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from typing import List, Optional
 from datetime import datetime, timezone
 from pydantic import BaseModel
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import uuid
 import qrcode
 import io
-import base64
 
 from database import db
 from models import (
     TenantCreate, TenantUpdate, TenantResponse, TenantPublicInfo,
     TenantStatus, UserRole
 )
-from auth import hash_password, get_current_user, log_audit
+from auth import (
+    hash_password_async, get_current_user, log_audit,
+    invalidate_user, invalidate_tenant_users, pin_digest
+)
+from pagination import PageParams, paginate
+from catalog_index import catalog_edited
+from etag import conditional_public
+from assets import put_asset, externalize
+from images import image_fields, IMAGE_FIELDS, IMAGE_FORMAT_ERROR
+from tenant_directory import resolve, normalize_name, branding_scope, bump_tenant
+from tenant_stats import adjust_counts, reconcile
 
 router = APIRouter(prefix="/tenants", tags=["Tenants"])
 
 
-def generate_whatsapp_qr(phone: str) -> str:
-    """Generate QR code for WhatsApp link as base64 data URL"""
+async def generate_whatsapp_qr(phone: str) -> Optional[str]:
+    """Generate QR code for WhatsApp link - returns its asset URL"""
     if not phone:
         return None
     
@@ -47,64 +58,43 @@ def generate_whatsapp_qr(phone: str) -> str:
     # Create image
     img = qr.make_image(fill_color="black", back_color="white")
     
-    # Convert to base64
+    # Store the PNG in the asset store
     buffer = io.BytesIO()
     img.save(buffer, format='PNG')
-    buffer.seek(0)
-    
-    img_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-    return f"data:image/png;base64,{img_base64}"
+    return await put_asset(buffer.getvalue(), "image/png")
 
 
 # ============ PUBLIC ENDPOINT - No Auth Required ============
-@router.get("/by-subdomain/{subdomain}", response_model=TenantPublicInfo)
+# Browsers and CDNs may reuse branding for a minute, then revalidate with the ETag
+BRANDING_CACHE_CONTROL = "public, max-age=60, stale-while-revalidate=300"
+
+
+@router.get(
+    "/by-subdomain/{subdomain}", response_model=TenantPublicInfo,
+    dependencies=[Depends(conditional_public("tenant", branding_scope("subdomain"), BRANDING_CACHE_CONTROL))]
+)
 async def get_tenant_by_subdomain(subdomain: str):
     """Get tenant public info by subdomain - PUBLIC ENDPOINT for subdomain routing"""
-    # Clean subdomain - remove www if present
-    subdomain = subdomain.lower().strip()
-    if subdomain == 'www' or subdomain == 'app':
-        raise HTTPException(status_code=404, detail="Firma nuk u gjet")
-    
-    # Search by name (subdomain is the tenant name)
-    tenant = await db.tenants.find_one(
-        {"$or": [
-            {"name": subdomain},
-            {"name": {"$regex": f"^{subdomain}$", "$options": "i"}}
-        ]},
-        {"_id": 0}
-    )
-    
-    if not tenant:
+    status, info = await resolve(subdomain)
+    if info is None:
         raise HTTPException(status_code=404, detail="Firma nuk u gjet")
-    
-    if tenant.get("status") == "suspended":
+    if status == "suspended":
         raise HTTPException(status_code=403, detail="Firma është pezulluar")
-    
-    return TenantPublicInfo(
-        id=tenant["id"],
-        name=tenant["name"],
-        company_name=tenant.get("company_name") or tenant["name"],
-        logo_url=tenant.get("logo_url"),
-        stamp_url=tenant.get("stamp_url"),
-        whatsapp_qr_url=tenant.get("whatsapp_qr_url"),
-        primary_color=tenant.get("primary_color", "#00a79d"),
-        secondary_color=tenant.get("secondary_color", "#E0F7FA")
-    )
+    return info
 
 
 @router.get("", response_model=List[TenantResponse])
-async def get_all_tenants(current_user: dict = Depends(get_current_user)):
-    """Get all tenants - Super Admin only"""
+async def get_all_tenants(
+    response: Response,
+    page: PageParams = Depends(),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get tenants, newest first, paginated by cursor - Super Admin only"""
     if current_user.get("role") != UserRole.SUPER_ADMIN and current_user.get("role") != "super_admin":
         raise HTTPException(status_code=403, detail="Vetëm Super Admin mund të shohë të gjitha firmat")
     
-    tenants = await db.tenants.find({}, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    
-    for tenant in tenants:
-        tenant["users_count"] = await db.users.count_documents({"tenant_id": tenant["id"]})
-        tenant["sales_count"] = await db.sales.count_documents({"tenant_id": tenant["id"]})
-    
-    return tenants
+    # users_count / sales_count are kept on the tenant documents (tenant_stats)
+    return await paginate(db.tenants, {}, page, response)
 
 
 @router.post("", response_model=TenantResponse)
@@ -113,7 +103,8 @@ async def create_tenant(tenant: TenantCreate, current_user: dict = Depends(get_c
     if current_user.get("role") != UserRole.SUPER_ADMIN and current_user.get("role") != "super_admin":
         raise HTTPException(status_code=403, detail="Vetëm Super Admin mund të krijojë firma të reja")
     
-    existing = await db.tenants.find_one({"name": tenant.name.lower()})
+    name = normalize_name(tenant.name)
+    existing = await db.tenants.find_one({"name": name})
     if existing:
         raise HTTPException(status_code=400, detail="Emri i firmës ekziston tashmë")
     
@@ -122,17 +113,21 @@ async def create_tenant(tenant: TenantCreate, current_user: dict = Depends(get_c
         raise HTTPException(status_code=400, detail="Email-i ekziston tashmë")
     
     # Generate WhatsApp QR code if phone is provided
-    whatsapp_qr = generate_whatsapp_qr(tenant.phone) if tenant.phone else None
+    whatsapp_qr = await generate_whatsapp_qr(tenant.phone) if tenant.phone else None
+    try:
+        logo = await image_fields("logo", tenant.logo_url)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=IMAGE_FORMAT_ERROR)
     
     tenant_id = str(uuid.uuid4())
     tenant_data = {
         "id": tenant_id,
-        "name": tenant.name.lower(),
+        "name": name,
         "company_name": tenant.company_name,
         "email": tenant.email.lower(),
         "phone": tenant.phone,
         "address": tenant.address,
-        "logo_url": tenant.logo_url,
+        **logo,
         "whatsapp_qr_url": whatsapp_qr,  # Auto-generated QR code
         "primary_color": tenant.primary_color,
         "secondary_color": tenant.secondary_color,
@@ -140,15 +135,23 @@ async def create_tenant(tenant: TenantCreate, current_user: dict = Depends(get_c
         "status": TenantStatus.TRIAL,
         "subscription_expires": None,
         "created_at": datetime.now(timezone.utc).isoformat(),
-        "created_by": current_user["id"]
+        "created_by": current_user["id"],
+        "users_count": 1,
+        "sales_count": 0,
+        "rollups_built": True
     }
     
-    await db.tenants.insert_one(tenant_data)
+    try:
+        await db.tenants.insert_one(tenant_data)
+    except DuplicateKeyError:
+        # Lost a race with another create of the same name (unique name index)
+        raise HTTPException(status_code=400, detail="Emri i firmës ekziston tashmë")
+    await bump_tenant(tenant_id, name)
     
     admin_user = {
         "id": str(uuid.uuid4()),
         "username": tenant.admin_username,
-        "password_hash": hash_password(tenant.admin_password),
+        "password_hash": await hash_password_async(tenant.admin_password),
         "full_name": tenant.admin_full_name,
         "role": UserRole.ADMIN,
         "tenant_id": tenant_id,
@@ -159,7 +162,18 @@ async def create_tenant(tenant: TenantCreate, current_user: dict = Depends(get_c
     
     await log_audit(current_user["id"], "create", "tenant", tenant_id)
     
-    return TenantResponse(**tenant_data, users_count=1, sales_count=0)
+    return TenantResponse(**tenant_data)
+
+
+@router.post("/reconcile-counts")
+async def reconcile_tenant_counts(current_user: dict = Depends(get_current_user)):
+    """Recount users and sales of every tenant and fix drifted counters - Super Admin only"""
+    if current_user.get("role") != UserRole.SUPER_ADMIN and current_user.get("role") != "super_admin":
+        raise HTTPException(status_code=403, detail="Vetëm Super Admin ka akses")
+    
+    fixed = await reconcile()
+    await log_audit(current_user["id"], "reconcile_counts", "tenant", "all", {"fixed": fixed})
+    return {"message": "Numëruesit u rinumëruan", "fixed": fixed}
 
 
 @router.get("/{tenant_id}", response_model=TenantResponse)
@@ -171,10 +185,6 @@ async def get_tenant(tenant_id: str, current_user: dict = Depends(get_current_us
     tenant = await db.tenants.find_one({"id": tenant_id}, {"_id": 0})
     if not tenant:
         raise HTTPException(status_code=404, detail="Firma nuk u gjet")
-    
-    tenant["users_count"] = await db.users.count_documents({"tenant_id": tenant_id})
-    tenant["sales_count"] = await db.sales.count_documents({"tenant_id": tenant_id})
-    
     return TenantResponse(**tenant)
 
 
@@ -184,23 +194,36 @@ async def update_tenant(tenant_id: str, update: TenantUpdate, current_user: dict
     if current_user.get("role") != UserRole.SUPER_ADMIN and current_user.get("role") != "super_admin":
         raise HTTPException(status_code=403, detail="Vetëm Super Admin mund të modifikojë firmat")
     
-    existing = await db.tenants.find_one({"id": tenant_id})
-    if not existing:
-        raise HTTPException(status_code=404, detail="Firma nuk u gjet")
-    
     update_data = {k: v for k, v in update.model_dump().items() if v is not None}
     
     # Regenerate WhatsApp QR code if phone number changed
-    if "phone" in update_data:
-        new_qr = generate_whatsapp_qr(update_data["phone"])
-        update_data["whatsapp_qr_url"] = new_qr
-    
+    try:
+        if "phone" in update_data:
+            new_qr = await generate_whatsapp_qr(update_data["phone"])
+            update_data["whatsapp_qr_url"] = new_qr
+        elif "whatsapp_qr_url" in update_data:
+            update_data["whatsapp_qr_url"] = await externalize(update_data["whatsapp_qr_url"])
+        for field in IMAGE_FIELDS:
+            if f"{field}_url" in update_data:
+                update_data.update(await image_fields(field, update_data[f"{field}_url"]))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=IMAGE_FORMAT_ERROR)
+    
+    # One round trip: the update returns the tenant as written (counters included)
     if update_data:
-        await db.tenants.update_one({"id": tenant_id}, {"$set": update_data})
+        updated = await db.tenants.find_one_and_update(
+            {"id": tenant_id}, {"$set": update_data}, projection={"_id": 0}, return_document=ReturnDocument.AFTER
+        )
+    else:
+        updated = await db.tenants.find_one({"id": tenant_id}, {"_id": 0})
+    if not updated:
+        raise HTTPException(status_code=404, detail="Firma nuk u gjet")
     
-    updated = await db.tenants.find_one({"id": tenant_id}, {"_id": 0})
-    updated["users_count"] = await db.users.count_documents({"tenant_id": tenant_id})
-    updated["sales_count"] = await db.sales.count_documents({"tenant_id": tenant_id})
+    if update_data:
+        await bump_tenant(tenant_id, updated["name"])
+    if "status" in update_data:
+        # Cached principals carry the suspension check - drop them so it re-runs
+        invalidate_tenant_users(tenant_id)
     
     await log_audit(current_user["id"], "update", "tenant", tenant_id)
     
@@ -221,7 +244,7 @@ async def get_tenant_users(tenant_id: str, current_user: dict = Depends(get_curr
     if current_user.get("role") != UserRole.SUPER_ADMIN and current_user.get("role") != "super_admin":
         raise HTTPException(status_code=403, detail="Vetëm Super Admin ka akses")
     
-    users = await db.users.find({"tenant_id": tenant_id}, {"_id": 0, "password_hash": 0}).to_list(1000)
+    users = await db.users.find({"tenant_id": tenant_id}, {"_id": 0, "password_hash": 0, "pin_digest": 0}).to_list(1000)
     return users
 
 
@@ -243,7 +266,7 @@ async def create_tenant_user(tenant_id: str, user_data: TenantUserCreate, curren
     
     # Check PIN if provided
     if user_data.pin:
-        existing_pin = await db.users.find_one({"pin": user_data.pin, "tenant_id": tenant_id})
+        existing_pin = await db.users.find_one({"tenant_id": tenant_id, "pin_digest": pin_digest(tenant_id, user_data.pin)})
         if existing_pin:
             raise HTTPException(status_code=400, detail="PIN ekziston tashmë në këtë firmë")
     
@@ -253,20 +276,22 @@ async def create_tenant_user(tenant_id: str, user_data: TenantUserCreate, curren
     new_user = {
         "id": str(uuid.uuid4()),
         "username": user_data.username,
-        "password_hash": hash_password(user_data.password),
+        "password_hash": await hash_password_async(user_data.password),
         "full_name": user_data.full_name,
         "role": role,
         "tenant_id": tenant_id,
-        "pin": user_data.pin,
+        "pin_digest": pin_digest(tenant_id, user_data.pin) if user_data.pin else None,
         "is_active": True,
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     await db.users.insert_one(new_user)
+    await adjust_counts(tenant_id, users=1)
     
     await log_audit(current_user["id"], "create_tenant_user", "user", new_user["id"], {"tenant_id": tenant_id})
     
     # Return without password_hash and _id
     new_user.pop("password_hash", None)
+    new_user.pop("pin_digest", None)
     new_user.pop("_id", None)
     return {"message": "Përdoruesi u krijua me sukses", "user": new_user}
 
@@ -280,6 +305,8 @@ async def delete_tenant_user(tenant_id: str, user_id: str, current_user: dict =
     result = await db.users.delete_one({"id": user_id, "tenant_id": tenant_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Përdoruesi nuk u gjet")
+    await adjust_counts(tenant_id, users=-1)
+    invalidate_user(user_id)
     
     await log_audit(current_user["id"], "delete_tenant_user", "user", user_id, {"tenant_id": tenant_id})
     
@@ -299,34 +326,34 @@ async def delete_tenant(tenant_id: str, current_user: dict = Depends(get_current
     # Delete all tenant data
     await db.users.delete_many({"tenant_id": tenant_id})
     await db.products.delete_many({"tenant_id": tenant_id})
+    await db.product_tombstones.delete_many({"tenant_id": tenant_id})
+    await catalog_edited(tenant_id)
     await db.sales.delete_many({"tenant_id": tenant_id})
+    await db.sales_daily_rollups.delete_many({"tenant_id": tenant_id})
     await db.branches.delete_many({"tenant_id": tenant_id})
     await db.cash_drawers.delete_many({"tenant_id": tenant_id})
+    await db.drawer_transactions.delete_many({"tenant_id": tenant_id})
     await db.stock_movements.delete_many({"tenant_id": tenant_id})
     await db.settings.delete_many({"tenant_id": tenant_id})
     await db.tenants.delete_one({"id": tenant_id})
+    await bump_tenant(tenant_id, existing["name"])
+    invalidate_tenant_users(tenant_id)
     
     await log_audit(current_user["id"], "delete", "tenant", tenant_id)
     
     return {"message": "Firma dhe të gjitha të dhënat u fshinë me sukses"}
 
 
-@router.get("/public/{tenant_name}", response_model=TenantPublicInfo)
+@router.get(
+    "/public/{tenant_name}", response_model=TenantPublicInfo,
+    dependencies=[Depends(conditional_public("tenant", branding_scope("tenant_name"), BRANDING_CACHE_CONTROL))]
+)
 async def get_tenant_public_info(tenant_name: str):
     """Get public tenant info for branding (no auth required)"""
-    tenant = await db.tenants.find_one({"name": tenant_name.lower()}, {"_id": 0})
-    if not tenant:
+    _, info = await resolve(tenant_name)
+    if info is None:
         raise HTTPException(status_code=404, detail="Firma nuk u gjet")
-    
-    return TenantPublicInfo(
-        id=tenant["id"],
-        name=tenant["name"],
-        company_name=tenant["company_name"],
-        logo_url=tenant.get("logo_url"),
-        whatsapp_qr_url=tenant.get("whatsapp_qr_url"),
-        primary_color=tenant["primary_color"],
-        secondary_color=tenant["secondary_color"]
-    )
+    return info
 
 
 @router.post("/{tenant_id}/regenerate-qr")
@@ -335,7 +362,7 @@ async def regenerate_whatsapp_qr(tenant_id: str, current_user: dict = Depends(ge
     if current_user.get("role") != UserRole.SUPER_ADMIN and current_user.get("role") != "super_admin":
         raise HTTPException(status_code=403, detail="Vetëm Super Admin ka akses")
     
-    tenant = await db.tenants.find_one({"id": tenant_id})
+    tenant = await db.tenants.find_one({"id": tenant_id}, {"_id": 0, "phone": 1})
     if not tenant:
         raise HTTPException(status_code=404, detail="Firma nuk u gjet")
     
@@ -343,7 +370,8 @@ async def regenerate_whatsapp_qr(tenant_id: str, current_user: dict = Depends(ge
     if not phone:
         raise HTTPException(status_code=400, detail="Firma nuk ka numër telefoni")
     
-    qr_url = generate_whatsapp_qr(phone)
+    qr_url = await generate_whatsapp_qr(phone)
     await db.tenants.update_one({"id": tenant_id}, {"$set": {"whatsapp_qr_url": qr_url}})
+    await bump_tenant(tenant_id)
     
     return {"message": "QR code u ri-gjenerua me sukses", "whatsapp_qr_url": qr_url}
@@ -1,16 +1,18 @@
 """File upload routes for logos and stamps"""
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
+from fastapi import APIRouter, HTTPException, Depends
 from fastapi.responses import JSONResponse
 from typing import Optional
 from datetime import datetime, timezone
 import uuid
 import os
-import base64
 from pathlib import Path
 
 from database import db
 from models import UserRole
 from auth import get_current_user, get_tenant_filter
+from tenant_directory import bump_tenant
+from images import store_image
+from uploads import SpooledUpload, spooled_upload
 
 router = APIRouter(prefix="/upload", tags=["Upload"])
 
@@ -21,6 +23,9 @@ UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 ALLOWED_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.webp'}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 
+# Streams the `file` form part to a temp spool, rejecting anything over MAX_FILE_SIZE early
+image_upload = spooled_upload(MAX_FILE_SIZE)
+
 
 def get_file_extension(filename: str) -> str:
     """Get file extension from filename"""
@@ -32,140 +37,83 @@ def is_valid_image(filename: str) -> bool:
     return get_file_extension(filename) in ALLOWED_EXTENSIONS
 
 
-@router.post("/logo")
-async def upload_logo(
-    file: UploadFile = File(...),
-    current_user: dict = Depends(get_current_user)
-):
-    """Upload company logo - returns base64 data URL"""
-    if not is_valid_image(file.filename):
-        raise HTTPException(status_code=400, detail="Formati i file-it nuk lejohet. Përdorni: PNG, JPG, GIF, WEBP")
+async def upload_target_tenant(tenant_id: str, current_user: dict = Depends(get_current_user)) -> str:
+    """Tenant of a Super Admin upload - checked before the body is streamed"""
+    if current_user.get("role") != UserRole.SUPER_ADMIN and current_user.get("role") != "super_admin":
+        raise HTTPException(status_code=403, detail="Vetëm Super Admin mund të ngarkojë logo/vulën për firma të tjera")
     
-    contents = await file.read()
-    if len(contents) > MAX_FILE_SIZE:
-        raise HTTPException(status_code=400, detail="File-i është shumë i madh. Maksimumi: 5MB")
+    tenant = await db.tenants.find_one({"id": tenant_id}, {"_id": 1})
+    if not tenant:
+        raise HTTPException(status_code=404, detail="Firma nuk u gjet")
+    return tenant_id
+
+
+async def store_upload(upload: SpooledUpload, field: str, tenant_id: Optional[str]) -> dict:
+    """Store an uploaded logo/stamp and set it on the tenant (if any) - {url, variants}"""
+    # Size was enforced while streaming - oversized bodies never get here
+    if not is_valid_image(upload.filename):
+        raise HTTPException(status_code=400, detail="Formati i file-it nuk lejohet. Përdorni: PNG, JPG, GIF, WEBP")
     
-    # Convert to base64 data URL
-    ext = get_file_extension(file.filename).replace('.', '')
+    # Decode once into receipt/invoice/thumbnail variants, store everything by content hash
+    ext = get_file_extension(upload.filename).replace('.', '')
     if ext == 'jpg':
         ext = 'jpeg'
-    base64_data = base64.b64encode(contents).decode('utf-8')
-    data_url = f"data:image/{ext};base64,{base64_data}"
+    try:
+        asset_url, variants = await store_image(upload.read(), f"image/{ext}", upload.sha256)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="File-i nuk është imazh i vlefshëm")
     
-    # Update tenant's logo_url if user is tenant admin
-    tenant_id = current_user.get("tenant_id")
     if tenant_id:
         await db.tenants.update_one(
             {"id": tenant_id},
-            {"$set": {"logo_url": data_url, "updated_at": datetime.now(timezone.utc).isoformat()}}
+            {"$set": {f"{field}_url": asset_url, f"{field}_variants": variants, "updated_at": datetime.now(timezone.utc).isoformat()}}
         )
+        await bump_tenant(tenant_id)
     
-    return {"url": data_url, "message": "Logo u ngarkua me sukses"}
+    return {"url": asset_url, "variants": variants}
+
+
+@router.post("/logo")
+async def upload_logo(
+    current_user: dict = Depends(get_current_user),
+    upload: SpooledUpload = Depends(image_upload)
+):
+    """Upload company logo - returns the asset URL"""
+    # Update tenant's logo_url if user is tenant admin
+    stored = await store_upload(upload, "logo", current_user.get("tenant_id"))
+    return {**stored, "message": "Logo u ngarkua me sukses"}
 
 
 @router.post("/stamp")
 async def upload_stamp(
-    file: UploadFile = File(...),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    upload: SpooledUpload = Depends(image_upload)
 ):
-    """Upload company digital stamp (vula digjitale) - returns base64 data URL"""
-    if not is_valid_image(file.filename):
-        raise HTTPException(status_code=400, detail="Formati i file-it nuk lejohet. Përdorni: PNG, JPG, GIF, WEBP")
-    
-    contents = await file.read()
-    if len(contents) > MAX_FILE_SIZE:
-        raise HTTPException(status_code=400, detail="File-i është shumë i madh. Maksimumi: 5MB")
-    
-    # Convert to base64 data URL
-    ext = get_file_extension(file.filename).replace('.', '')
-    if ext == 'jpg':
-        ext = 'jpeg'
-    base64_data = base64.b64encode(contents).decode('utf-8')
-    data_url = f"data:image/{ext};base64,{base64_data}"
-    
+    """Upload company digital stamp (vula digjitale) - returns the asset URL"""
     # Update tenant's stamp_url if user is tenant admin
-    tenant_id = current_user.get("tenant_id")
-    if tenant_id:
-        await db.tenants.update_one(
-            {"id": tenant_id},
-            {"$set": {"stamp_url": data_url, "updated_at": datetime.now(timezone.utc).isoformat()}}
-        )
-    
-    return {"url": data_url, "message": "Vula digjitale u ngarkua me sukses"}
+    stored = await store_upload(upload, "stamp", current_user.get("tenant_id"))
+    return {**stored, "message": "Vula digjitale u ngarkua me sukses"}
 
 
+# The role and tenant checks are declared before image_upload, so they run before the body is read
 @router.post("/tenant/{tenant_id}/logo")
 async def upload_tenant_logo(
-    tenant_id: str,
-    file: UploadFile = File(...),
-    current_user: dict = Depends(get_current_user)
+    tenant_id: str = Depends(upload_target_tenant),
+    upload: SpooledUpload = Depends(image_upload)
 ):
     """Upload logo for a specific tenant - Super Admin only"""
-    if current_user.get("role") != UserRole.SUPER_ADMIN and current_user.get("role") != "super_admin":
-        raise HTTPException(status_code=403, detail="Vetëm Super Admin mund të ngarkojë logo për firma të tjera")
-    
-    if not is_valid_image(file.filename):
-        raise HTTPException(status_code=400, detail="Formati i file-it nuk lejohet. Përdorni: PNG, JPG, GIF, WEBP")
-    
-    contents = await file.read()
-    if len(contents) > MAX_FILE_SIZE:
-        raise HTTPException(status_code=400, detail="File-i është shumë i madh. Maksimumi: 5MB")
-    
-    # Verify tenant exists
-    tenant = await db.tenants.find_one({"id": tenant_id})
-    if not tenant:
-        raise HTTPException(status_code=404, detail="Firma nuk u gjet")
-    
-    # Convert to base64 data URL
-    ext = get_file_extension(file.filename).replace('.', '')
-    if ext == 'jpg':
-        ext = 'jpeg'
-    base64_data = base64.b64encode(contents).decode('utf-8')
-    data_url = f"data:image/{ext};base64,{base64_data}"
-    
-    await db.tenants.update_one(
-        {"id": tenant_id},
-        {"$set": {"logo_url": data_url, "updated_at": datetime.now(timezone.utc).isoformat()}}
-    )
-    
-    return {"url": data_url, "message": "Logo u ngarkua me sukses"}
+    stored = await store_upload(upload, "logo", tenant_id)
+    return {**stored, "message": "Logo u ngarkua me sukses"}
 
 
 @router.post("/tenant/{tenant_id}/stamp")
 async def upload_tenant_stamp(
-    tenant_id: str,
-    file: UploadFile = File(...),
-    current_user: dict = Depends(get_current_user)
+    tenant_id: str = Depends(upload_target_tenant),
+    upload: SpooledUpload = Depends(image_upload)
 ):
     """Upload digital stamp for a specific tenant - Super Admin only"""
-    if current_user.get("role") != UserRole.SUPER_ADMIN and current_user.get("role") != "super_admin":
-        raise HTTPException(status_code=403, detail="Vetëm Super Admin mund të ngarkojë vulën për firma të tjera")
-    
-    if not is_valid_image(file.filename):
-        raise HTTPException(status_code=400, detail="Formati i file-it nuk lejohet. Përdorni: PNG, JPG, GIF, WEBP")
-    
-    contents = await file.read()
-    if len(contents) > MAX_FILE_SIZE:
-        raise HTTPException(status_code=400, detail="File-i është shumë i madh. Maksimumi: 5MB")
-    
-    # Verify tenant exists
-    tenant = await db.tenants.find_one({"id": tenant_id})
-    if not tenant:
-        raise HTTPException(status_code=404, detail="Firma nuk u gjet")
-    
-    # Convert to base64 data URL
-    ext = get_file_extension(file.filename).replace('.', '')
-    if ext == 'jpg':
-        ext = 'jpeg'
-    base64_data = base64.b64encode(contents).decode('utf-8')
-    data_url = f"data:image/{ext};base64,{base64_data}"
-    
-    await db.tenants.update_one(
-        {"id": tenant_id},
-        {"$set": {"stamp_url": data_url, "updated_at": datetime.now(timezone.utc).isoformat()}}
-    )
-    
-    return {"url": data_url, "message": "Vula digjitale u ngarkua me sukses"}
+    stored = await store_upload(upload, "stamp", tenant_id)
+    return {**stored, "message": "Vula digjitale u ngarkua me sukses"}
 
 
 @router.delete("/tenant/{tenant_id}/stamp")
@@ -179,13 +127,14 @@ async def delete_tenant_stamp(
         if current_user.get("tenant_id") != tenant_id:
             raise HTTPException(status_code=403, detail="Nuk keni leje për këtë veprim")
     
-    tenant = await db.tenants.find_one({"id": tenant_id})
+    tenant = await db.tenants.find_one({"id": tenant_id}, {"_id": 1})
     if not tenant:
         raise HTTPException(status_code=404, detail="Firma nuk u gjet")
     
     await db.tenants.update_one(
         {"id": tenant_id},
-        {"$set": {"stamp_url": None, "updated_at": datetime.now(timezone.utc).isoformat()}}
+        {"$set": {"stamp_url": None, "stamp_variants": None, "updated_at": datetime.now(timezone.utc).isoformat()}}
     )
+    await bump_tenant(tenant_id)
     
     return {"message": "Vula digjitale u fshi me sukses"}
@@ -1,14 +1,16 @@
 """User management routes"""
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from typing import List
 from datetime import datetime, timezone
 
 from database import db
 from models import UserCreate, UserUpdate, UserResponse, User, UserRole
 from auth import (
-    hash_password, get_current_user, require_role,
-    get_tenant_filter, add_tenant_id, log_audit
+    hash_password_async, get_current_user, require_role,
+    get_tenant_filter, add_tenant_id, log_audit, invalidate_user, pin_digest
 )
+from pagination import PageParams, paginate
+from tenant_stats import adjust_counts
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -22,18 +24,21 @@ async def create_user(user_data: UserCreate, current_user: dict = Depends(requir
     if existing:
         raise HTTPException(status_code=400, detail="Username ekziston tashmë")
     
+    user = User(**user_data.model_dump(exclude={"password", "pin"}))
+    doc = user.model_dump(exclude={"pin"})
+    doc = add_tenant_id(doc, current_user)
+    
     if user_data.pin:
-        existing_pin = await db.users.find_one({"pin": user_data.pin, **tenant_filter})
+        doc['pin_digest'] = pin_digest(doc.get("tenant_id"), user_data.pin)
+        existing_pin = await db.users.find_one({"tenant_id": doc.get("tenant_id"), "pin_digest": doc['pin_digest']})
         if existing_pin:
             raise HTTPException(status_code=400, detail="PIN ekziston tashmë")
     
-    user = User(**user_data.model_dump(exclude={"password"}))
-    doc = user.model_dump()
-    doc['password_hash'] = hash_password(user_data.password)
+    doc['password_hash'] = await hash_password_async(user_data.password)
     doc['created_at'] = doc['created_at'].isoformat()
-    doc = add_tenant_id(doc, current_user)
     
     await db.users.insert_one(doc)
+    await adjust_counts(doc.get("tenant_id"), users=1)
     await log_audit(current_user["id"], "create_user", "user", user.id)
     
     return UserResponse(**doc)
@@ -41,18 +46,20 @@ async def create_user(user_data: UserCreate, current_user: dict = Depends(requir
 
 @router.get("", response_model=List[UserResponse])
 async def get_users(
+    response: Response,
     role: UserRole = None,
     branch_id: str = None,
+    page: PageParams = Depends(),
     current_user: dict = Depends(require_role([UserRole.ADMIN, UserRole.MANAGER]))
 ):
-    """Get all users"""
+    """Get users - newest first, paginated by cursor"""
     query = get_tenant_filter(current_user)
     if role:
         query["role"] = role.value
     if branch_id:
         query["branch_id"] = branch_id
     
-    users = await db.users.find(query, {"_id": 0, "password_hash": 0}).to_list(1000)
+    users = await paginate(db.users, query, page, response, {"_id": 0, "password_hash": 0})
     return [UserResponse(**u) for u in users]
 
 
@@ -77,15 +84,28 @@ async def update_user(
     update_dict = {k: v for k, v in user_data.model_dump().items() if v is not None}
     
     if "password" in update_dict:
-        update_dict["password_hash"] = hash_password(update_dict.pop("password"))
+        update_dict["password_hash"] = await hash_password_async(update_dict.pop("password"))
     
     if "pin" in update_dict:
-        existing_pin = await db.users.find_one({"pin": update_dict["pin"], "id": {"$ne": user_id}, **tenant_filter})
-        if existing_pin:
-            raise HTTPException(status_code=400, detail="PIN ekziston tashmë")
+        pin = update_dict.pop("pin")
+        target = await db.users.find_one({"id": user_id, **tenant_filter}, {"_id": 0, "tenant_id": 1})
+        if not target:
+            raise HTTPException(status_code=404, detail="Përdoruesi nuk u gjet")
+        if pin:
+            update_dict["pin_digest"] = pin_digest(target.get("tenant_id"), pin)
+            existing_pin = await db.users.find_one({
+                "tenant_id": target.get("tenant_id"),
+                "pin_digest": update_dict["pin_digest"],
+                "id": {"$ne": user_id}
+            })
+            if existing_pin:
+                raise HTTPException(status_code=400, detail="PIN ekziston tashmë")
+        else:
+            update_dict["pin_digest"] = None
     
     if update_dict:
         await db.users.update_one({"id": user_id, **tenant_filter}, {"$set": update_dict})
+        invalidate_user(user_id)
     
     user = await db.users.find_one({"id": user_id, **tenant_filter}, {"_id": 0, "password_hash": 0})
     if not user:
@@ -99,8 +119,10 @@ async def update_user(
 async def delete_user(user_id: str, current_user: dict = Depends(require_role([UserRole.ADMIN]))):
     """Delete a user"""
     tenant_filter = get_tenant_filter(current_user)
-    result = await db.users.delete_one({"id": user_id, **tenant_filter})
-    if result.deleted_count == 0:
+    user = await db.users.find_one_and_delete({"id": user_id, **tenant_filter}, {"_id": 0, "tenant_id": 1})
+    if not user:
         raise HTTPException(status_code=404, detail="Përdoruesi nuk u gjet")
+    await adjust_counts(user.get("tenant_id"), users=-1)
+    invalidate_user(user_id)
     await log_audit(current_user["id"], "delete_user", "user", user_id)
     return {"message": "Përdoruesi u fshi me sukses"}
@@ -0,0 +1,179 @@
+"""Batched sale engine - prices and books a whole cart in a fixed number of round trips"""
+from fastapi import HTTPException
+from typing import Dict, List, Tuple
+import asyncio
+from datetime import datetime, timezone
+from pymongo import UpdateOne
+
+from database import db
+from models import SaleItem, SaleItemCreate, StockMovement, StockMovementType
+from auth import add_tenant_id
+from catalog_index import adjust_catalog_stock
+from catalog_sync import next_changes
+
+
+async def fetch_products(product_ids: List[str], tenant_filter: dict) -> Dict[str, dict]:
+    """Load every product referenced by a cart with a single $in query"""
+    unique_ids = list(dict.fromkeys(product_ids))
+    if not unique_ids:
+        return {}
+    products = await db.products.find(
+        {"id": {"$in": unique_ids}, **tenant_filter}, {"_id": 0}
+    ).to_list(len(unique_ids))
+    return {p["id"]: p for p in products}
+
+
+def price_items(items_data: List[SaleItemCreate], product_map: Dict[str, dict]) -> Tuple[List[SaleItem], float, float, float]:
+    """Compute line totals for a cart - returns (items, subtotal, total_discount, total_vat)"""
+    items = []
+    subtotal = 0
+    total_discount = 0
+    total_vat = 0
+
+    for item_data in items_data:
+        product = product_map.get(item_data.product_id)
+        if not product:
+            raise HTTPException(status_code=404, detail=f"Produkti {item_data.product_id} nuk u gjet")
+
+        item_subtotal = item_data.quantity * item_data.unit_price
+        item_discount = item_subtotal * (item_data.discount_percent / 100)
+        item_after_discount = item_subtotal - item_discount
+        item_vat = item_after_discount * (item_data.vat_percent / 100)
+        item_total = item_after_discount + item_vat
+
+        items.append(SaleItem(
+            product_id=item_data.product_id,
+            product_name=product.get("name"),
+            quantity=item_data.quantity,
+            unit_price=item_data.unit_price,
+            discount_percent=item_data.discount_percent,
+            vat_percent=item_data.vat_percent,
+            subtotal=item_subtotal,
+            vat_amount=item_vat,
+            total=item_total
+        ))
+
+        subtotal += item_subtotal
+        total_discount += item_discount
+        total_vat += item_vat
+
+    return items, subtotal, total_discount, total_vat
+
+
+def sum_quantities(items: List[SaleItem]) -> Dict[str, float]:
+    """Collapse cart lines into one quantity per product"""
+    quantities = {}
+    for item in items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    return quantities
+
+
+async def allow_negative_stock(tenant_filter: dict) -> bool:
+    """Read POSSettings.lejo_shitjen_me_minus for the tenant (defaults to allowed)"""
+    settings_query = {"type": "pos", **tenant_filter} if tenant_filter else {"type": "pos"}
+    settings = await db.settings.find_one(settings_query, {"_id": 0, "data.lejo_shitjen_me_minus": 1})
+    if not settings:
+        return True
+    return settings.get("data", {}).get("lejo_shitjen_me_minus", True)
+
+
+async def decrement_stock(quantities: Dict[str, float], tenant_filter: dict, allow_negative: bool = True):
+    """Atomically decrement stock with $inc - no read-modify-write, safe under concurrent sales
+
+    When negative stock is not allowed every update is guarded with
+    `current_stock >= qty`; if any product is short the decrements that did
+    apply are reverted and a 400 is raised. Each product gets a fresh change
+    stamp so synced terminals pick up the new stock - allocated only once the
+    decrements are in, so a refused sale does not move the catalog version.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    product_ids = list(quantities)
+    tenant_id = tenant_filter.get("tenant_id")
+
+    if allow_negative:
+        stamps = dict(zip(product_ids, await next_changes(tenant_id, len(product_ids))))
+        operations = [
+            UpdateOne(
+                {"id": product_id, **tenant_filter},
+                {"$inc": {"current_stock": -quantity}, "$set": {"updated_at": now, **stamps[product_id]}}
+            )
+            for product_id, quantity in quantities.items()
+        ]
+        await db.products.bulk_write(operations, ordered=False)
+        return
+
+    # Guarded updates run concurrently so the cart still costs one round trip of latency
+    results = await asyncio.gather(*[
+        db.products.update_one(
+            {"id": product_id, "current_stock": {"$gte": quantities[product_id]}, **tenant_filter},
+            {"$inc": {"current_stock": -quantities[product_id]}, "$set": {"updated_at": now}}
+        )
+        for product_id in product_ids
+    ])
+    short = [pid for pid, result in zip(product_ids, results) if result.matched_count == 0]
+    if not short:
+        stamps = await next_changes(tenant_id, len(product_ids))
+        await db.products.bulk_write([
+            UpdateOne({"id": product_id, **tenant_filter}, {"$set": stamp})
+            for product_id, stamp in zip(product_ids, stamps)
+        ], ordered=False)
+        return
+
+    applied = [pid for pid, result in zip(product_ids, results) if result.matched_count == 1]
+    if applied:
+        await db.products.bulk_write([
+            UpdateOne({"id": pid, **tenant_filter}, {"$inc": {"current_stock": quantities[pid]}})
+            for pid in applied
+        ], ordered=False)
+    raise HTTPException(status_code=400, detail=f"Stoku i pamjaftueshëm për produktin {short[0]}")
+
+
+def _movement_docs(items: List[SaleItem], current_user: dict, movement_type: StockMovementType, reason: str) -> List[dict]:
+    docs = []
+    for item in items:
+        movement = StockMovement(
+            product_id=item.product_id,
+            quantity=item.quantity,
+            movement_type=movement_type,
+            reason=reason,
+            user_id=current_user["id"],
+            branch_id=current_user.get("branch_id")
+        )
+        mov_doc = movement.model_dump()
+        mov_doc['created_at'] = mov_doc['created_at'].isoformat()
+        docs.append(add_tenant_id(mov_doc, current_user))
+    return docs
+
+
+async def book_stock(items: List[SaleItem], current_user: dict, tenant_filter: dict, allow_negative: bool = True):
+    """Apply every stock decrement atomically and record movements with one insert_many"""
+    if not items:
+        return
+
+    quantities = sum_quantities(items)
+    await decrement_stock(quantities, tenant_filter, allow_negative)
+    adjust_catalog_stock(current_user.get("tenant_id"), {pid: -qty for pid, qty in quantities.items()})
+    await db.stock_movements.insert_many(
+        _movement_docs(items, current_user, StockMovementType.SALE, "Shitje"), ordered=False
+    )
+
+
+async def release_stock(items: List[SaleItem], current_user: dict, tenant_filter: dict):
+    """Give back stock booked for a sale that was never stored - the inverse of book_stock"""
+    if not items:
+        return
+
+    quantities = sum_quantities(items)
+    now = datetime.now(timezone.utc).isoformat()
+    stamps = await next_changes(tenant_filter.get("tenant_id"), len(quantities))
+    await db.products.bulk_write([
+        UpdateOne(
+            {"id": product_id, **tenant_filter},
+            {"$inc": {"current_stock": quantity}, "$set": {"updated_at": now, **stamp}}
+        )
+        for (product_id, quantity), stamp in zip(quantities.items(), stamps)
+    ], ordered=False)
+    adjust_catalog_stock(current_user.get("tenant_id"), quantities)
+    await db.stock_movements.insert_many(
+        _movement_docs(items, current_user, StockMovementType.IN, "Kthim - shitja nuk u ruajt"), ordered=False
+    )
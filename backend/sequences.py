@@ -0,0 +1,143 @@
+"""Atomic sequence service backed by the `counters` collection
+
+Every sequence is one document `{"_id": key, "value": n}` bumped with
+find_one_and_update + $inc, so allocation is a single O(1) round trip and two
+processes can never receive the same value.
+
+Block reservation: a process may reserve `block_size` values in one round trip
+and hand them out locally. Values stay unique across processes, but:
+  - values are no longer strictly chronological across workers
+    (worker A may hand out 7 after worker B handed out 12);
+  - values reserved by a process that exits before using them are lost,
+    leaving gaps in the sequence.
+With block_size=1 (the default for receipts) sequences are gap-free unless a
+sale fails after its number was allocated.
+"""
+import asyncio
+import os
+from typing import Dict, List, Tuple
+from datetime import datetime, timezone
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from database import db
+
+RECEIPT_BLOCK_SIZE = int(os.environ.get('RECEIPT_BLOCK_SIZE', 1))
+
+
+async def allocate(key: str, count: int = 1) -> int:
+    """Atomically reserve `count` values and return the last one"""
+    counter = await db.counters.find_one_and_update(
+        {"_id": key},
+        {"$inc": {"value": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter["value"]
+
+
+async def raise_to(key: str, value: int):
+    """Move a counter up to at least `value` ($max never lowers it, so concurrent allocations are safe)"""
+    try:
+        await db.counters.update_one({"_id": key}, {"$max": {"value": value}}, upsert=True)
+    except DuplicateKeyError:
+        # Another process created it concurrently - apply the $max to its document
+        await db.counters.update_one({"_id": key}, {"$max": {"value": value}})
+
+
+class BlockAllocator:
+    """Hands out sequence values from blocks reserved per process"""
+
+    def __init__(self, block_size: int = 1):
+        self.block_size = max(1, block_size)
+        self._blocks: Dict[str, Tuple[int, int]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _lock(self, key: str) -> asyncio.Lock:
+        if key not in self._locks:
+            self._locks[key] = asyncio.Lock()
+        return self._locks[key]
+
+    async def next(self, key: str) -> int:
+        """Return the next value for `key`, reserving a new block when needed"""
+        async with self._lock(key):
+            next_value, last_value = self._blocks.get(key, (1, 0))
+            if next_value > last_value:
+                last_value = await allocate(key, self.block_size)
+                next_value = last_value - self.block_size + 1
+            self._blocks[key] = (next_value + 1, last_value)
+            return next_value
+
+    def forget(self, key_prefix: str):
+        """Drop reserved blocks whose key starts with `key_prefix`"""
+        for key in [k for k in self._blocks if k.startswith(key_prefix)]:
+            del self._blocks[key]
+            self._locks.pop(key, None)
+
+
+receipt_allocator = BlockAllocator(RECEIPT_BLOCK_SIZE)
+# Day each tenant's receipt blocks belong to - older days' blocks are dropped on rollover
+_receipt_days: Dict[str, str] = {}
+
+
+def receipt_prefix(day: str = None) -> str:
+    """Receipt number prefix - RCP-YYYYMMDD; all branches of a tenant share the daily sequence"""
+    day = day or datetime.now(timezone.utc).strftime("%Y%m%d")
+    return f"RCP-{day}"
+
+
+def receipt_key(tenant_id: str = None, day: str = None) -> str:
+    day = day or datetime.now(timezone.utc).strftime("%Y%m%d")
+    return f"receipt:{tenant_id or '-'}:{day}"
+
+
+def _today_receipt_key(tenant_id: str = None) -> Tuple[str, str]:
+    """Counter key and receipt prefix for the tenant's sequence today"""
+    day = datetime.now(timezone.utc).strftime("%Y%m%d")
+    scope = f"receipt:{tenant_id or '-'}:"
+    if _receipt_days.get(scope) != day:
+        receipt_allocator.forget(scope)
+        _receipt_days[scope] = day
+    return receipt_key(tenant_id, day), receipt_prefix(day)
+
+
+async def seed_receipt_counters() -> int:
+    """Continue today's sequences after receipts numbered before the counters existed (run at startup)
+
+    Receipts of later days all come from the counters, so this runs once per
+    process start and never on a day rollover. Returns the number of counters seeded.
+    """
+    day = datetime.now(timezone.utc).strftime("%Y%m%d")
+    tenant_ids = await db.tenants.distinct("id")
+    pipeline = [
+        # tenant_id $in keeps the scan on the tenant_receipt_number index
+        {"$match": {
+            "tenant_id": {"$in": [None, *tenant_ids]},
+            "receipt_number": {"$regex": f"^{receipt_prefix(day)}-\\d+$"}
+        }},
+        {"$group": {
+            "_id": "$tenant_id",
+            "last": {"$max": {"$toInt": {"$arrayElemAt": [{"$split": ["$receipt_number", "-"]}, 2]}}}
+        }}
+    ]
+    seeded = 0
+    async for row in db.sales.aggregate(pipeline):
+        await raise_to(receipt_key(row["_id"], day), row["last"])
+        seeded += 1
+    return seeded
+
+
+async def next_receipt_number(tenant_id: str = None) -> str:
+    """Allocate the next receipt number for a tenant/day"""
+    key, prefix = _today_receipt_key(tenant_id)
+    number = await receipt_allocator.next(key)
+    return f"{prefix}-{str(number).zfill(4)}"
+
+
+async def next_receipt_numbers(count: int, tenant_id: str = None) -> List[str]:
+    """Allocate `count` consecutive receipt numbers in one round trip (batch ingestion)"""
+    if count <= 0:
+        return []
+    key, prefix = _today_receipt_key(tenant_id)
+    last = await allocate(key, count)
+    return [f"{prefix}-{str(number).zfill(4)}" for number in range(last - count + 1, last + 1)]
@@ -2,18 +2,34 @@
 MobilshopurimiPOS - Multi-Tenant SaaS POS System
 Main FastAPI Application Entry Point
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends
 from starlette.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import logging
+import time
 
 # Import routers
-from routers import auth, tenants, users, branches, products, stock, cashier, sales, reports, upload, registration
+from routers import auth, tenants, users, branches, products, stock, cashier, sales, reports, upload, registration, assets
 from routers.settings import router as settings_router, warehouses_router, vat_router, templates_router
 from routers.admin import router as admin_router, audit_router, categories_router, init_router
 
 from database import db
-from auth import hash_password
+from auth import hash_password_async, backfill_pin_digests, require_role, user_cache, password_pool, password_pool_metrics
+from models import UserRole
+from indexes import ensure_indexes
+from drawers import migrate_embedded_transactions
+from backups import fail_interrupted_restores
+from tenant_stats import backfill_counts
+from rollups import backfill_rollups
+from sequences import seed_receipt_counters
+from assets import migrate_inline_assets
+from images import image_pool, image_metrics, start_backfill as start_image_backfill
+from tenant_directory import directory, directory_watch, normalize_tenant_names
+from pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+from catalog_index import catalogs
+from etag import etag_metrics
+from audit_writer import audit_writer
+from idempotency import IdempotentReplay, REPLAYED_HEADER, replay_handler, idempotency_metrics
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -25,7 +41,7 @@ async def init_super_admin():
     try:
         new_username = "urimi1806"
         new_password = "1806"
-        password_hash = hash_password(new_password)
+        password_hash = await hash_password_async(new_password)
         
         existing = await db.users.find_one({"role": "super_admin"})
         
@@ -65,10 +81,26 @@ async def lifespan(app: FastAPI):
     """Lifespan context manager for startup/shutdown events"""
     # Startup
     logger.info("Starting MobilshopurimiPOS API...")
+    await backfill_pin_digests()
+    await normalize_tenant_names()
+    await ensure_indexes()
+    await migrate_embedded_transactions()
+    await migrate_inline_assets()
+    start_image_backfill()
+    await fail_interrupted_restores()
+    await backfill_counts()
+    await backfill_rollups()
+    await seed_receipt_counters()
     await init_super_admin()
+    await audit_writer.start()
+    await directory_watch.start()
     yield
     # Shutdown
     logger.info("Shutting down MobilshopurimiPOS API...")
+    await directory_watch.stop()
+    await audit_writer.stop()
+    password_pool.shutdown(wait=False)
+    image_pool.shutdown(wait=False, cancel_futures=True)
 
 
 # Create the main app
@@ -78,6 +110,7 @@ app = FastAPI(
     version="2.0.0",
     lifespan=lifespan
 )
+app.add_exception_handler(IdempotentReplay, replay_handler)
 
 # CORS middleware
 app.add_middleware(
@@ -86,6 +119,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, REPLAYED_HEADER],
 )
 
 # Register routers with /api prefix
@@ -108,6 +142,7 @@ app.include_router(categories_router, prefix="/api")
 app.include_router(init_router, prefix="/api")
 app.include_router(upload.router, prefix="/api")
 app.include_router(registration.router, prefix="/api")
+app.include_router(assets.router, prefix="/api")
 
 
 @app.get("/")
@@ -131,3 +166,19 @@ async def health():
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
+
+
+@app.get("/api/metrics", dependencies=[Depends(require_role([UserRole.SUPER_ADMIN]))])
+async def metrics():
+    """In-process cache and worker metrics for this API worker - Super Admin only"""
+    return {
+        "user_cache": user_cache.stats(),
+        "password_pool": password_pool_metrics(),
+        "images": image_metrics(),
+        "catalog_index": catalogs.stats(),
+        "etag": etag_metrics(),
+        "tenant_directory": directory.stats(),
+        "idempotency": idempotency_metrics(),
+        "audit_writer": audit_writer.metrics(),
+        "process": {"cpu_seconds": round(time.process_time(), 3)}
+    }
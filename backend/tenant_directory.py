@@ -0,0 +1,153 @@
+"""Subdomain -> tenant branding resolution
+
+Every page load of a tenant site resolves its subdomain. Tenant names are
+stored normalized (lowercase, trimmed) under a unique index, so the lookup is
+an exact indexed match, and the resulting `TenantPublicInfo` is cached per
+worker for TENANT_DIRECTORY_TTL seconds. Unknown subdomains are cached too,
+so probing random names does not reach MongoDB either.
+
+Lookups never read MongoDB while an entry is cached. `bump_tenant` runs after
+every write to a tenant: it drops the entry in the writing worker and bumps one
+shared counter, which `directory_watch` polls every TENANT_DIRECTORY_POLL
+seconds on each worker, clearing the local directory when it moves. Other
+workers therefore see a change (a suspension, new branding) within that poll
+interval. An entry read before this worker learned a newer public ETag
+version of its name is refetched, so a response is never older than its ETag.
+"""
+import asyncio
+import logging
+import os
+from typing import Callable, Optional
+
+from fastapi import Request
+
+from cache import TTLCache
+from database import db
+from etag import bump, known_version, public_scope
+from models import TenantPublicInfo
+from sequences import allocate
+
+logger = logging.getLogger(__name__)
+
+TENANT_DIRECTORY_TTL = float(os.environ.get("TENANT_DIRECTORY_TTL", "300"))
+TENANT_DIRECTORY_POLL = float(os.environ.get("TENANT_DIRECTORY_POLL", "2"))
+# Counter bumped on every tenant write - the one key the watch polls
+DIRECTORY_VERSION_KEY = "tenant_directory"
+RESERVED_SUBDOMAINS = {"www", "app"}
+_MISSING = ("missing", None)
+
+directory = TTLCache(maxsize=10000, ttl=TENANT_DIRECTORY_TTL)
+
+
+def normalize_name(name: str) -> str:
+    return name.strip().lower()
+
+
+def public_info(tenant: dict) -> TenantPublicInfo:
+    return TenantPublicInfo(
+        id=tenant["id"],
+        name=tenant["name"],
+        company_name=tenant.get("company_name") or tenant["name"],
+        logo_url=tenant.get("logo_url"),
+        logo_variants=tenant.get("logo_variants"),
+        stamp_url=tenant.get("stamp_url"),
+        stamp_variants=tenant.get("stamp_variants"),
+        whatsapp_qr_url=tenant.get("whatsapp_qr_url"),
+        primary_color=tenant.get("primary_color", "#00a79d"),
+        secondary_color=tenant.get("secondary_color", "#E0F7FA")
+    )
+
+
+def branding_scope(param: str) -> Callable[[Request], str]:
+    """ETag scope for a route resolving the tenant name in path parameter `param`"""
+    return lambda request: public_scope(normalize_name(request.path_params[param]))
+
+
+async def resolve(name: str) -> tuple:
+    """(status, TenantPublicInfo) for a subdomain - ("missing", None) if there is no such tenant"""
+    name = normalize_name(name)
+    if name in RESERVED_SUBDOMAINS:
+        return _MISSING
+    # In-memory only: the public version an ETag check of this worker already read
+    version = known_version("tenant", public_scope(name))
+    cached = directory.get(name)
+    if cached is not None and (version is None or cached[0] == version):
+        return cached[1]
+    tenant = await db.tenants.find_one({"name": name}, {"_id": 0})
+    entry = (tenant.get("status"), public_info(tenant)) if tenant else _MISSING
+    directory.set(name, (version, entry))
+    return entry
+
+
+async def bump_tenant(tenant_id: Optional[str], name: Optional[str] = None):
+    """A tenant record changed: company settings, its public branding and directory entry
+
+    `name` is looked up when not given - pass it when the tenant is already deleted.
+    """
+    await bump("tenant", tenant_id)
+    if name is None and tenant_id:
+        tenant = await db.tenants.find_one({"id": tenant_id}, {"_id": 0, "name": 1})
+        name = tenant["name"] if tenant else None
+    if name:
+        directory.invalidate(name)
+        await bump("tenant", public_scope(name))
+    await allocate(DIRECTORY_VERSION_KEY)
+
+
+class DirectoryWatch:
+    """Clears this worker's directory when any worker wrote a tenant"""
+
+    def __init__(self, interval: float = TENANT_DIRECTORY_POLL):
+        self.interval = interval
+        self.version: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _read(self) -> int:
+        counter = await db.counters.find_one({"_id": DIRECTORY_VERSION_KEY}, {"value": 1})
+        return counter["value"] if counter else 0
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self.version = await self._read()
+        self._task = asyncio.create_task(self._run(), name="tenant-directory-watch")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                version = await self._read()
+            except Exception as e:
+                logger.warning(f"Tenant directory poll failed: {e}")
+                continue
+            if version != self.version:
+                self.version = version
+                directory.clear()
+
+
+directory_watch = DirectoryWatch()
+
+
+async def normalize_tenant_names():
+    """One-off migration: lowercase/trim tenant names so the unique name index can hold"""
+    cursor = db.tenants.find(
+        {"$expr": {"$ne": ["$name", {"$toLower": {"$trim": {"input": "$name"}}}]}},
+        {"_id": 0, "id": 1, "name": 1}
+    )
+    async for tenant in cursor:
+        name = normalize_name(tenant["name"])
+        if await db.tenants.find_one({"name": name, "id": {"$ne": tenant["id"]}}, {"_id": 1}):
+            logger.error(f"Tenant {tenant['id']} name '{tenant['name']}' collides with an existing '{name}' - left as is")
+            continue
+        await db.tenants.update_one({"id": tenant["id"]}, {"$set": {"name": name}})
+        await bump_tenant(tenant["id"], name)
@@ -0,0 +1,74 @@
+"""Per-tenant user and sale counters
+
+`users_count` and `sales_count` live on the tenant document and are kept with
+`$inc` wherever users or sales are created or deleted, so the super-admin
+tenant list reads them with the tenants instead of counting per tenant.
+
+`reconcile` recomputes both counters with one `$group` aggregation per
+collection and fixes any drift (crashes between the write and the `$inc`,
+manual data changes). Tenants that have never been counted are reconciled at
+startup.
+
+CLI:
+    python tenant_stats.py reconcile [tenant_id]
+"""
+import asyncio
+import sys
+from typing import Dict, List, Optional
+from pymongo import UpdateOne
+
+from database import db
+
+COUNTERS = {"users_count": "users", "sales_count": "sales"}
+
+
+async def adjust_counts(tenant_id: Optional[str], users: int = 0, sales: int = 0):
+    """Move a tenant's counters after users/sales were created (+) or deleted (-)"""
+    inc = {field: delta for field, delta in (("users_count", users), ("sales_count", sales)) if delta}
+    if not tenant_id or not inc:
+        return
+    await db.tenants.update_one({"id": tenant_id}, {"$inc": inc})
+
+
+async def _group_counts(collection: str, match: dict) -> Dict[str, int]:
+    pipeline = [{"$match": match}, {"$group": {"_id": "$tenant_id", "count": {"$sum": 1}}}]
+    return {row["_id"]: row["count"] async for row in db[collection].aggregate(pipeline)}
+
+
+async def reconcile(tenant_ids: Optional[List[str]] = None) -> int:
+    """Recount users and sales per tenant - returns the number of tenants whose counters changed"""
+    match = {"tenant_id": {"$in": tenant_ids}} if tenant_ids else {"tenant_id": {"$ne": None}}
+    counts = {
+        field: await _group_counts(collection, match)
+        for field, collection in COUNTERS.items()
+    }
+
+    tenant_query = {"id": {"$in": tenant_ids}} if tenant_ids else {}
+    tenants = db.tenants.find(tenant_query, {"_id": 0, "id": 1, **{field: 1 for field in COUNTERS}})
+    updates = []
+    async for tenant in tenants:
+        actual = {field: counts[field].get(tenant["id"], 0) for field in COUNTERS}
+        if any(tenant.get(field) != value for field, value in actual.items()):
+            updates.append(UpdateOne({"id": tenant["id"]}, {"$set": actual}))
+    if updates:
+        await db.tenants.bulk_write(updates, ordered=False)
+    return len(updates)
+
+
+async def backfill_counts() -> int:
+    """Reconcile tenants created before the counters existed (run at startup)"""
+    uncounted = await db.tenants.distinct("id", {"users_count": {"$exists": False}})
+    return await reconcile(uncounted) if uncounted else 0
+
+
+async def _main(args: List[str]) -> int:
+    if args and args[0] == "reconcile":
+        fixed = await reconcile(args[1:] or None)
+        print(f"Fixed counters on {fixed} tenants")
+        return 0
+    print(__doc__)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
@@ -0,0 +1,116 @@
+"""
+Asset store tests
+Uploaded logos are stored by content hash, the tenant only keeps the URL, and
+the asset endpoint serves immutable, range-capable responses.
+"""
+import pytest
+import requests
+import os
+import struct
+import uuid
+import zlib
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+
+def make_png() -> bytes:
+    """A unique 1x1 PNG (random text chunk) so every run stores a new asset"""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    header = struct.pack(">IIBBBBB", 1, 1, 8, 0, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+        + chunk(b"tEXt", b"Comment\x00" + uuid.uuid4().hex.encode())
+        + chunk(b"IDAT", zlib.compress(b"\x00\x00")) + chunk(b"IEND", b"")
+    )
+
+
+class TestAssets:
+    """POST /upload/logo and GET /assets/{key}"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup - login and remember the current logo"""
+        self.session = requests.Session()
+        login_response = self.session.post(f"{BASE_URL}/api/auth/login", json={
+            "username": "admin",
+            "password": "admin123"
+        })
+        if login_response.status_code != 200:
+            pytest.skip("Admin login failed - skipping asset tests")
+        self.session.headers.update({"Authorization": f"Bearer {login_response.json().get('access_token')}"})
+        self.original_logo = self.session.get(f"{BASE_URL}/api/settings/company").json().get("logo_url")
+
+        self.png = make_png()
+        upload = self.session.post(
+            f"{BASE_URL}/api/upload/logo", files={"file": ("logo.png", self.png, "image/png")}
+        )
+        assert upload.status_code == 200, upload.text
+        self.url = upload.json()["url"]
+
+        yield
+
+        self.session.put(f"{BASE_URL}/api/settings/company", json={"logo_url": self.original_logo or ""})
+
+    def test_tenant_keeps_only_the_asset_url(self):
+        """The logo is referenced by URL instead of an inline data URL"""
+        assert self.url.startswith("/api/assets/")
+        settings = self.session.get(f"{BASE_URL}/api/settings/company").json()
+        assert settings["logo_url"] == self.url
+        print(f"✓ Tenant logo stored as {self.url}")
+
+    def test_asset_is_immutable(self):
+        """Full download with immutable caching and a 304 on revalidation"""
+        response = requests.get(f"{BASE_URL}{self.url}")
+        assert response.status_code == 200
+        assert response.content == self.png
+        assert response.headers["Content-Type"] == "image/png"
+        assert "immutable" in response.headers["Cache-Control"]
+        assert response.headers["X-Content-Type-Options"] == "nosniff"
+        assert response.headers["Content-Disposition"] == "inline"
+
+        revalidated = requests.get(f"{BASE_URL}{self.url}", headers={"If-None-Match": response.headers["ETag"]})
+        assert revalidated.status_code == 304
+        print("✓ Asset served immutable, revalidation answered with 304")
+
+    def test_range_requests(self):
+        """Single byte ranges return 206, unsatisfiable ranges 416"""
+        response = requests.get(f"{BASE_URL}{self.url}", headers={"Range": "bytes=0-7"})
+        assert response.status_code == 206
+        assert response.content == self.png[:8]
+        assert response.headers["Content-Range"] == f"bytes 0-7/{len(self.png)}"
+
+        suffix = requests.get(f"{BASE_URL}{self.url}", headers={"Range": "bytes=-12"})
+        assert suffix.status_code == 206
+        assert suffix.content == self.png[-12:]
+
+        outside = requests.get(f"{BASE_URL}{self.url}", headers={"Range": f"bytes={len(self.png)}-"})
+        assert outside.status_code == 416
+        print("✓ Range requests handled")
+
+    def test_same_bytes_same_url(self):
+        """Uploading identical bytes again reuses the stored asset"""
+        again = self.session.post(
+            f"{BASE_URL}/api/upload/logo", files={"file": ("copy.png", self.png, "image/png")}
+        )
+        assert again.status_code == 200
+        assert again.json()["url"] == self.url
+        print("✓ Identical upload deduplicated")
+
+    def test_non_image_data_url_rejected(self):
+        """Inline HTML/SVG is refused instead of being served from the app's origin"""
+        for data_url in ("data:text/html;base64,PHNjcmlwdD5hbGVydCgxKTwvc2NyaXB0Pg==",
+                         "data:image/svg+xml;base64,PHN2Zy8+"):
+            response = self.session.put(f"{BASE_URL}/api/settings/company", json={"logo_url": data_url})
+            assert response.status_code == 400, data_url
+        print("✓ Non-image data URLs rejected")
+
+    def test_unknown_asset(self):
+        """Unknown or malformed keys are 404"""
+        assert requests.get(f"{BASE_URL}/api/assets/{'0' * 64}").status_code == 404
+        assert requests.get(f"{BASE_URL}/api/assets/not-a-key").status_code == 404
+        print("✓ Unknown assets return 404")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,70 @@
+"""
+Buffered audit writer tests
+Mutations enqueue their audit record; the background writer makes it visible
+in /api/audit-logs shortly after.
+"""
+import pytest
+import requests
+import os
+import time
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+FLUSH_WAIT_SECONDS = 3
+
+SUPER_ADMIN_CREDS = {"username": "superadmin", "password": "super@admin123"}
+
+
+class TestAuditWriter:
+    """Audit records written in the background"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup - login"""
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+
+        login_response = self.session.post(f"{BASE_URL}/api/auth/login", json={
+            "username": "admin",
+            "password": "admin123"
+        })
+        if login_response.status_code != 200:
+            pytest.skip("Admin login failed - skipping audit writer tests")
+        self.session.headers.update({"Authorization": f"Bearer {login_response.json().get('access_token')}"})
+
+    def test_writer_is_running(self):
+        """The lifespan starts the writer (metrics are Super Admin only)"""
+        assert requests.get(f"{BASE_URL}/api/metrics").status_code in (401, 403)
+        assert self.session.get(f"{BASE_URL}/api/metrics").status_code == 403
+
+        login_response = requests.post(f"{BASE_URL}/api/auth/login", json=SUPER_ADMIN_CREDS)
+        if login_response.status_code != 200:
+            pytest.skip("Super admin login failed - skipping metrics check")
+        token = login_response.json()["access_token"]
+        data = requests.get(f"{BASE_URL}/api/metrics", headers={"Authorization": f"Bearer {token}"}).json()["audit_writer"]
+        assert data["running"] is True
+        print(f"✓ Audit writer running, {data['written']} records written")
+
+    def test_mutation_is_audited(self):
+        """A product create shows up in the audit log once the writer flushes"""
+        created = self.session.post(f"{BASE_URL}/api/products", json={"name": "TEST_AuditProduct", "sale_price": 1.0})
+        assert created.status_code == 200
+        product_id = created.json()["id"]
+        try:
+            deadline = time.monotonic() + FLUSH_WAIT_SECONDS
+            found = False
+            while not found and time.monotonic() < deadline:
+                logs = self.session.get(f"{BASE_URL}/api/audit-logs", params={
+                    "entity_type": "product", "action": "create_product", "limit": 50
+                }).json()
+                found = any(log["entity_id"] == product_id for log in logs)
+                if not found:
+                    time.sleep(0.1)
+            assert found, "Audit record not flushed"
+            print("✓ Product create audited")
+        finally:
+            self.session.delete(f"{BASE_URL}/api/products/{product_id}")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
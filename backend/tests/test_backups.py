@@ -0,0 +1,127 @@
+"""
+Chunked reset backup tests
+A user-specific reset moves the user's sales into backup chunks; the manifest
+lists what was moved and the documents can be streamed back as NDJSON.
+"""
+import pytest
+import requests
+import os
+import json
+import time
+import uuid
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+SALES = 3
+
+
+class TestChunkedBackups:
+    """POST /admin/reset-data (user_specific) and GET /admin/backups/{id}"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup - admin session, a throwaway cashier with a few sales"""
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+
+        login_response = self.session.post(f"{BASE_URL}/api/auth/login", json={
+            "username": "admin",
+            "password": "admin123"
+        })
+        if login_response.status_code != 200:
+            pytest.skip("Admin login failed - skipping backup tests")
+        self.session.headers.update({"Authorization": f"Bearer {login_response.json().get('access_token')}"})
+
+        username = f"test_backup_{uuid.uuid4().hex[:8]}"
+        user = self.session.post(f"{BASE_URL}/api/users", json={
+            "username": username, "full_name": "TEST Backup", "role": "cashier", "password": "test1234"
+        })
+        assert user.status_code == 200
+        self.user_id = user.json()["id"]
+        product = self.session.post(f"{BASE_URL}/api/products", json={
+            "name": "TEST_BackupProduct", "sale_price": 4.0, "initial_stock": 100
+        })
+        assert product.status_code == 200
+        self.product_id = product.json()["id"]
+
+        cashier = requests.Session()
+        token = cashier.post(f"{BASE_URL}/api/auth/login", json={"username": username, "password": "test1234"}).json()["access_token"]
+        cashier.headers.update({"Authorization": f"Bearer {token}"})
+        self.sale_ids = [cashier.post(f"{BASE_URL}/api/sales", json={
+            "items": [{"product_id": self.product_id, "quantity": 1, "unit_price": 4.0}],
+            "payment_method": "bank",
+            "bank_amount": 4.0
+        }).json()["id"] for _ in range(SALES)]
+
+        yield
+
+        self.session.delete(f"{BASE_URL}/api/products/{self.product_id}")
+        self.session.delete(f"{BASE_URL}/api/users/{self.user_id}")
+
+    def test_reset_backup_and_stream(self):
+        """The reset writes a manifest and the sales stream back intact"""
+        reset = self.session.post(f"{BASE_URL}/api/admin/reset-data", json={
+            "admin_password": "admin123", "reset_type": "user_specific", "user_ids": [self.user_id]
+        })
+        assert reset.status_code == 200, reset.text
+        backup_id = reset.json()["backup_id"]
+        assert reset.json()["deleted"]["sales"] == SALES
+
+        manifest = self.session.get(f"{BASE_URL}/api/admin/backups/{backup_id}").json()
+        assert manifest["status"] == "complete"
+        assert manifest["collections"]["sales"] == {"documents": SALES, "chunks": 1}
+        assert "sales" not in manifest or not isinstance(manifest["sales"], list)
+
+        streamed = self.session.get(f"{BASE_URL}/api/admin/backups/{backup_id}/data/sales", stream=True)
+        assert streamed.status_code == 200
+        assert streamed.headers["content-type"].startswith("application/x-ndjson")
+        sales = [json.loads(line) for line in streamed.iter_lines() if line]
+        assert sorted(s["id"] for s in sales) == sorted(self.sale_ids)
+        print(f"✓ Backup {backup_id} streamed {len(sales)} sales")
+
+        self.session.delete(f"{BASE_URL}/api/admin/backups/{backup_id}")
+
+    def _reset(self):
+        reset = self.session.post(f"{BASE_URL}/api/admin/reset-data", json={
+            "admin_password": "admin123", "reset_type": "user_specific", "user_ids": [self.user_id]
+        })
+        assert reset.status_code == 200, reset.text
+        return reset.json()["backup_id"]
+
+    def _restore(self, backup_id):
+        started = self.session.post(f"{BASE_URL}/api/admin/backups/{backup_id}/restore", json={"admin_password": "admin123"})
+        assert started.status_code == 200, started.text
+        job_id = started.json()["job_id"]
+        deadline = time.monotonic() + 30
+        job = started.json()
+        while job["status"] == "running" and time.monotonic() < deadline:
+            time.sleep(0.2)
+            job = self.session.get(f"{BASE_URL}/api/admin/restore-jobs/{job_id}").json()
+        assert job["status"] == "complete", job
+        return job
+
+    def test_restore_job(self):
+        """A restore runs as a job; running it again finds everything already present"""
+        backup_id = self._reset()
+        try:
+            job = self._restore(backup_id)
+            assert job["progress"]["sales"] == {"total": SALES, "restored": SALES, "existing": 0}
+            sale = self.session.get(f"{BASE_URL}/api/sales/{self.sale_ids[0]}")
+            assert sale.status_code == 200
+
+            again = self._restore(backup_id)
+            assert again["progress"]["sales"]["restored"] == 0
+            assert again["progress"]["sales"]["existing"] == SALES
+            print(f"✓ Restore job restored {SALES} sales, re-run found them present")
+        finally:
+            self.session.delete(f"{BASE_URL}/api/admin/backups/{backup_id}")
+
+    def test_unknown_collection_rejected(self):
+        """Only backed-up collections can be streamed"""
+        response = self.session.get(f"{BASE_URL}/api/admin/backups/anything/data/users")
+        assert response.status_code == 400
+        print("✓ Unknown collection rejected")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,128 @@
+"""
+Catalog index tests
+Barcode scans and product search are answered from the in-process catalog
+index; these tests check that it follows product create/update/delete and
+stock changes.
+"""
+import pytest
+import requests
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+MONGO_URL = os.environ.get('MONGO_URL')
+DB_NAME = os.environ.get('DB_NAME')
+# ETAG_VERSION_TTL plus a margin
+VERSION_SETTLE_SECONDS = 3
+
+
+class TestCatalogIndex:
+    """Barcode lookup and search through the catalog index"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup - login and create a product with a unique barcode"""
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+
+        login_response = self.session.post(f"{BASE_URL}/api/auth/login", json={
+            "username": "admin",
+            "password": "admin123"
+        })
+        if login_response.status_code != 200:
+            pytest.skip("Admin login failed - skipping catalog index tests")
+        self.session.headers.update({"Authorization": f"Bearer {login_response.json().get('access_token')}"})
+        self.tenant_id = login_response.json()["user"].get("tenant_id")
+
+        self.token = uuid.uuid4().hex[:10]
+        self.barcode = f"99{uuid.uuid4().int % 10**11:011d}"
+        response = self.session.post(f"{BASE_URL}/api/products", json={
+            "name": f"TEST_Catalog {self.token}",
+            "barcode": self.barcode,
+            "sale_price": 1.5,
+            "initial_stock": 10
+        })
+        assert response.status_code == 200, f"Product create failed: {response.text}"
+        self.product_id = response.json()["id"]
+
+        yield
+
+        self.session.delete(f"{BASE_URL}/api/products/{self.product_id}")
+
+    def _search_ids(self, text):
+        response = self.session.get(f"{BASE_URL}/api/products", params={"search": text})
+        assert response.status_code == 200
+        return [p["id"] for p in response.json()]
+
+    def test_barcode_scan(self):
+        """A fresh product is found by barcode"""
+        response = self.session.get(f"{BASE_URL}/api/products/barcode/{self.barcode}")
+        assert response.status_code == 200
+        assert response.json()["id"] == self.product_id
+        print("✓ Barcode scan served")
+
+    def test_search_substring_prefix_and_barcode(self):
+        """Search matches name substrings, short prefixes and barcodes, case-insensitively"""
+        assert self.product_id in self._search_ids(self.token.upper())
+        assert self.product_id in self._search_ids(self.token[2:8])
+        assert self.product_id in self._search_ids("te")
+        assert self.product_id in self._search_ids(self.barcode[:6])
+        print("✓ Search by substring, prefix and barcode")
+
+    def test_update_and_delete_invalidate(self):
+        """Renames and deletes are visible immediately"""
+        renamed = f"TEST_Renamed {uuid.uuid4().hex[:10]}"
+        response = self.session.put(f"{BASE_URL}/api/products/{self.product_id}", json={"name": renamed})
+        assert response.status_code == 200
+        assert self.product_id in self._search_ids(renamed.split()[1])
+        assert self.product_id not in self._search_ids(self.token)
+
+        response = self.session.delete(f"{BASE_URL}/api/products/{self.product_id}")
+        assert response.status_code == 200
+        assert self.session.get(f"{BASE_URL}/api/products/barcode/{self.barcode}").status_code == 404
+        print("✓ Update and delete invalidate the index")
+
+    def test_stock_follows_movements(self):
+        """Stock from a barcode scan reflects movements made after the index was warmed"""
+        self.session.get(f"{BASE_URL}/api/products/barcode/{self.barcode}")
+        response = self.session.post(f"{BASE_URL}/api/stock/movements", json={
+            "product_id": self.product_id,
+            "quantity": 4,
+            "movement_type": "out"
+        })
+        assert response.status_code == 200, f"Movement failed: {response.text}"
+
+        scanned = self.session.get(f"{BASE_URL}/api/products/barcode/{self.barcode}").json()
+        assert scanned["current_stock"] == 6
+        print("✓ Stock kept in step with movements")
+
+    def test_write_from_another_worker(self):
+        """A change stamped into the catalog feed outside this worker reaches a warm index"""
+        if not MONGO_URL or not DB_NAME:
+            pytest.skip("MONGO_URL/DB_NAME not set - skipping cross-worker test")
+        pymongo = pytest.importorskip("pymongo")
+        self.session.get(f"{BASE_URL}/api/products/barcode/{self.barcode}")
+
+        # What another worker's product update does: allocate a change stamp, write, bump the edit version
+        database = pymongo.MongoClient(MONGO_URL)[DB_NAME]
+        counter = database.counters.find_one_and_update(
+            {"_id": f"catalog:{self.tenant_id}"}, {"$inc": {"value": 1}},
+            upsert=True, return_document=pymongo.ReturnDocument.AFTER
+        )
+        renamed = f"TEST_Elsewhere {uuid.uuid4().hex[:10]}"
+        database.products.update_one({"id": self.product_id}, {"$set": {
+            "name": renamed, "change_seq": counter["value"], "changed_at": datetime.now(timezone.utc).isoformat()
+        }})
+        database.counters.update_one({"_id": f"catalog_edits:{self.tenant_id}"}, {"$inc": {"value": 1}}, upsert=True)
+
+        time.sleep(VERSION_SETTLE_SECONDS)
+        scanned = self.session.get(f"{BASE_URL}/api/products/barcode/{self.barcode}").json()
+        assert scanned["name"] == renamed
+        assert self.product_id in self._search_ids(renamed.split()[1])
+        print("✓ Index refreshed from the change feed")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
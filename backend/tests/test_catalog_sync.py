@@ -0,0 +1,101 @@
+"""
+Catalog delta sync tests
+A terminal holding a sync token receives only products changed or deleted
+after it.
+"""
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+
+class TestCatalogSync:
+    """GET /products/changes"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup - login"""
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+
+        login_response = self.session.post(f"{BASE_URL}/api/auth/login", json={
+            "username": "admin",
+            "password": "admin123"
+        })
+        if login_response.status_code != 200:
+            pytest.skip("Admin login failed - skipping catalog sync tests")
+        self.session.headers.update({"Authorization": f"Bearer {login_response.json().get('access_token')}"})
+        self.created = []
+
+        yield
+
+        for product_id in self.created:
+            self.session.delete(f"{BASE_URL}/api/products/{product_id}")
+
+    def _changes(self, since=None):
+        params = {"since": since} if since else {}
+        response = self.session.get(f"{BASE_URL}/api/products/changes", params=params)
+        assert response.status_code == 200, f"Changes failed: {response.text}"
+        return response.json()
+
+    def _create(self, name):
+        response = self.session.post(f"{BASE_URL}/api/products", json={"name": name, "sale_price": 1.0})
+        assert response.status_code == 200
+        self.created.append(response.json()["id"])
+        return response.json()["id"]
+
+    def test_initial_sync_requests_reset(self):
+        """Without a token the terminal is told to load the full catalog"""
+        data = self._changes()
+        assert data["reset"] is True
+        assert data["since"]
+        print("✓ Initial sync returns a token and reset")
+
+    def test_create_update_delete_are_delivered(self):
+        """Creates, updates and deletes after the token show up once"""
+        token = self._changes()["since"]
+
+        product_id = self._create("TEST_Sync_Create")
+        data = self._changes(token)
+        assert product_id in [p["id"] for p in data["changes"]]
+        token = data["since"]
+
+        self.session.put(f"{BASE_URL}/api/products/{product_id}", json={"sale_price": 2.5})
+        data = self._changes(token)
+        updated = [p for p in data["changes"] if p["id"] == product_id]
+        assert updated and updated[0]["sale_price"] == 2.5
+        token = data["since"]
+
+        assert self.session.delete(f"{BASE_URL}/api/products/{product_id}").status_code == 200
+        self.created.remove(product_id)
+        data = self._changes(token)
+        assert product_id in data["deleted"]
+        assert product_id not in [p["id"] for p in data["changes"]]
+        print("✓ Create, update and delete delivered as deltas")
+
+    def test_sale_stock_change_is_delivered(self):
+        """Stock decremented by a sale reaches synced terminals"""
+        product_id = self._create("TEST_Sync_Sale")
+        token = self._changes()["since"]
+
+        response = self.session.post(f"{BASE_URL}/api/sales", json={
+            "items": [{"product_id": product_id, "quantity": 2, "unit_price": 1.0}],
+            "payment_method": "bank",
+            "bank_amount": 2.0
+        })
+        if response.status_code != 200:
+            pytest.skip(f"Sale not possible here: {response.text}")
+
+        changed = [p for p in self._changes(token)["changes"] if p["id"] == product_id]
+        assert changed and changed[0]["current_stock"] == -2
+        print("✓ Sale stock change delivered")
+
+    def test_invalid_token_rejected(self):
+        response = self.session.get(f"{BASE_URL}/api/products/changes", params={"since": "garbage"})
+        assert response.status_code == 400
+        print("✓ Invalid sync token rejected")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
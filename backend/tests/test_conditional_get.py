@@ -0,0 +1,78 @@
+"""
+Conditional GET tests
+Read-mostly resources carry an ETag, answer If-None-Match with 304 and change
+their ETag after a write.
+"""
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+
+class TestConditionalGet:
+    """ETag / If-None-Match on reference data"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup - login"""
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+
+        login_response = self.session.post(f"{BASE_URL}/api/auth/login", json={
+            "username": "admin",
+            "password": "admin123"
+        })
+        if login_response.status_code != 200:
+            pytest.skip("Admin login failed - skipping conditional GET tests")
+        self.session.headers.update({"Authorization": f"Bearer {login_response.json().get('access_token')}"})
+        if not login_response.json()["user"].get("tenant_id"):
+            pytest.skip("ETags are tenant-scoped - admin has no tenant")
+
+    def _etag(self, path):
+        response = self.session.get(f"{BASE_URL}{path}")
+        assert response.status_code == 200
+        assert response.headers.get("ETag"), f"No ETag on {path}"
+        return response.headers["ETag"]
+
+    @pytest.mark.parametrize("path", [
+        "/api/settings/company",
+        "/api/settings/pos",
+        "/api/branches",
+        "/api/warehouses",
+        "/api/vat-rates",
+        "/api/comment-templates",
+        "/api/categories",
+        "/api/products",
+    ])
+    def test_not_modified(self, path):
+        """A matching If-None-Match gets an empty 304"""
+        etag = self._etag(path)
+        response = self.session.get(f"{BASE_URL}{path}", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers.get("ETag") == etag
+        print(f"✓ {path} answered 304")
+
+    def test_write_changes_etag(self):
+        """Creating a branch invalidates the branch list ETag"""
+        etag = self._etag("/api/branches")
+        created = self.session.post(f"{BASE_URL}/api/branches", json={"name": "TEST_ETag_Branch"})
+        assert created.status_code == 200
+        try:
+            response = self.session.get(f"{BASE_URL}/api/branches", headers={"If-None-Match": etag})
+            assert response.status_code == 200
+            assert response.headers["ETag"] != etag
+            assert "TEST_ETag_Branch" in [b["name"] for b in response.json()]
+            print("✓ Branch write changes the ETag")
+        finally:
+            self.session.delete(f"{BASE_URL}/api/branches/{created.json()['id']}")
+
+    def test_query_is_part_of_etag(self):
+        """Different filters never share an ETag"""
+        assert self._etag("/api/products?limit=5") != self._etag("/api/products?limit=6")
+        print("✓ Query string varies the ETag")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,134 @@
+"""
+Dashboard aggregation tests
+Seeds 50k sales for today straight into MongoDB and checks that /reports/dashboard
+answers from server-side aggregation: small payload that does not grow with the
+number of sales, few documents returned by MongoDB, summary-only recent sales,
+bounded latency.
+"""
+import pytest
+import requests
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+MONGO_URL = os.environ.get('MONGO_URL')
+DB_NAME = os.environ.get('DB_NAME')
+
+SEEDED_SALES = 50000
+MAX_LATENCY_SECONDS = 2.0
+MAX_RESPONSE_BYTES = 16 * 1024
+RECENT_FIELDS = {"id", "receipt_number", "grand_total", "payment_method", "created_at"}
+
+
+class TestDashboardAggregation:
+    """Dashboard over a day with 50k sales"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup - login and seed today's sales for the admin's tenant"""
+        if not MONGO_URL or not DB_NAME:
+            pytest.skip("MONGO_URL/DB_NAME not set - skipping dashboard aggregation tests")
+        pymongo = pytest.importorskip("pymongo")
+
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+
+        login_response = self.session.post(f"{BASE_URL}/api/auth/login", json={
+            "username": "admin",
+            "password": "admin123"
+        })
+        if login_response.status_code != 200:
+            pytest.skip("Admin login failed - skipping dashboard aggregation tests")
+        self.session.headers.update({"Authorization": f"Bearer {login_response.json().get('access_token')}"})
+        self.tenant_id = login_response.json()["user"].get("tenant_id")
+
+        self.client = pymongo.MongoClient(MONGO_URL)
+        self.sales = self.client[DB_NAME].sales
+        self.seed_tag = f"TEST_DASH-{uuid.uuid4().hex[:8]}"
+        self._seed(0, SEEDED_SALES)
+
+        yield
+
+        self.sales.delete_many({"seed_tag": self.seed_tag})
+        self.client.close()
+
+    def _seed(self, first: int, count: int):
+        """Insert `count` of today's sales for the admin's tenant, numbered from `first`"""
+        today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        docs = []
+        for i in range(first, first + count):
+            created_at = today.replace(hour=(i // 3600) % 24, minute=(i // 60) % 60, second=i % 60)
+            docs.append({
+                "id": str(uuid.uuid4()),
+                "tenant_id": self.tenant_id,
+                "receipt_number": f"{self.seed_tag}-{i}",
+                "user_id": "seed",
+                "items": [{"product_id": "seed", "product_name": "Seed " * 20, "quantity": 1, "unit_price": 2.0}],
+                "subtotal": 2.0,
+                "total_discount": 0,
+                "total_vat": 0,
+                "grand_total": 2.0,
+                "payment_method": "cash" if i % 2 else "bank",
+                "created_at": created_at.isoformat(),
+                "seed_tag": self.seed_tag
+            })
+        for start in range(0, count, 5000):
+            self.sales.insert_many(docs[start:start + 5000], ordered=False)
+
+    def _documents_returned(self) -> int:
+        """Documents MongoDB has returned to clients since it started"""
+        return self.client.admin.command("serverStatus")["metrics"]["document"]["returned"]
+
+    def test_dashboard_is_aggregated_server_side(self):
+        """Totals include the seeded day, payload stays small and fast"""
+        started = time.perf_counter()
+        response = self.session.get(f"{BASE_URL}/api/reports/dashboard")
+        elapsed = time.perf_counter() - started
+        assert response.status_code == 200, f"Dashboard failed: {response.text}"
+
+        data = response.json()
+        assert data["total_transactions_today"] >= SEEDED_SALES
+        assert data["total_sales_today"] >= SEEDED_SALES * 2.0
+        assert data["payment_methods"]["cash"]["count"] >= SEEDED_SALES // 2
+        assert data["payment_methods"]["bank"]["count"] >= SEEDED_SALES // 2
+        print(f"✓ Dashboard totals cover {data['total_transactions_today']} sales")
+
+        assert len(response.content) <= MAX_RESPONSE_BYTES, f"Dashboard payload is {len(response.content)} bytes"
+        assert elapsed <= MAX_LATENCY_SECONDS, f"Dashboard took {elapsed:.2f}s"
+        print(f"✓ Dashboard answered in {elapsed * 1000:.0f}ms with {len(response.content)} bytes")
+
+    def test_cost_independent_of_sales_count(self):
+        """No raw sales reach the server: documents read and payload size do not grow with the day"""
+        returned_before = self._documents_returned()
+        first = self.session.get(f"{BASE_URL}/api/reports/dashboard")
+        returned = self._documents_returned() - returned_before
+        assert first.status_code == 200
+        # Aggregation results and recent-sale summaries only - not one document per sale
+        assert returned < SEEDED_SALES // 100, f"Dashboard read {returned} documents"
+
+        self._seed(SEEDED_SALES, SEEDED_SALES // 5)
+        second = self.session.get(f"{BASE_URL}/api/reports/dashboard")
+        assert second.status_code == 200
+        assert second.json()["total_transactions_today"] >= first.json()["total_transactions_today"] + SEEDED_SALES // 5
+        # Only the digits of the totals may change
+        assert abs(len(second.content) - len(first.content)) <= 64
+        print(f"✓ {returned} documents returned, payload {len(first.content)} -> {len(second.content)} bytes")
+
+    def test_recent_sales_are_summaries(self):
+        """Recent sales carry summary fields only - never items"""
+        response = self.session.get(f"{BASE_URL}/api/reports/dashboard")
+        assert response.status_code == 200
+
+        recent = response.json()["recent_sales"]
+        assert 0 < len(recent) <= 10
+        for sale in recent:
+            assert set(sale) <= RECENT_FIELDS, f"Unexpected sale fields: {set(sale) - RECENT_FIELDS}"
+        created = [s["created_at"] for s in recent]
+        assert created == sorted(created, reverse=True)
+        print(f"✓ {len(recent)} recent sales returned as summaries")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,99 @@
+"""
+Cash drawer ledger tests
+Drawer transactions are stored one per document; the drawer keeps running
+totals and /cashier/current pages through the ledger.
+"""
+import pytest
+import requests
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+OPENING_BALANCE = 100.0
+
+
+class TestDrawerTransactions:
+    """POST /cashier/transaction and GET /cashier/current"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup - login and open a fresh drawer"""
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+
+        login_response = self.session.post(f"{BASE_URL}/api/auth/login", json={
+            "username": "admin",
+            "password": "admin123"
+        })
+        if login_response.status_code != 200:
+            pytest.skip("Admin login failed - skipping drawer tests")
+        self.session.headers.update({"Authorization": f"Bearer {login_response.json().get('access_token')}"})
+
+        if self.session.get(f"{BASE_URL}/api/cashier/current").status_code == 200:
+            pytest.skip("Admin already has an open drawer - not touching it")
+        opened = self.session.post(f"{BASE_URL}/api/cashier/open", json={"opening_balance": OPENING_BALANCE})
+        assert opened.status_code == 200
+
+        yield
+
+        self.session.post(f"{BASE_URL}/api/cashier/close", json={"actual_balance": 0})
+
+    def _transaction(self, amount, transaction_type):
+        response = self.session.post(f"{BASE_URL}/api/cashier/transaction", json={
+            "amount": amount, "transaction_type": transaction_type, "description": "TEST"
+        })
+        assert response.status_code == 200
+        return response.json()["new_balance"]
+
+    def test_running_totals(self):
+        """Balances and totals are kept on the drawer"""
+        assert self._transaction(20, "in") == OPENING_BALANCE + 20
+        assert self._transaction(5, "out") == OPENING_BALANCE + 15
+        assert self._transaction(10, "in") == OPENING_BALANCE + 25
+
+        drawer = self.session.get(f"{BASE_URL}/api/cashier/current").json()
+        assert drawer["current_balance"] == OPENING_BALANCE + 25
+        assert (drawer["transaction_count"], drawer["total_in"], drawer["total_out"]) == (3, 30, 5)
+        print("✓ Drawer running totals correct")
+
+    def test_transactions_are_paginated(self):
+        """The ledger is returned newest first, one page at a time"""
+        for amount in (1, 2, 3):
+            self._transaction(amount, "in")
+
+        first = self.session.get(f"{BASE_URL}/api/cashier/current", params={"limit": 2})
+        assert first.status_code == 200
+        assert [t["amount"] for t in first.json()["transactions"]] == [3, 2]
+        assert first.json()["transactions"][0]["balance_after"] == OPENING_BALANCE + 6
+
+        cursor = first.headers.get("X-Next-Cursor")
+        assert cursor
+        second = self.session.get(f"{BASE_URL}/api/cashier/current", params={"limit": 2, "cursor": cursor})
+        assert [t["amount"] for t in second.json()["transactions"]] == [1]
+        print("✓ Drawer transactions paginated")
+
+    def test_concurrent_cash_sales_all_counted(self):
+        """Parallel cash sales on one drawer each move expected_balance"""
+        product = self.session.post(f"{BASE_URL}/api/products", json={
+            "name": "TEST_DrawerCashProduct", "sale_price": 2.0, "initial_stock": 50
+        }).json()
+        sale = {
+            "items": [{"product_id": product["id"], "quantity": 1, "unit_price": 2.0}],
+            "payment_method": "cash",
+            "cash_amount": 2.0
+        }
+        try:
+            with ThreadPoolExecutor(max_workers=10) as pool:
+                responses = list(pool.map(lambda _: self.session.post(f"{BASE_URL}/api/sales", json=sale), range(10)))
+            assert all(r.status_code == 200 for r in responses)
+
+            drawer = self.session.get(f"{BASE_URL}/api/cashier/current").json()
+            assert drawer["expected_balance"] == OPENING_BALANCE + 20
+        finally:
+            self.session.delete(f"{BASE_URL}/api/products/{product['id']}")
+        print("✓ Concurrent cash sales all reached expected_balance")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,100 @@
+"""
+Idempotency-Key tests
+Retrying a POST with the same Idempotency-Key returns the original response
+and never executes the write twice.
+"""
+import pytest
+import requests
+import os
+import uuid
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+INITIAL_STOCK = 20
+
+
+class TestIdempotency:
+    """Idempotency-Key on POST /sales and /stock/movements"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup - login and create a product"""
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+
+        login_response = self.session.post(f"{BASE_URL}/api/auth/login", json={
+            "username": "admin",
+            "password": "admin123"
+        })
+        if login_response.status_code != 200:
+            pytest.skip("Admin login failed - skipping idempotency tests")
+        self.session.headers.update({"Authorization": f"Bearer {login_response.json().get('access_token')}"})
+
+        product_response = self.session.post(f"{BASE_URL}/api/products", json={
+            "name": "TEST_IdempotentProduct",
+            "sale_price": 3.0,
+            "initial_stock": INITIAL_STOCK
+        })
+        assert product_response.status_code == 200
+        self.product_id = product_response.json()["id"]
+
+        yield
+
+        self.session.delete(f"{BASE_URL}/api/products/{self.product_id}")
+
+    def _sale(self, quantity=1):
+        return {
+            "items": [{"product_id": self.product_id, "quantity": quantity, "unit_price": 3.0}],
+            "payment_method": "bank",
+            "bank_amount": 3.0 * quantity
+        }
+
+    def _stock(self):
+        return self.session.get(f"{BASE_URL}/api/products/{self.product_id}").json()["current_stock"]
+
+    def test_retried_sale_is_created_once(self):
+        """Three retries of one sale return the same sale and decrement stock once"""
+        headers = {"Idempotency-Key": f"TEST-{uuid.uuid4()}"}
+        responses = [self.session.post(f"{BASE_URL}/api/sales", json=self._sale(2), headers=headers) for _ in range(3)]
+
+        assert all(r.status_code == 200 for r in responses), [r.text for r in responses]
+        assert len({r.json()["id"] for r in responses}) == 1
+        assert "Idempotent-Replayed" not in responses[0].headers
+        assert responses[1].headers.get("Idempotent-Replayed") == "true"
+        assert self._stock() == INITIAL_STOCK - 2
+        print("✓ Retried sale created once")
+
+    def test_key_reused_with_other_body(self):
+        """A key reused for a different request is rejected"""
+        headers = {"Idempotency-Key": f"TEST-{uuid.uuid4()}"}
+        assert self.session.post(f"{BASE_URL}/api/sales", json=self._sale(1), headers=headers).status_code == 200
+        response = self.session.post(f"{BASE_URL}/api/sales", json=self._sale(3), headers=headers)
+        assert response.status_code == 422
+        assert self._stock() == INITIAL_STOCK - 1
+        print("✓ Key reuse with another body rejected")
+
+    def test_failed_request_releases_key(self):
+        """A rejected request does not store its error - the retry runs again"""
+        headers = {"Idempotency-Key": f"TEST-{uuid.uuid4()}"}
+        movement = {"product_id": self.product_id, "movement_type": "out", "quantity": INITIAL_STOCK + 1}
+        assert self.session.post(f"{BASE_URL}/api/stock/movements", json=movement, headers=headers).status_code == 400
+
+        self.session.post(f"{BASE_URL}/api/stock/movements", json={
+            "product_id": self.product_id, "movement_type": "in", "quantity": 1
+        })
+        response = self.session.post(f"{BASE_URL}/api/stock/movements", json=movement, headers=headers)
+        assert response.status_code == 200
+        assert self._stock() == 0
+        print("✓ Failed request released its key")
+
+    def test_without_key_nothing_changes(self):
+        """Requests without the header are never deduplicated"""
+        first = self.session.post(f"{BASE_URL}/api/sales", json=self._sale())
+        second = self.session.post(f"{BASE_URL}/api/sales", json=self._sale())
+        assert first.json()["id"] != second.json()["id"]
+        assert self._stock() == INITIAL_STOCK - 2
+        print("✓ Requests without a key run every time")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
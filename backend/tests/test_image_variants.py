@@ -0,0 +1,105 @@
+"""
+Image variant tests
+Uploads are rendered once into thermal/invoice/thumbnail variants that are
+size-bounded and carry none of the upload's metadata.
+"""
+import pytest
+import requests
+import os
+import struct
+import uuid
+import zlib
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+WIDTH, HEIGHT = 1200, 600
+
+
+def chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def make_noise_png(marker: bytes) -> bytes:
+    """A grayscale noise PNG (compresses badly, like a photo) with a text chunk"""
+    header = struct.pack(">IIBBBBB", WIDTH, HEIGHT, 8, 0, 0, 0, 0)
+    rows = b"".join(b"\x00" + os.urandom(WIDTH) for _ in range(HEIGHT))
+    return (
+        b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+        + chunk(b"tEXt", b"Comment\x00" + marker)
+        + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b"")
+    )
+
+
+class TestImageVariants:
+    """POST /upload/logo renders variants"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup - login and remember the current logo"""
+        self.session = requests.Session()
+        login_response = self.session.post(f"{BASE_URL}/api/auth/login", json={
+            "username": "admin",
+            "password": "admin123"
+        })
+        if login_response.status_code != 200:
+            pytest.skip("Admin login failed - skipping image variant tests")
+        self.session.headers.update({"Authorization": f"Bearer {login_response.json().get('access_token')}"})
+        self.original_logo = self.session.get(f"{BASE_URL}/api/settings/company").json().get("logo_url")
+
+        yield
+
+        self.session.put(f"{BASE_URL}/api/settings/company", json={"logo_url": self.original_logo or ""})
+
+    def upload(self, content: bytes, filename: str = "logo.png"):
+        return self.session.post(f"{BASE_URL}/api/upload/logo", files={"file": (filename, content, "image/png")})
+
+    def test_variants_are_small_and_clean(self):
+        """Every variant is far smaller than the upload and drops its metadata"""
+        marker = uuid.uuid4().hex.encode()
+        source = make_noise_png(marker)
+        response = self.upload(source)
+        assert response.status_code == 200, response.text
+        variants = response.json()["variants"]
+        assert set(variants) == {"thermal", "invoice", "thumb"}
+
+        thermal = requests.get(f"{BASE_URL}{variants['thermal']}")
+        assert thermal.headers["Content-Type"] == "image/png"
+        assert len(thermal.content) * 10 < len(source)
+        for name in ("invoice", "thumb"):
+            variant = requests.get(f"{BASE_URL}{variants[name]}")
+            assert variant.headers["Content-Type"] == "image/webp"
+            assert marker not in variant.content
+        assert marker not in thermal.content
+
+        settings = self.session.get(f"{BASE_URL}/api/settings/company").json()
+        assert settings["logo_variants"] == variants
+        print(f"✓ Source {len(source)} bytes, thermal variant {len(thermal.content)} bytes")
+
+    def test_variants_cached_by_content(self):
+        """The same bytes map to the same variants"""
+        source = make_noise_png(b"cache")
+        first = self.upload(source).json()["variants"]
+        second = self.upload(source, "again.png").json()["variants"]
+        assert first == second
+        print("✓ Variants reused for identical uploads")
+
+    def test_undecodable_image_rejected(self):
+        """Bytes Pillow cannot read are refused"""
+        response = self.upload(b"not really a png", "broken.png")
+        assert response.status_code == 400
+        print("✓ Undecodable upload rejected")
+
+    def test_decompression_bomb_rejected(self):
+        """A tiny PNG whose header declares huge dimensions is refused, not a 500"""
+        header = struct.pack(">IIBBBBB", 100_000, 100_000, 8, 0, 0, 0, 0)
+        bomb = (
+            b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(b"\x00" * 64)) + chunk(b"IEND", b"")
+        )
+        response = self.upload(bomb, "bomb.png")
+        assert response.status_code == 400
+        print("✓ Decompression bomb rejected")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
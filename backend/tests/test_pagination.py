@@ -0,0 +1,97 @@
+"""
+Cursor pagination tests
+Walks list endpoints page by page via X-Next-Cursor and checks that pages are
+disjoint, ordered newest first and together cover every row.
+"""
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+PRODUCTS = 7
+PAGE_SIZE = 3
+
+
+class TestCursorPagination:
+    """Keyset pagination on /products and friends"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup - login and create a category of products to page through"""
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+
+        login_response = self.session.post(f"{BASE_URL}/api/auth/login", json={
+            "username": "admin",
+            "password": "admin123"
+        })
+        if login_response.status_code != 200:
+            pytest.skip("Admin login failed - skipping pagination tests")
+        self.session.headers.update({"Authorization": f"Bearer {login_response.json().get('access_token')}"})
+
+        self.category = "TEST_Pagination"
+        self.product_ids = []
+        for i in range(PRODUCTS):
+            response = self.session.post(f"{BASE_URL}/api/products", json={
+                "name": f"TEST_Page_{i}",
+                "category": self.category,
+                "sale_price": 1.0
+            })
+            assert response.status_code == 200, f"Product create failed: {response.text}"
+            self.product_ids.append(response.json()["id"])
+
+        yield
+
+        for product_id in self.product_ids:
+            self.session.delete(f"{BASE_URL}/api/products/{product_id}")
+
+    def _walk(self, path, params):
+        pages, cursor = [], None
+        while True:
+            page_params = {**params, "limit": PAGE_SIZE}
+            if cursor:
+                page_params["cursor"] = cursor
+            response = self.session.get(f"{BASE_URL}{path}", params=page_params)
+            assert response.status_code == 200, f"Page failed: {response.text}"
+            pages.append(response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                return pages
+
+    def test_pages_cover_all_rows_once(self):
+        """Walking the cursor returns every product exactly once, newest first"""
+        pages = self._walk("/api/products", {"category": self.category})
+        rows = [p for page in pages for p in page]
+
+        assert len(pages) == -(-PRODUCTS // PAGE_SIZE)
+        assert all(len(page) <= PAGE_SIZE for page in pages)
+        assert sorted(p["id"] for p in rows) == sorted(self.product_ids)
+        created = [p["created_at"] for p in rows]
+        assert created == sorted(created, reverse=True)
+        print(f"✓ {len(rows)} products over {len(pages)} pages, no duplicates")
+
+    def test_total_count_header(self):
+        """include_total adds X-Total-Count for the whole filter"""
+        response = self.session.get(f"{BASE_URL}/api/products", params={
+            "category": self.category, "limit": PAGE_SIZE, "include_total": "true"
+        })
+        assert response.status_code == 200
+        assert response.headers.get("X-Total-Count") == str(PRODUCTS)
+        print("✓ X-Total-Count reported")
+
+    def test_invalid_cursor_rejected(self):
+        """A tampered token is a 400, not a server error"""
+        response = self.session.get(f"{BASE_URL}/api/products", params={"cursor": "not-a-cursor"})
+        assert response.status_code == 400
+        print("✓ Invalid cursor rejected")
+
+    def test_limit_is_bounded(self):
+        """Page size above the maximum is refused"""
+        response = self.session.get(f"{BASE_URL}/api/sales", params={"limit": 100000})
+        assert response.status_code == 422
+        print("✓ Oversized page refused")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
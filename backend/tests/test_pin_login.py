@@ -0,0 +1,87 @@
+"""
+PIN login tests
+PINs resolve through the tenant of the subdomain, are never stored or returned
+in plain text, and are not accepted across tenants from the main domain.
+"""
+import pytest
+import requests
+import os
+import uuid
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+SUPER_ADMIN_CREDS = {"username": "superadmin", "password": "super@admin123"}
+
+
+class TestPinLogin:
+    """POST /auth/login with a PIN"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup - a fresh tenant with a PIN cashier"""
+        login_response = requests.post(f"{BASE_URL}/api/auth/login", json=SUPER_ADMIN_CREDS)
+        if login_response.status_code != 200:
+            pytest.skip("Super admin login failed - skipping PIN tests")
+        self.headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+        self.name = f"testpin{uuid.uuid4().hex[:8]}"
+        tenant = requests.post(f"{BASE_URL}/api/tenants", headers=self.headers, json={
+            "name": self.name,
+            "company_name": "Test PIN",
+            "email": f"{self.name}@example.com",
+            "admin_username": f"admin_{self.name}",
+            "admin_password": "password123",
+            "admin_full_name": "PIN Admin"
+        })
+        assert tenant.status_code == 200, tenant.text
+        self.tenant_id = tenant.json()["id"]
+
+        self.pin = f"{uuid.uuid4().int % 10000:04d}"
+        cashier = requests.post(f"{BASE_URL}/api/tenants/{self.tenant_id}/users", headers=self.headers, json={
+            "username": f"cashier_{self.name}",
+            "password": "password123",
+            "full_name": "PIN Cashier",
+            "role": "cashier",
+            "pin": self.pin
+        })
+        assert cashier.status_code == 200, cashier.text
+        self.cashier = cashier.json()["user"]
+
+        yield
+
+        requests.delete(f"{BASE_URL}/api/tenants/{self.tenant_id}", headers=self.headers)
+
+    def test_pin_login_on_subdomain(self):
+        """The PIN logs in on the tenant's own subdomain"""
+        response = requests.post(f"{BASE_URL}/api/auth/login", json={
+            "username": self.pin, "password": self.pin, "subdomain": self.name.upper()
+        })
+        assert response.status_code == 200, response.text
+        assert response.json()["user"]["id"] == self.cashier["id"]
+        print("✓ PIN login resolved through the subdomain")
+
+    def test_pin_rejected_on_main_domain(self):
+        """Without a subdomain a tenant PIN is not looked up across tenants"""
+        response = requests.post(f"{BASE_URL}/api/auth/login", json={"username": self.pin, "password": self.pin})
+        assert response.status_code == 401
+        print("✓ Tenant PIN rejected on the main domain")
+
+    def test_pin_with_remembered_tenant(self):
+        """Without a subdomain the tenant remembered by the client selects the PIN"""
+        response = requests.post(f"{BASE_URL}/api/auth/login", json={
+            "username": self.pin, "password": self.pin, "tenant_id": self.tenant_id
+        })
+        assert response.status_code == 200, response.text
+        assert response.json()["user"]["id"] == self.cashier["id"]
+        print("✓ PIN login through the remembered tenant")
+
+    def test_pin_not_returned(self):
+        """The plaintext PIN is neither stored nor sent back"""
+        assert self.cashier.get("pin") is None
+        users = requests.get(f"{BASE_URL}/api/tenants/{self.tenant_id}/users", headers=self.headers).json()
+        assert all(u.get("pin") is None for u in users)
+        print("✓ PIN kept only as a digest")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
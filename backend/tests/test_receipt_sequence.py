@@ -0,0 +1,81 @@
+"""
+Receipt number sequence tests
+Checks that receipt numbers allocated from the counters collection stay unique
+when many tills sell at the same time.
+"""
+import pytest
+import requests
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+CONCURRENT_SALES = 50
+WORKERS = 10
+
+
+class TestReceiptSequence:
+    """Test atomic receipt number allocation"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup - login and create a product to sell"""
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+
+        login_response = self.session.post(f"{BASE_URL}/api/auth/login", json={
+            "username": "admin",
+            "password": "admin123"
+        })
+        if login_response.status_code != 200:
+            pytest.skip("Admin login failed - skipping receipt sequence tests")
+        self.token = login_response.json().get("access_token")
+        self.session.headers.update({"Authorization": f"Bearer {self.token}"})
+
+        product_response = self.session.post(f"{BASE_URL}/api/products", json={
+            "name": "TEST_ReceiptSequence",
+            "sale_price": 1.0,
+            "initial_stock": 1000
+        })
+        assert product_response.status_code == 200, f"Product create failed: {product_response.text}"
+        self.product_id = product_response.json()["id"]
+
+        yield
+
+        self.session.delete(f"{BASE_URL}/api/products/{self.product_id}")
+
+    def _sell(self, _):
+        response = requests.post(f"{BASE_URL}/api/sales", json={
+            "items": [{"product_id": self.product_id, "quantity": 1, "unit_price": 1.0}],
+            "payment_method": "bank",
+            "bank_amount": 1.0
+        }, headers={"Authorization": f"Bearer {self.token}"})
+        assert response.status_code == 200, f"Sale failed: {response.text}"
+        return response.json()["receipt_number"]
+
+    def test_receipt_number_format(self):
+        """Test receipt numbers keep the RCP-YYYYMMDD-NNNN format"""
+        receipt_number = self._sell(0)
+        assert re.match(r"^RCP-\d{8}-\d{4,}$", receipt_number), receipt_number
+        print(f"✓ Receipt number format: {receipt_number}")
+
+    def test_concurrent_sales_get_unique_receipts(self):
+        """Test concurrent sales never share a receipt number"""
+        with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+            receipts = list(pool.map(self._sell, range(CONCURRENT_SALES)))
+
+        assert len(set(receipts)) == CONCURRENT_SALES, "Duplicate receipt numbers under concurrent load"
+        print(f"✓ {CONCURRENT_SALES} concurrent sales produced unique receipt numbers")
+
+    def test_sequential_sales_are_increasing(self):
+        """Test receipts from one till increase (gap-free with the default block size of 1)"""
+        numbers = [int(self._sell(i).rsplit("-", 1)[1]) for i in range(5)]
+        assert numbers == sorted(numbers), f"Receipt numbers not increasing: {numbers}"
+        if int(os.environ.get('RECEIPT_BLOCK_SIZE', 1)) == 1:
+            assert numbers == list(range(numbers[0], numbers[0] + 5)), f"Unexpected gaps: {numbers}"
+        print(f"✓ Sequential receipt numbers: {numbers}")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
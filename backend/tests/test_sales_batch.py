@@ -0,0 +1,125 @@
+"""
+Offline batch sale ingestion tests
+A till uploads sales recorded offline; every sale is reported individually
+and re-uploads are idempotent.
+"""
+import pytest
+import requests
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+INITIAL_STOCK = 50
+
+
+class TestSalesBatch:
+    """POST /sales/batch"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup - login and create a product to sell"""
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+
+        login_response = self.session.post(f"{BASE_URL}/api/auth/login", json={
+            "username": "admin",
+            "password": "admin123"
+        })
+        if login_response.status_code != 200:
+            pytest.skip("Admin login failed - skipping batch sale tests")
+        self.session.headers.update({"Authorization": f"Bearer {login_response.json().get('access_token')}"})
+
+        product_response = self.session.post(f"{BASE_URL}/api/products", json={
+            "name": "TEST_BatchProduct",
+            "sale_price": 2.0,
+            "initial_stock": INITIAL_STOCK
+        })
+        assert product_response.status_code == 200
+        self.product_id = product_response.json()["id"]
+
+        yield
+
+        self.session.delete(f"{BASE_URL}/api/products/{self.product_id}")
+
+    def _sale(self, key, product_id=None, quantity=1):
+        return {
+            "idempotency_key": key,
+            "items": [{"product_id": product_id or self.product_id, "quantity": quantity, "unit_price": 2.0}],
+            "payment_method": "bank",
+            "bank_amount": 2.0 * quantity
+        }
+
+    def _stock(self):
+        return self.session.get(f"{BASE_URL}/api/products/{self.product_id}").json()["current_stock"]
+
+    def test_batch_reports_each_sale(self):
+        """Valid sales are created, a bad one is reported without failing the batch"""
+        keys = [f"TEST-{uuid.uuid4()}" for _ in range(3)]
+        response = self.session.post(f"{BASE_URL}/api/sales/batch", json={"sales": [
+            self._sale(keys[0], quantity=2),
+            self._sale(keys[1], product_id="does-not-exist"),
+            self._sale(keys[2], quantity=3),
+        ]})
+        assert response.status_code == 200, f"Batch failed: {response.text}"
+        data = response.json()
+
+        assert (data["created"], data["duplicates"], data["errors"]) == (2, 0, 1)
+        assert [r["idempotency_key"] for r in data["results"]] == keys
+        assert [r["status"] for r in data["results"]] == ["created", "error", "created"]
+        assert self._stock() == INITIAL_STOCK - 5
+        print("✓ Batch created 2 sales and reported 1 error")
+
+    def test_reupload_is_idempotent(self):
+        """Uploading the same batch twice books stock once and returns the stored sales"""
+        batch = {"sales": [self._sale(f"TEST-{uuid.uuid4()}") for _ in range(20)]}
+
+        first = self.session.post(f"{BASE_URL}/api/sales/batch", json=batch).json()
+        second = self.session.post(f"{BASE_URL}/api/sales/batch", json=batch).json()
+
+        assert first["created"] == 20
+        assert second["duplicates"] == 20 and second["created"] == 0
+        assert [r["sale"]["receipt_number"] for r in first["results"]] == \
+               [r["sale"]["receipt_number"] for r in second["results"]]
+        assert len({r["sale"]["receipt_number"] for r in first["results"]}) == 20
+        assert self._stock() == INITIAL_STOCK - 20
+        print("✓ Re-upload returned 20 duplicates, stock booked once")
+
+    def test_key_repeated_in_batch(self):
+        """A key repeated inside one batch is stored once"""
+        key = f"TEST-{uuid.uuid4()}"
+        data = self.session.post(f"{BASE_URL}/api/sales/batch", json={
+            "sales": [self._sale(key), self._sale(key)]
+        }).json()
+
+        assert [r["status"] for r in data["results"]] == ["created", "duplicate"]
+        assert data["results"][0]["sale"]["id"] == data["results"][1]["sale"]["id"]
+        assert self._stock() == INITIAL_STOCK - 1
+        print("✓ Repeated key stored once")
+
+    def test_sale_before_drawer_not_credited(self):
+        """Cash of a sale made before the open drawer was opened stays out of that drawer"""
+        opened = False
+        if self.session.get(f"{BASE_URL}/api/cashier/current").status_code == 404:
+            assert self.session.post(f"{BASE_URL}/api/cashier/open", json={"opening_balance": 0}).status_code == 200
+            opened = True
+        try:
+            before = self.session.get(f"{BASE_URL}/api/cashier/current").json()["expected_balance"]
+            sale = {
+                **self._sale(f"TEST-{uuid.uuid4()}"),
+                "payment_method": "cash", "cash_amount": 2.0, "bank_amount": 0,
+                "created_at": (datetime.now(timezone.utc) - timedelta(days=30)).isoformat()
+            }
+            result = self.session.post(f"{BASE_URL}/api/sales/batch", json={"sales": [sale]}).json()["results"][0]
+            assert result["status"] == "created"
+            assert result["detail"]
+            assert self.session.get(f"{BASE_URL}/api/cashier/current").json()["expected_balance"] == before
+            print("✓ Old offline cash reported, not credited to today's drawer")
+        finally:
+            if opened:
+                self.session.post(f"{BASE_URL}/api/cashier/close", json={"actual_balance": 0})
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
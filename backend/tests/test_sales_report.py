@@ -0,0 +1,62 @@
+"""
+Sales report tests
+The summary (daily rollups) and the sales list cover the same whole days.
+"""
+import pytest
+import requests
+import os
+from datetime import datetime, timezone
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+
+class TestSalesReport:
+    """GET /reports/sales"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup - login and create a product"""
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+
+        login_response = self.session.post(f"{BASE_URL}/api/auth/login", json={
+            "username": "admin",
+            "password": "admin123"
+        })
+        if login_response.status_code != 200:
+            pytest.skip("Admin login failed - skipping sales report tests")
+        self.session.headers.update({"Authorization": f"Bearer {login_response.json().get('access_token')}"})
+
+        product_response = self.session.post(f"{BASE_URL}/api/products", json={
+            "name": "TEST_ReportProduct",
+            "sale_price": 4.0,
+            "initial_stock": 10
+        })
+        assert product_response.status_code == 200
+        self.product_id = product_response.json()["id"]
+
+        yield
+
+        self.session.delete(f"{BASE_URL}/api/products/{self.product_id}")
+
+    def test_end_day_is_included_in_list_and_summary(self):
+        """A sale made today shows up when end_date is today's date"""
+        sale = self.session.post(f"{BASE_URL}/api/sales", json={
+            "items": [{"product_id": self.product_id, "quantity": 1, "unit_price": 4.0}],
+            "payment_method": "bank",
+            "bank_amount": 4.0
+        })
+        assert sale.status_code == 200
+
+        today = datetime.now(timezone.utc).date().isoformat()
+        report = self.session.get(f"{BASE_URL}/api/reports/sales", params={"start_date": today, "end_date": today})
+        assert report.status_code == 200
+        data = report.json()
+        assert sale.json()["id"] in {s["id"] for s in data["sales"]}
+        assert data["summary"]["total_transactions"] >= 1
+        assert [d["date"] for d in data["daily_breakdown"]] == [today]
+        print("✓ End day included in both the list and the totals")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,93 @@
+"""
+Stock concurrency stress tests
+Many workers sell the same hot product at once; stock must end exactly where
+the number of accepted sales says it should (no lost updates).
+"""
+import pytest
+import requests
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+INITIAL_STOCK = 100
+WORKERS = 20
+
+
+class TestHotProductConcurrency:
+    """Concurrent sales and stock movements against a single product"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup - login and create the hot product"""
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+
+        login_response = self.session.post(f"{BASE_URL}/api/auth/login", json={
+            "username": "admin",
+            "password": "admin123"
+        })
+        if login_response.status_code != 200:
+            pytest.skip("Admin login failed - skipping stock concurrency tests")
+        self.token = login_response.json().get("access_token")
+        self.session.headers.update({"Authorization": f"Bearer {self.token}"})
+
+        product_response = self.session.post(f"{BASE_URL}/api/products", json={
+            "name": "TEST_HotProduct",
+            "sale_price": 1.0,
+            "initial_stock": INITIAL_STOCK
+        })
+        assert product_response.status_code == 200, f"Product create failed: {product_response.text}"
+        self.product_id = product_response.json()["id"]
+
+        yield
+
+        self.session.delete(f"{BASE_URL}/api/products/{self.product_id}")
+
+    def _headers(self):
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def _current_stock(self):
+        response = self.session.get(f"{BASE_URL}/api/products/{self.product_id}")
+        assert response.status_code == 200
+        return response.json()["current_stock"]
+
+    def _sell_one(self, _):
+        return requests.post(f"{BASE_URL}/api/sales", json={
+            "items": [{"product_id": self.product_id, "quantity": 1, "unit_price": 1.0}],
+            "payment_method": "bank",
+            "bank_amount": 1.0
+        }, headers=self._headers()).status_code
+
+    def _move_out_one(self, _):
+        return requests.post(f"{BASE_URL}/api/stock/movements", json={
+            "product_id": self.product_id,
+            "quantity": 1,
+            "movement_type": "out",
+            "reason": "TEST_concurrency"
+        }, headers=self._headers()).status_code
+
+    def test_concurrent_sales_do_not_lose_updates(self):
+        """Test every accepted concurrent sale is reflected in stock"""
+        with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+            statuses = list(pool.map(self._sell_one, range(INITIAL_STOCK)))
+
+        accepted = statuses.count(200)
+        assert accepted + statuses.count(400) == len(statuses), f"Unexpected statuses: {set(statuses)}"
+        assert self._current_stock() == INITIAL_STOCK - accepted
+        print(f"✓ {accepted} concurrent sales, stock {INITIAL_STOCK} -> {INITIAL_STOCK - accepted}")
+
+    def test_concurrent_stock_out_never_goes_negative(self):
+        """Test guarded stock-out movements stop exactly at zero"""
+        attempts = INITIAL_STOCK + 20
+        with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+            statuses = list(pool.map(self._move_out_one, range(attempts)))
+
+        assert statuses.count(200) == INITIAL_STOCK
+        assert statuses.count(400) == attempts - INITIAL_STOCK
+        assert self._current_stock() == 0
+        print(f"✓ {INITIAL_STOCK} of {attempts} concurrent stock-out movements accepted, stock is 0")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
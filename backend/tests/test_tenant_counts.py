@@ -0,0 +1,82 @@
+"""
+Tenant counter tests
+users_count / sales_count are kept on the tenant document as users and sales
+come and go, and reconciliation leaves correct counters alone.
+"""
+import pytest
+import requests
+import os
+import uuid
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+SUPER_ADMIN_CREDS = {"username": "superadmin", "password": "super@admin123"}
+
+
+class TestTenantCounts:
+    """Counters on GET /tenants/{id}"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup - a fresh tenant and a session for its admin"""
+        login_response = requests.post(f"{BASE_URL}/api/auth/login", json=SUPER_ADMIN_CREDS)
+        if login_response.status_code != 200:
+            pytest.skip("Super admin login failed - skipping tenant counter tests")
+        self.super_headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+        unique_id = uuid.uuid4().hex[:8]
+        tenant = requests.post(f"{BASE_URL}/api/tenants", headers=self.super_headers, json={
+            "name": f"testcounts{unique_id}",
+            "company_name": f"Test Counts {unique_id}",
+            "email": f"counts{unique_id}@example.com",
+            "admin_username": f"admin_counts{unique_id}",
+            "admin_password": "password123",
+            "admin_full_name": "Counts Admin"
+        })
+        assert tenant.status_code == 200, tenant.text
+        self.tenant_id = tenant.json()["id"]
+        assert (tenant.json()["users_count"], tenant.json()["sales_count"]) == (1, 0)
+
+        self.admin = requests.Session()
+        token = self.admin.post(f"{BASE_URL}/api/auth/login", json={
+            "username": f"admin_counts{unique_id}", "password": "password123"
+        }).json()["access_token"]
+        self.admin.headers.update({"Authorization": f"Bearer {token}"})
+
+        yield
+
+        requests.delete(f"{BASE_URL}/api/tenants/{self.tenant_id}", headers=self.super_headers)
+
+    def _counts(self):
+        tenant = requests.get(f"{BASE_URL}/api/tenants/{self.tenant_id}", headers=self.super_headers).json()
+        return tenant["users_count"], tenant["sales_count"]
+
+    def test_counters_follow_writes(self):
+        """Creating and deleting users and sales moves the counters"""
+        user = self.admin.post(f"{BASE_URL}/api/users", json={
+            "username": "test_counted", "full_name": "Counted", "role": "cashier", "password": "test1234"
+        })
+        assert user.status_code == 200
+        product = self.admin.post(f"{BASE_URL}/api/products", json={"name": "TEST_Counted", "sale_price": 1.0, "initial_stock": 5})
+        for _ in range(2):
+            assert self.admin.post(f"{BASE_URL}/api/sales", json={
+                "items": [{"product_id": product.json()["id"], "quantity": 1, "unit_price": 1.0}],
+                "payment_method": "bank",
+                "bank_amount": 1.0
+            }).status_code == 200
+        assert self._counts() == (2, 2)
+
+        assert self.admin.delete(f"{BASE_URL}/api/users/{user.json()['id']}").status_code == 200
+        assert self._counts() == (1, 2)
+        print("✓ Counters follow user and sale writes")
+
+    def test_reconcile_keeps_correct_counters(self):
+        """Reconciliation does not move counters that are already right"""
+        response = requests.post(f"{BASE_URL}/api/tenants/reconcile-counts", headers=self.super_headers)
+        assert response.status_code == 200
+        assert self._counts() == (1, 0)
+        print(f"✓ Reconciliation fixed {response.json()['fixed']} tenants, this one untouched")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,118 @@
+"""
+Subdomain resolution tests
+Branding lookups are exact, case-insensitive through normalization, cacheable
+and refreshed after a tenant write.
+"""
+import pytest
+import requests
+import os
+import uuid
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+SUPER_ADMIN_CREDS = {"username": "superadmin", "password": "super@admin123"}
+
+
+class TestTenantDirectory:
+    """GET /tenants/by-subdomain/{subdomain}"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup - a fresh tenant"""
+        login_response = requests.post(f"{BASE_URL}/api/auth/login", json=SUPER_ADMIN_CREDS)
+        if login_response.status_code != 200:
+            pytest.skip("Super admin login failed - skipping subdomain tests")
+        self.headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+        self.name = f"testdir{uuid.uuid4().hex[:8]}"
+        tenant = requests.post(f"{BASE_URL}/api/tenants", headers=self.headers, json={
+            "name": self.name,
+            "company_name": "Test Directory",
+            "email": f"{self.name}@example.com",
+            "admin_username": f"admin_{self.name}",
+            "admin_password": "password123",
+            "admin_full_name": "Directory Admin"
+        })
+        assert tenant.status_code == 200, tenant.text
+        self.tenant_id = tenant.json()["id"]
+
+        yield
+
+        requests.delete(f"{BASE_URL}/api/tenants/{self.tenant_id}", headers=self.headers)
+
+    def test_lookup_is_case_insensitive_and_cacheable(self):
+        """Mixed-case subdomains resolve and the response can be cached"""
+        response = requests.get(f"{BASE_URL}/api/tenants/by-subdomain/{self.name.upper()}")
+        assert response.status_code == 200
+        assert response.json()["id"] == self.tenant_id
+        assert "max-age" in response.headers["Cache-Control"]
+        assert response.headers.get("ETag")
+        print("✓ Subdomain resolved case-insensitively with cache headers")
+
+    def test_regex_characters_are_not_patterns(self):
+        """Input is matched literally, never as a regular expression"""
+        response = requests.get(f"{BASE_URL}/api/tenants/by-subdomain/{self.name[:4]}.*")
+        assert response.status_code == 404
+        print("✓ Regex characters matched literally")
+
+    def test_update_refreshes_branding(self):
+        """A tenant update is visible on the next lookup"""
+        url = f"{BASE_URL}/api/tenants/by-subdomain/{self.name}"
+        assert requests.get(url).json()["company_name"] == "Test Directory"
+        assert requests.put(f"{BASE_URL}/api/tenants/{self.tenant_id}", headers=self.headers, json={
+            "company_name": "Test Directory Renamed"
+        }).status_code == 200
+        assert requests.get(url).json()["company_name"] == "Test Directory Renamed"
+        print("✓ Tenant update refreshed the cached branding")
+
+    def test_suspension_applies_to_cached_lookup(self):
+        """A suspended tenant stops resolving although its branding was cached"""
+        url = f"{BASE_URL}/api/tenants/by-subdomain/{self.name}"
+        first = requests.get(url)
+        assert first.status_code == 200
+        assert requests.put(f"{BASE_URL}/api/tenants/{self.tenant_id}", headers=self.headers, json={
+            "status": "suspended"
+        }).status_code == 200
+        suspended = requests.get(url, headers={"If-None-Match": first.headers["ETag"]})
+        assert suspended.status_code == 403
+        print("✓ Suspension visible through the cached directory entry")
+
+    def test_update_keeps_other_tenants_cached(self):
+        """A write to one tenant does not change another tenant's branding ETag"""
+        other_name = f"testdir{uuid.uuid4().hex[:8]}"
+        other = requests.post(f"{BASE_URL}/api/tenants", headers=self.headers, json={
+            "name": other_name,
+            "company_name": "Other Directory",
+            "email": f"{other_name}@example.com",
+            "admin_username": f"admin_{other_name}",
+            "admin_password": "password123",
+            "admin_full_name": "Other Admin"
+        })
+        assert other.status_code == 200, other.text
+        try:
+            url = f"{BASE_URL}/api/tenants/by-subdomain/{other_name}"
+            etag = requests.get(url).headers["ETag"]
+            assert requests.put(f"{BASE_URL}/api/tenants/{self.tenant_id}", headers=self.headers, json={
+                "company_name": "Test Directory Renamed"
+            }).status_code == 200
+            assert requests.get(url, headers={"If-None-Match": etag}).status_code == 304
+            print("✓ Other tenants keep their cached branding")
+        finally:
+            requests.delete(f"{BASE_URL}/api/tenants/{other.json()['id']}", headers=self.headers)
+
+    def test_duplicate_name_rejected(self):
+        """The unique name index rejects a second tenant with the same subdomain"""
+        response = requests.post(f"{BASE_URL}/api/tenants", headers=self.headers, json={
+            "name": self.name.upper(),
+            "company_name": "Duplicate",
+            "email": f"dup_{self.name}@example.com",
+            "admin_username": f"admin_dup_{self.name}",
+            "admin_password": "password123",
+            "admin_full_name": "Duplicate"
+        })
+        assert response.status_code == 400
+        print("✓ Duplicate subdomain rejected")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
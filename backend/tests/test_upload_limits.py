@@ -0,0 +1,99 @@
+"""
+Upload limit tests
+Uploads are streamed: oversized files are refused from Content-Length or as
+soon as the streamed part passes MAX_FILE_SIZE, without buffering the body.
+"""
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+MAX_FILE_SIZE = 5 * 1024 * 1024
+BOUNDARY = "testboundary7d93"
+
+
+def multipart_chunks(size: int, chunk_size: int = 256 * 1024):
+    """A multipart body with one `file` part of `size` bytes, produced lazily"""
+    yield (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="big.png"\r\n'
+        "Content-Type: image/png\r\n\r\n"
+    ).encode()
+    sent = 0
+    while sent < size:
+        block = min(chunk_size, size - sent)
+        yield b"\x00" * block
+        sent += block
+    yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+class TestUploadLimits:
+    """POST /upload/logo size and format checks"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup - login"""
+        login_response = requests.post(f"{BASE_URL}/api/auth/login", json={
+            "username": "admin",
+            "password": "admin123"
+        })
+        if login_response.status_code != 200:
+            pytest.skip("Admin login failed - skipping upload limit tests")
+        self.token = login_response.json().get("access_token")
+        self.url = f"{BASE_URL}/api/upload/logo"
+        self.headers = {
+            "Authorization": f"Bearer {self.token}",
+            "Content-Type": f"multipart/form-data; boundary={BOUNDARY}"
+        }
+
+    def test_content_length_rejected_up_front(self):
+        """A declared body over the limit is refused with 413"""
+        body = b"".join(multipart_chunks(MAX_FILE_SIZE + 1024 * 1024))
+        response = requests.post(self.url, headers=self.headers, data=body)
+        assert response.status_code == 413
+        print("✓ Oversized Content-Length rejected")
+
+    def test_streamed_part_rejected_incrementally(self):
+        """A chunked body without Content-Length is cut off once it passes the limit"""
+        try:
+            response = requests.post(self.url, headers=self.headers, data=multipart_chunks(MAX_FILE_SIZE * 2))
+        except requests.exceptions.ConnectionError:
+            # The server answered 413 and closed before the client finished sending
+            print("✓ Streamed upload aborted by the server")
+            return
+        assert response.status_code == 413
+        print("✓ Streamed upload rejected with 413")
+
+    def test_missing_file_part(self):
+        """A multipart body without a `file` part is a 400"""
+        body = (
+            f"--{BOUNDARY}\r\n"
+            'Content-Disposition: form-data; name="other"\r\n\r\n'
+            f"value\r\n--{BOUNDARY}--\r\n"
+        ).encode()
+        response = requests.post(self.url, headers=self.headers, data=body)
+        assert response.status_code == 400
+        print("✓ Missing file part rejected")
+
+    def test_not_multipart(self):
+        """Anything but multipart/form-data is a 400"""
+        response = requests.post(
+            self.url, headers={"Authorization": f"Bearer {self.token}"}, json={"file": "data"}
+        )
+        assert response.status_code == 400
+        print("✓ Non-multipart body rejected")
+
+    def test_role_checked_before_body(self):
+        """Uploads for another tenant are refused for non Super Admins before the body is read"""
+        response = requests.post(
+            f"{BASE_URL}/api/upload/tenant/some-tenant/logo", headers=self.headers,
+            data=b"".join(multipart_chunks(MAX_FILE_SIZE + 1024 * 1024))
+        )
+        # An oversized body would be 413 if it were looked at first
+        assert response.status_code == 403
+        print("✓ Role checked before streaming the upload")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,78 @@
+"""
+Users-for-reset statistics tests
+Per-user sales counts and totals come from one aggregation and match the
+sales actually made.
+"""
+import pytest
+import requests
+import os
+import uuid
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+
+class TestUsersForReset:
+    """GET /admin/users-for-reset"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Setup - admin session and a throwaway cashier"""
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+
+        login_response = self.session.post(f"{BASE_URL}/api/auth/login", json={
+            "username": "admin",
+            "password": "admin123"
+        })
+        if login_response.status_code != 200:
+            pytest.skip("Admin login failed - skipping users-for-reset tests")
+        self.session.headers.update({"Authorization": f"Bearer {login_response.json().get('access_token')}"})
+
+        self.username = f"test_stats_{uuid.uuid4().hex[:8]}"
+        user = self.session.post(f"{BASE_URL}/api/users", json={
+            "username": self.username, "full_name": "TEST Stats", "role": "cashier", "password": "test1234"
+        })
+        assert user.status_code == 200
+        self.user_id = user.json()["id"]
+        product = self.session.post(f"{BASE_URL}/api/products", json={
+            "name": "TEST_StatsProduct", "sale_price": 4.0, "initial_stock": 100
+        })
+        assert product.status_code == 200
+        self.product_id = product.json()["id"]
+
+        yield
+
+        self.session.delete(f"{BASE_URL}/api/products/{self.product_id}")
+        self.session.delete(f"{BASE_URL}/api/users/{self.user_id}")
+
+    def _stats(self):
+        users = self.session.get(f"{BASE_URL}/api/admin/users-for-reset").json()
+        return next(u for u in users if u["id"] == self.user_id)
+
+    def test_user_without_sales(self):
+        """A user with no sales is listed with zeros"""
+        stats = self._stats()
+        assert (stats["sales_count"], stats["total_sales"]) == (0, 0)
+        assert stats["username"] == self.username
+        print("✓ User without sales listed with zeros")
+
+    def test_counts_and_totals(self):
+        """Counts and totals match the user's sales"""
+        cashier = requests.Session()
+        token = cashier.post(f"{BASE_URL}/api/auth/login", json={"username": self.username, "password": "test1234"}).json()["access_token"]
+        cashier.headers.update({"Authorization": f"Bearer {token}"})
+        for quantity in (1, 2):
+            assert cashier.post(f"{BASE_URL}/api/sales", json={
+                "items": [{"product_id": self.product_id, "quantity": quantity, "unit_price": 4.0}],
+                "payment_method": "bank",
+                "bank_amount": 4.0 * quantity
+            }).status_code == 200
+
+        stats = self._stats()
+        assert stats["sales_count"] == 2
+        assert stats["total_sales"] == pytest.approx(12.0)
+        print("✓ Sales count and total aggregated per user")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,147 @@
+"""Streaming multipart uploads
+
+`spooled_upload(max_size)` builds a dependency that parses the request body as
+it arrives, instead of declaring `UploadFile = File(...)` and letting the form
+be buffered completely before the endpoint can look at its size:
+
+- a Content-Length above the limit is rejected with 413 before the body is read
+- the file part is written chunk by chunk to a SpooledTemporaryFile (memory up
+  to UPLOAD_SPOOL_MEMORY, a temp file beyond) and hashed with SHA-256 on the way
+- the request is aborted with 413 as soon as the part grows past the limit
+
+Usage:
+    image_upload = spooled_upload(MAX_FILE_SIZE)
+
+    @router.post("/logo")
+    async def upload_logo(current_user=Depends(get_current_user), upload: SpooledUpload = Depends(image_upload)):
+        data, key = upload.read(), upload.sha256
+"""
+import hashlib
+import os
+import tempfile
+from typing import Optional
+
+from fastapi import HTTPException, Request
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+UPLOAD_SPOOL_MEMORY = int(os.environ.get("UPLOAD_SPOOL_MEMORY", str(1024 * 1024)))
+# Room for boundaries, part headers and small form fields around the file
+MULTIPART_OVERHEAD = 64 * 1024
+UPLOAD_FIELD = "file"
+
+
+class SpooledUpload:
+    """One received file part - spooled content, size and SHA-256"""
+
+    def __init__(self):
+        self.filename: str = ""
+        self.content_type: Optional[str] = None
+        self.size = 0
+        self.file = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MEMORY)
+        self._hash = hashlib.sha256()
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    def write(self, data: bytes):
+        self.file.write(data)
+        self._hash.update(data)
+        self.size += len(data)
+
+    def read(self) -> bytes:
+        self.file.seek(0)
+        return self.file.read()
+
+    def close(self):
+        self.file.close()
+
+
+def _too_large(max_size: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"File-i është shumë i madh. Maksimumi: {max_size // (1024 * 1024)}MB")
+
+
+async def receive_upload(request: Request, max_size: int, field: str = UPLOAD_FIELD) -> SpooledUpload:
+    """Stream the `field` file part of a multipart request into a SpooledUpload"""
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_size + MULTIPART_OVERHEAD:
+        raise _too_large(max_size)
+
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    boundary = options.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Kërkesa duhet të jetë multipart/form-data")
+
+    upload = SpooledUpload()
+    part = {"headers": {}, "header": b"", "value": b"", "target": None}
+    found = False
+
+    def on_part_begin():
+        part.update(headers={}, header=b"", value=b"", target=None)
+
+    def on_header_field(data: bytes, start: int, end: int):
+        part["header"] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int):
+        part["value"] += data[start:end]
+
+    def on_header_end():
+        part["headers"][part["header"].lower()] = part["value"]
+        part["header"] = part["value"] = b""
+
+    def on_headers_finished():
+        nonlocal found
+        _, disposition = parse_options_header(part["headers"].get(b"content-disposition", b""))
+        if found or disposition.get(b"name") != field.encode() or b"filename" not in disposition:
+            return  # other form fields are skipped, not stored
+        found = True
+        upload.filename = disposition[b"filename"].decode("utf-8", "replace")
+        upload.content_type = part["headers"].get(b"content-type", b"").decode("latin-1") or None
+        part["target"] = upload
+
+    def on_part_data(data: bytes, start: int, end: int):
+        if part["target"] is not None:
+            upload.write(data[start:end])
+            if upload.size > max_size:
+                raise _too_large(max_size)
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+    })
+    received = 0
+    try:
+        async for chunk in request.stream():
+            # Bounds the whole body too, whatever the form carries besides the file
+            received += len(chunk)
+            if received > max_size + MULTIPART_OVERHEAD:
+                raise _too_large(max_size)
+            parser.write(chunk)
+        parser.finalize()
+    except MultipartParseError:
+        upload.close()
+        raise HTTPException(status_code=400, detail="Kërkesa multipart nuk është e vlefshme")
+    except BaseException:
+        upload.close()
+        raise
+
+    if not found:
+        upload.close()
+        raise HTTPException(status_code=400, detail="Kërkesa nuk përmban asnjë file")
+    return upload
+
+
+def spooled_upload(max_size: int, field: str = UPLOAD_FIELD):
+    """Dependency yielding the streamed file part; the spool is closed after the response"""
+    async def dependency(request: Request):
+        upload = await receive_upload(request, max_size, field)
+        try:
+            yield upload
+        finally:
+            upload.close()
+    return dependency
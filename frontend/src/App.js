@@ -117,6 +117,18 @@ export const api = axios.create({
   headers: { 'Content-Type': 'application/json' }
 });
 
+// Follow X-Next-Cursor until the last page of a paginated list endpoint
+export const fetchAllPages = async (path, params = {}) => {
+  const rows = [];
+  let cursor = null;
+  do {
+    const response = await api.get(path, { params: { ...params, limit: 1000, ...(cursor ? { cursor } : {}) } });
+    rows.push(...response.data);
+    cursor = response.headers['x-next-cursor'];
+  } while (cursor);
+  return rows;
+};
+
 // Add token interceptor
 api.interceptors.request.use((config) => {
   const token = localStorage.getItem('t3next_token');
@@ -235,8 +247,12 @@ const AuthProvider = ({ children }) => {
 
   const login = async (username, password) => {
     try {
-      const response = await api.post('/auth/login', { username, password });
+      // Without a subdomain (desktop, main domain) PINs are looked up in the last tenant used on this device
+      const response = await api.post('/auth/login', {
+        username, password, subdomain: getSubdomain(), tenant_id: localStorage.getItem('t3next_tenant_id')
+      });
       const { access_token, user: userData } = response.data;
+      if (userData.tenant_id) localStorage.setItem('t3next_tenant_id', userData.tenant_id);
       localStorage.setItem('t3next_token', access_token);
       localStorage.setItem('t3next_user', JSON.stringify(userData));
       sessionStorage.setItem('ipos_session_active', 'true');
@@ -1,4 +1,5 @@
 import React, { forwardRef } from 'react';
+import { imageVariant } from '../lib/utils';
 
 // Invoice A4 Component for printing
 const InvoiceA4 = forwardRef(({ sale, companyInfo }, ref) => {
@@ -38,7 +39,7 @@ const InvoiceA4 = forwardRef(({ sale, companyInfo }, ref) => {
             {/* Show company logo if available, otherwise show default icon */}
             {company.logo_url ? (
               <img 
-                src={company.logo_url} 
+                src={imageVariant(company, 'logo', 'invoice')} 
                 alt="Logo" 
                 className="h-10 w-auto object-contain"
                 onError={(e) => e.target.style.display = 'none'}
@@ -131,7 +132,7 @@ const InvoiceA4 = forwardRef(({ sale, companyInfo }, ref) => {
           {company.stamp_url && (
             <div className="text-center">
               <img 
-                src={company.stamp_url} 
+                src={imageVariant(company, 'stamp', 'invoice')} 
                 alt="Vula Digjitale" 
                 className="max-w-[150px] max-h-[150px] object-contain opacity-90"
                 style={{ mixBlendMode: 'multiply' }}
@@ -1,4 +1,5 @@
 import React, { forwardRef } from 'react';
+import { imageVariant } from '../lib/utils';
 
 // Thermal Receipt Component (80mm width ~ 302px at 96dpi)
 const ThermalReceipt = forwardRef(({ sale, companyInfo }, ref) => {
@@ -40,7 +41,7 @@ const ThermalReceipt = forwardRef(({ sale, companyInfo }, ref) => {
         {company.logo_url && (
           <div className="mb-2">
             <img 
-              src={company.logo_url} 
+              src={imageVariant(company, 'logo', 'thermal')} 
               alt="Logo" 
               className="mx-auto" 
               style={{ height: '40px', maxWidth: '60mm', objectFit: 'contain' }}
@@ -4,3 +4,15 @@ import { twMerge } from "tailwind-merge"
 export function cn(...inputs) {
   return twMerge(clsx(inputs));
 }
+
+const BACKEND_URL = process.env.REACT_APP_BACKEND_URL || '';
+
+// Uploaded images are served by the API under server-relative URLs (/api/assets/<hash>)
+export function assetUrl(url) {
+  return url && url.startsWith('/api/') ? `${BACKEND_URL}${url}` : url;
+}
+
+// Pre-rendered logo/stamp variant ('thermal', 'invoice' or 'thumb'), falling back to the original upload
+export function imageVariant(owner, field, variant) {
+  return assetUrl(owner?.[`${field}_variants`]?.[variant] || owner?.[`${field}_url`]);
+}
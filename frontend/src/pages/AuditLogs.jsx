@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { api } from '../App';
+import { api, fetchAllPages } from '../App';
 import { toast } from 'sonner';
 import { Card, CardContent, CardHeader, CardTitle } from '../components/ui/card';
 import { Button } from '../components/ui/button';
@@ -53,10 +53,10 @@ const AuditLogs = () => {
 
       const [logsRes, usersRes] = await Promise.all([
         api.get('/audit-logs', { params }),
-        api.get('/users')
+        fetchAllPages('/users')
       ]);
       setLogs(logsRes.data);
-      setUsers(usersRes.data);
+      setUsers(usersRes);
     } catch (error) {
       console.error('Error loading audit logs:', error);
       toast.error('Gabim gjatë ngarkimit');
@@ -277,8 +277,19 @@ const Dashboard = () => {
         admin_password: restorePassword
       });
       
+      // The restore runs in the background - poll the job until it finishes
+      let job = { status: response.data.status };
+      while (job.status === 'running') {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        job = (await api.get(`/admin/restore-jobs/${response.data.job_id}`)).data;
+      }
+      if (job.status !== 'complete') {
+        toast.error(`Rikthimi dështoi: ${job.error || ''}`);
+        return;
+      }
+      
       toast.success(
-        `Të dhënat u rikthyen: ${response.data.restored.sales} shitje, ${response.data.restored.cash_drawers} arka`
+        `Të dhënat u rikthyen: ${job.progress.sales.restored} shitje, ${job.progress.cash_drawers.restored} arka`
       );
       setShowRestoreDialog(false);
       setShowBackupsDialog(false);
@@ -4,6 +4,7 @@ import { useAuth, useTenant } from '../App';
 import { Input } from '../components/ui/input';
 import { Button } from '../components/ui/button';
 import { Delete, CornerDownLeft, User, Lock, Eye, EyeOff, ArrowLeft, Loader2 } from 'lucide-react';
+import { imageVariant } from '../lib/utils';
 
 const Login = () => {
   const [pin, setPin] = useState('');
@@ -112,7 +113,7 @@ const Login = () => {
             <div className="flex flex-col items-center justify-center mb-8">
               {tenant?.logo_url ? (
                 <img 
-                  src={tenant.logo_url} 
+                  src={imageVariant(tenant, 'logo', 'invoice')} 
                   alt={tenant.company_name || tenant.name}
                   className="h-16 object-contain mb-2"
                   onError={(e) => e.target.style.display = 'none'}
@@ -249,7 +250,7 @@ const Login = () => {
             <div className="flex flex-col items-center justify-center mb-8">
               {tenant?.logo_url ? (
                 <img 
-                  src={tenant.logo_url} 
+                  src={imageVariant(tenant, 'logo', 'invoice')} 
                   alt={tenant.company_name || tenant.name}
                   className="h-14 object-contain mb-2"
                   onError={(e) => e.target.style.display = 'none'}
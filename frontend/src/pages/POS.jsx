@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useRef, useCallback } from 'react';
 import { useNavigate } from 'react-router-dom';
-import { api, useAuth } from '../App';
+import { api, fetchAllPages, useAuth } from '../App';
 import { toast } from 'sonner';
 import { Card, CardContent, CardHeader, CardTitle } from '../components/ui/card';
 import { Button } from '../components/ui/button';
@@ -56,6 +56,56 @@ import {
 import InvoiceA4 from '../components/InvoiceA4';
 import ThermalReceipt from '../components/ThermalReceipt';
 import { Checkbox } from '../components/ui/checkbox';
+import { assetUrl, imageVariant } from '../lib/utils';
+
+// Catalog kept in localStorage and refreshed through /products/changes
+const catalogCacheKey = (user) => `t3next_catalog_${user?.tenant_id || 'default'}`;
+
+const saveCatalog = (key, products, since) => {
+  try {
+    localStorage.setItem(key, JSON.stringify({ products, since }));
+  } catch (error) {
+    // Quota exceeded - next load falls back to a full download
+    localStorage.removeItem(key);
+  }
+};
+
+const syncCatalog = async (key) => {
+  let cached = null;
+  try {
+    cached = JSON.parse(localStorage.getItem(key));
+  } catch (error) {
+    cached = null;
+  }
+
+  if (cached?.since) {
+    const byId = new Map(cached.products.map((p) => [p.id, p]));
+    let since = cached.since;
+    let reset = false;
+    for (;;) {
+      const { data } = await api.get('/products/changes', { params: { since } });
+      if (data.reset) {
+        reset = true;
+        break;
+      }
+      data.changes.forEach((p) => byId.set(p.id, p));
+      data.deleted.forEach((id) => byId.delete(id));
+      since = data.since;
+      if (!data.has_more) break;
+    }
+    if (!reset) {
+      const products = [...byId.values()];
+      saveCatalog(key, products, since);
+      return products;
+    }
+  }
+
+  // Token first, then the full catalog - changes in between are re-sent on the next sync
+  const { data } = await api.get('/products/changes');
+  const products = await fetchAllPages('/products');
+  saveCatalog(key, products, data.since);
+  return products;
+};
 
 const POS = () => {
   const { user, logout } = useAuth();
@@ -97,6 +147,8 @@ const POS = () => {
   const searchRef = useRef(null);
   const invoiceRef = useRef(null);
   const thermalReceiptRef = useRef(null);
+  // Idempotency-Key of the checkout in flight - kept across retries after a network error
+  const saleKeyRef = useRef(null);
 
   // Responsive screen size detection
   useEffect(() => {
@@ -139,11 +191,11 @@ const POS = () => {
     try {
       setLoading(true);
       const [productsRes, drawerRes, salesRes] = await Promise.all([
-        api.get('/products'),
+        syncCatalog(catalogCacheKey(user)),
         api.get('/cashier/current').catch(() => ({ data: null })),
         api.get('/sales?limit=10').catch(() => ({ data: [] }))
       ]);
-      setProducts(productsRes.data);
+      setProducts(productsRes);
       setCashDrawer(drawerRes.data);
       setRecentSales(salesRes.data || []);
     } catch (error) {
@@ -536,7 +588,7 @@ const POS = () => {
     `).join('');
     
     // Use company logo if available from tenant settings
-    const logoUrl = companySettings?.logo_url || '';
+    const logoUrl = imageVariant(companySettings, 'logo', 'thermal') || '';
     const companyName = companySettings?.company_name || 'DataPOS';
     const companyAddress = companySettings?.address || '';
     const companyCity = companySettings?.city || '';
@@ -544,7 +596,7 @@ const POS = () => {
     const companyEmail = companySettings?.email || '';
     const companyNUI = companySettings?.nui || '';
     const companyNF = companySettings?.nf || '';
-    const whatsappQrUrl = companySettings?.whatsapp_qr_url || '';
+    const whatsappQrUrl = assetUrl(companySettings?.whatsapp_qr_url) || '';
     
     return `
       <div style="text-align: center; margin-bottom: 8px;">
@@ -774,7 +826,13 @@ const POS = () => {
         notes: customerNote || null
       };
 
-      const response = await api.post('/sales', saleData);
+      if (!saleKeyRef.current) {
+        saleKeyRef.current = crypto.randomUUID();
+      }
+      const response = await api.post('/sales', saleData, {
+        headers: { 'Idempotency-Key': saleKeyRef.current }
+      });
+      saleKeyRef.current = null;
       toast.success(`Shitja u regjistrua: ${response.data.receipt_number}`);
       
       // Print thermal receipt if option is checked
@@ -804,6 +862,10 @@ const POS = () => {
       setSelectedItemIndex(null);
       loadData();
     } catch (error) {
+      if (error.response) {
+        // The server answered, so the key is settled - the next attempt is a new sale
+        saleKeyRef.current = null;
+      }
       toast.error(error.response?.data?.detail || 'Gabim gjatë regjistrimit të shitjes');
     }
   };
@@ -1207,7 +1269,7 @@ const POS = () => {
               {/* Company Logo */}
               {companySettings?.logo_url ? (
                 <img 
-                  src={companySettings.logo_url} 
+                  src={imageVariant(companySettings, 'logo', 'thumb')} 
                   alt="Logo" 
                   className="h-8 w-auto object-contain"
                   onError={(e) => e.target.style.display = 'none'}
@@ -2234,7 +2296,7 @@ const POS = () => {
                   {companySettings?.logo_url && (
                     <div style={{ marginBottom: '8px' }}>
                       <img 
-                        src={companySettings.logo_url} 
+                        src={imageVariant(companySettings, 'logo', 'thermal')} 
                         alt="Logo" 
                         style={{ height: '45px', maxWidth: '60mm', objectFit: 'contain' }} 
                         onError={(e) => e.target.style.display = 'none'}
@@ -2675,7 +2737,7 @@ const POS = () => {
             {/* Company Logo */}
             {companySettings?.logo_url ? (
               <img 
-                src={companySettings.logo_url} 
+                src={imageVariant(companySettings, 'logo', 'thumb')} 
                 alt="Logo" 
                 className="h-8 w-auto object-contain"
                 onError={(e) => e.target.style.display = 'none'}
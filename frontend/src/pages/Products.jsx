@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { api } from '../App';
+import { api, fetchAllPages } from '../App';
 import { toast } from 'sonner';
 import { Card, CardContent, CardHeader, CardTitle } from '../components/ui/card';
 import { Button } from '../components/ui/button';
@@ -72,11 +72,11 @@ const Products = () => {
       setLoading(true);
       const params = categoryFilter !== 'all' ? { category: categoryFilter } : {};
       const [productsRes, categoriesRes, branchesRes] = await Promise.all([
-        api.get('/products', { params }),
+        fetchAllPages('/products', params),
         api.get('/categories'),
         api.get('/branches')
       ]);
-      setProducts(productsRes.data);
+      setProducts(productsRes);
       setCategories(categoriesRes.data);
       setBranches(branchesRes.data);
     } catch (error) {
@@ -46,6 +46,7 @@ import {
   FolderOpen,
   MessageSquare
 } from 'lucide-react';
+import { assetUrl, imageVariant } from '../lib/utils';
 
 const Settings = () => {
   const [activeTab, setActiveTab] = useState('kompania');
@@ -387,7 +388,7 @@ const Settings = () => {
         headers: { 'Content-Type': 'multipart/form-data' }
       });
       
-      setCompanyData(prev => ({ ...prev, logo_url: response.data.url }));
+      setCompanyData(prev => ({ ...prev, logo_url: response.data.url, logo_variants: response.data.variants }));
       toast.success('Logo u ngarkua me sukses!');
     } catch (error) {
       toast.error(error.response?.data?.detail || 'Gabim gjatë ngarkimit të logos');
@@ -423,7 +424,7 @@ const Settings = () => {
         headers: { 'Content-Type': 'multipart/form-data' }
       });
       
-      setCompanyData(prev => ({ ...prev, stamp_url: response.data.url }));
+      setCompanyData(prev => ({ ...prev, stamp_url: response.data.url, stamp_variants: response.data.variants }));
       toast.success('Vula digjitale u ngarkua me sukses!');
     } catch (error) {
       toast.error(error.response?.data?.detail || 'Gabim gjatë ngarkimit të vulës');
@@ -438,11 +439,11 @@ const Settings = () => {
     
     try {
       await api.delete('/upload/tenant/current/stamp').catch(() => {});
-      setCompanyData(prev => ({ ...prev, stamp_url: '' }));
+      setCompanyData(prev => ({ ...prev, stamp_url: '', stamp_variants: null }));
       toast.success('Vula digjitale u fshi');
     } catch (error) {
       // Just clear locally if API fails
-      setCompanyData(prev => ({ ...prev, stamp_url: '' }));
+      setCompanyData(prev => ({ ...prev, stamp_url: '', stamp_variants: null }));
     }
   };
 
@@ -655,12 +656,12 @@ const Settings = () => {
                     {companyData.logo_url ? (
                       <div className="relative">
                         <img 
-                          src={companyData.logo_url} 
+                          src={imageVariant(companyData, 'logo', 'thumb')} 
                           alt="Logo" 
                           className="w-24 h-24 object-contain border rounded-lg bg-gray-50"
                         />
                         <button 
-                          onClick={() => setCompanyData({ ...companyData, logo_url: '' })}
+                          onClick={() => setCompanyData({ ...companyData, logo_url: '', logo_variants: null })}
                           className="absolute -top-2 -right-2 bg-red-500 text-white rounded-full w-6 h-6 flex items-center justify-center text-xs hover:bg-red-600"
                         >
                           ×
@@ -708,7 +709,7 @@ const Settings = () => {
                     {companyData.stamp_url ? (
                       <div className="relative">
                         <img 
-                          src={companyData.stamp_url} 
+                          src={imageVariant(companyData, 'stamp', 'thumb')} 
                           alt="Vula Digjitale" 
                           className="w-24 h-24 object-contain border rounded-lg bg-gray-50"
                           style={{ mixBlendMode: 'multiply' }}
@@ -769,7 +770,7 @@ const Settings = () => {
                     {companyData.whatsapp_qr_url ? (
                       <div className="relative">
                         <img 
-                          src={companyData.whatsapp_qr_url} 
+                          src={assetUrl(companyData.whatsapp_qr_url)} 
                           alt="WhatsApp QR Code" 
                           className="w-24 h-24 object-contain border rounded-lg bg-white"
                         />
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { api } from '../App';
+import { api, fetchAllPages } from '../App';
 import { toast } from 'sonner';
 import { Card, CardContent, CardHeader, CardTitle } from '../components/ui/card';
 import { Button } from '../components/ui/button';
@@ -62,10 +62,10 @@ const Stock = () => {
     try {
       setLoading(true);
       const [productsRes, movementsRes] = await Promise.all([
-        api.get('/products'),
+        fetchAllPages('/products'),
         api.get('/stock/movements')
       ]);
-      setProducts(productsRes.data);
+      setProducts(productsRes);
       setMovements(movementsRes.data);
     } catch (error) {
       console.error('Error loading stock data:', error);
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { api, useAuth } from '../App';
+import { api, fetchAllPages, useAuth } from '../App';
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from '../components/ui/card';
 import { Button } from '../components/ui/button';
 import { Input } from '../components/ui/input';
@@ -43,6 +43,7 @@ import {
   EyeOff
 } from 'lucide-react';
 import { toast } from 'sonner';
+import { assetUrl, imageVariant } from '../lib/utils';
 
 const SuperAdmin = () => {
   const { user } = useAuth();
@@ -96,8 +97,7 @@ const SuperAdmin = () => {
 
   const loadTenants = async () => {
     try {
-      const response = await api.get('/tenants');
-      setTenants(response.data);
+      setTenants(await fetchAllPages('/tenants'));
     } catch (error) {
       toast.error('Gabim gjatë ngarkimit të firmave');
     } finally {
@@ -387,7 +387,7 @@ const SuperAdmin = () => {
                   <div className="flex items-start justify-between">
                     <div className="flex items-start gap-4">
                       {tenant.logo_url ? (
-                        <img src={tenant.logo_url} alt="" className="h-12 w-12 object-contain rounded" />
+                        <img src={imageVariant(tenant, 'logo', 'thumb')} alt="" className="h-12 w-12 object-contain rounded" />
                       ) : (
                         <div 
                           className="h-12 w-12 rounded flex items-center justify-center text-white font-bold"
@@ -570,7 +570,7 @@ const SuperAdmin = () => {
                   placeholder="https://example.com/logo.png"
                 />
                 {formData.logo_url && (
-                  <img src={formData.logo_url} alt="Preview" className="h-12 mt-2 object-contain" />
+                  <img src={assetUrl(formData.logo_url)} alt="Preview" className="h-12 mt-2 object-contain" />
                 )}
               </div>
               
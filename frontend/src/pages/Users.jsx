@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { api } from '../App';
+import { api, fetchAllPages } from '../App';
 import { toast } from 'sonner';
 import { Card, CardContent, CardHeader, CardTitle } from '../components/ui/card';
 import { Button } from '../components/ui/button';
@@ -63,10 +63,10 @@ const Users = () => {
     try {
       setLoading(true);
       const [usersRes, branchesRes] = await Promise.all([
-        api.get('/users'),
+        fetchAllPages('/users'),
         api.get('/branches')
       ]);
-      setUsers(usersRes.data);
+      setUsers(usersRes);
       setBranches(branchesRes.data);
     } catch (error) {
       console.error('Error loading users:', error);
@@ -86,6 +86,7 @@ const Users = () => {
 
       if (editingUser) {
         if (!data.password) delete data.password;
+        if (!data.pin) delete data.pin;
         await api.put(`/users/${editingUser.id}`, data);
         toast.success('Përdoruesi u përditësua');
       } else {
@@ -106,7 +107,7 @@ const Users = () => {
     setFormData({
       username: user.username,
       password: '',
-      pin: user.pin || '',
+      pin: '',
       full_name: user.full_name,
       role: user.role,
       branch_id: user.branch_id || '',